@@ -0,0 +1,68 @@
+# Copyright 2016 OpenStack Foundation
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+#
+
+"""Add nwa_tenant_binding table storing nwa_data as one document
+
+Revision ID: 3a1e9c52b7f4
+Revises: d86043b2d0f2
+Create Date: 2016-06-20 10:12:31.482201
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a1e9c52b7f4'
+down_revision = 'd86043b2d0f2'
+
+from alembic import op
+from oslo_serialization import jsonutils
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+key_value = sa.Table(
+    'nwa_tenant_key_value', sa.MetaData(),
+    sa.Column('tenant_id', sa.String(length=36)),
+    sa.Column('nwa_tenant_id', sa.String(length=64)),
+    sa.Column('json_key', sa.String(length=192)),
+    sa.Column('json_value', sa.String(length=1024)))
+
+
+def upgrade():
+    binding = op.create_table(
+        'nwa_tenant_binding',
+        sa.Column('tenant_id', sa.String(length=36),
+                  nullable=False, primary_key=True),
+        sa.Column('nwa_tenant_id', sa.String(length=64)),
+        sa.Column('value_json',
+                  sa.Text().with_variant(mysql.MEDIUMTEXT(), 'mysql'),
+                  nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, default=1)
+    )
+
+    # convert the rows of nwa_tenant_key_value, one document per tenant.
+    documents = {}
+    for row in op.get_bind().execute(key_value.select()):
+        doc = documents.setdefault(row.tenant_id, {
+            'tenant_id': row.tenant_id,
+            'nwa_tenant_id': row.nwa_tenant_id,
+            'value_json': {},
+            'version': 1,
+        })
+        doc['value_json'][row.json_key] = row.json_value
+    for doc in documents.values():
+        doc['value_json'] = jsonutils.dumps(doc['value_json'],
+                                            sort_keys=True)
+    if documents:
+        op.bulk_insert(binding, list(documents.values()))
@@ -12,10 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
 import socket
 import sys
 import time
 
+import eventlet
 from neutron.agent import rpc as agent_rpc
 from neutron.common import config as logging_config
 from neutron.common import rpc as n_rpc
@@ -30,6 +32,7 @@ from networking_nec.nwa.agent import proxy_l2
 from networking_nec.nwa.agent import proxy_l3
 from networking_nec.nwa.agent import proxy_tenant
 from networking_nec.nwa.agent import server_manager
+from networking_nec.nwa.agent import warm_pool
 from networking_nec.nwa.common import constants as nwa_const
 from networking_nec.nwa.l2.rpc import nwa_agent_callback
 from networking_nec.nwa.l2.rpc import nwa_proxy_callback
@@ -73,6 +76,11 @@ class NECNWANeutronAgent(object):
         self.proxy_tenant = proxy_tenant.AgentProxyTenant(self, self.client)
         self.proxy_l2 = proxy_l2.AgentProxyL2(self, self.client)
         self.proxy_l3 = proxy_l3.AgentProxyL3(self, self.client)
+        self.warm_pool = None
+        if self.conf.NWA.tenant_warm_pool:
+            self.warm_pool = warm_pool.TenantWarmPool(
+                self, self.conf.NWA.tenant_warm_pool_workers,
+                self.conf.NWA.tenant_warm_pool_ttl)
         self.setup_rpc()
 
         LOG.debug('NWA Agent state %s', self.agent_state)
@@ -82,6 +90,11 @@ class NECNWANeutronAgent(object):
 
         self.context = q_context.get_admin_context_without_session()
 
+        # the requests for tenants are held until the scenarios left by
+        # the previous run are applied.
+        self.resuming = True
+        self.server_manager.hold()
+
         self.nwa_l2_rpc = tenant_binding_api.TenantBindingServerRpcApi(
             topics.PLUGIN
         )
@@ -89,10 +102,36 @@ class NECNWANeutronAgent(object):
         self.state_rpc = agent_rpc.PluginReportStateAPI(topics.REPORTS)
         self.callback_nwa = nwa_agent_callback.NwaAgentRpcCallback(
             self.context, self.server_manager)
+        proxy_l2 = self.proxy_l2
+        proxy_l3 = self.proxy_l3
+        if not server_manager.is_multiplexed():
+            proxy_l2 = server_manager.HeldProxy(
+                proxy_l2, self.client.circuit_open)
+            proxy_l3 = server_manager.HeldProxy(
+                proxy_l3, self.client.circuit_open)
+            self.client.add_circuit_listener(proxy_l2.resume)
+            self.client.add_circuit_listener(proxy_l3.resume)
+        proxy_l2 = server_manager.TenantTrackingProxy(
+            proxy_l2, self.server_manager)
+        proxy_l3 = server_manager.TenantTrackingProxy(
+            proxy_l3, self.server_manager)
+        self.tenant_queues = None
+        if server_manager.is_multiplexed():
+            self.tenant_queues = server_manager.TenantQueues(
+                self.conf.NWA.tenant_queue_workers,
+                hold=self._hold_tenant_queues,
+                aging=self.conf.NWA.scenario_queue_aging,
+                parallel=(self.conf.NWA.scenario_lock_granularity ==
+                          'network'))
+            self.client.add_circuit_listener(self.tenant_queues.resume)
+            proxy_l2 = server_manager.TenantSerializedProxy(
+                proxy_l2, self.tenant_queues)
+            proxy_l3 = server_manager.TenantSerializedProxy(
+                proxy_l3, self.tenant_queues)
         self.callback_proxy = nwa_proxy_callback.NwaProxyCallback(
-            self.context, self.proxy_l2)
+            self.context, proxy_l2)
         self.callback_l3 = nwa_l3_proxy_callback.NwaL3ProxyCallback(
-            self.context, self.proxy_l3)
+            self.context, proxy_l3)
 
         # lbaas
         self.lbaas_driver = None
@@ -119,30 +158,68 @@ class NECNWANeutronAgent(object):
 
         self.conn.consume_in_threads()
 
+        eventlet.spawn_n(self._resume_workflows)
+
         report_interval = cfg.CONF.AGENT.report_interval
         if report_interval:
             heartbeat = loopingcall.FixedIntervalLoopingCall(
                 self._report_state)
             heartbeat.start(interval=report_interval)
 
+    def _hold_tenant_queues(self):
+        return self.resuming or self.client.circuit_open()
+
+    def _resume_workflows(self):
+        """Applies the scenarios left by the previous run.
+
+        The requests for tenants received meanwhile are run afterwards:
+        the RPC servers of tenants are started, and the tenant queues of
+        the multiplexed mode resumed, once it is done.
+        """
+        try:
+            self.client.resume_workflows(functools.partial(
+                self.proxy_l2.apply_resumed_workflow, self.context))
+        except Exception as e:
+            LOG.exception(_LE("Failed resuming NWA workflows: %s"), e)
+        finally:
+            self.resuming = False
+            self.server_manager.release()
+            if self.tenant_queues is not None:
+                self.tenant_queues.resume()
+
     def _report_state(self):
         try:
             queues = self.server_manager.get_rpc_server_topics()
             self.agent_state['configurations']['tenant_queues'] = queues
+            self.agent_state['configurations']['nwa_stats'] = \
+                self.get_stats()
             self.state_rpc.report_state(self.context,
                                         self.agent_state)
             self.agent_state.pop('start_flag', None)
 
             servers = self.server_manager.get_rpc_server_tenant_ids()
             self.nwa_l2_rpc.update_tenant_rpc_servers(
-                self.context, servers
+                self.context, servers,
+                self.server_manager.get_evicted_tenant_ids()
             )
 
         except Exception as e:
             LOG.exception(_LE("Failed reporting state! %s"), e)
 
+    def get_stats(self):
+        """Returns the stats of the agent and of its requests to NWA."""
+        stats = self.client.get_stats()
+        stats['binding_cache'] = self.proxy_tenant.get_binding_cache_stats()
+        if self.tenant_queues is not None:
+            stats['tenant_queues'] = self.tenant_queues.get_stats()
+        if self.warm_pool is not None:
+            stats['warm_pool'] = self.warm_pool.get_stats()
+        return stats
+
     def loop_handler(self):
-        pass
+        self.server_manager.evict_idle_tenant_rpc_servers()
+        if self.warm_pool is not None:
+            self.warm_pool.reap()
 
     def daemon_loop(self):
         """Main processing loop for NECNWA Plugin Agent."""
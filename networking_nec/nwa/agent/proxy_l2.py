@@ -12,9 +12,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import re
-import time
 
+import eventlet
+from eventlet import event
 from neutron.common import topics
 from neutron.plugins.common import constants as plugin_const
 from neutron.plugins.ml2 import driver_api as api
@@ -25,15 +27,20 @@ import six
 from networking_nec._i18n import _LE, _LI, _LW
 from networking_nec.common import utils
 from networking_nec.nwa.agent import proxy_tenant as tenant_util
+from networking_nec.nwa.common import config as nwaconf
 from networking_nec.nwa.common import constants as nwa_const
 from networking_nec.nwa.common import exceptions as nwa_exc
 from networking_nec.nwa.l2.rpc import nwa_l2_server_api
 from networking_nec.nwa.l2.rpc import tenant_binding_api
 from networking_nec.nwa.nwalib import data_utils
+from networking_nec.nwa.nwalib import deadline as nwa_deadline
+from networking_nec.nwa.nwalib import tenant_state
 
 
 LOG = logging.getLogger(__name__)
 
+cfgNWA = nwaconf.cfg.CONF.NWA
+
 KEY_CREATE_TENANT_NW = 'CreateTenantNW'
 WAIT_AGENT_NOTIFIER = 20
 # WAIT_AGENT_NOTIFIER = 1
@@ -43,6 +50,8 @@ def check_vlan(network_id, nwa_data):
     # dev_key = 'VLAN_' + network_id + '_.*_VlanID$'
     #  TFW, GDV: VLAN_' + network_id + '_.*_VlanID$
     #  TLB:      VLAN_LB_' + network_id + '_.*_VlanID$
+    if isinstance(nwa_data, tenant_state.TenantState):
+        return nwa_data.count_vlan_segments(network_id)
     vlan_pat = re.compile(r'VLAN_.*' + network_id + '_.*_VlanID$')
     matched = [k for k in nwa_data if vlan_pat.match(k)]
     if matched:
@@ -51,6 +60,8 @@ def check_vlan(network_id, nwa_data):
 
 
 def count_device_id(device_id, nwa_data):
+    if isinstance(nwa_data, tenant_state.TenantState):
+        return nwa_data.count_device_keys(device_id)
     dev_pat = re.compile(r'DEV_' + device_id + '_')
     matched = [k for k in nwa_data if dev_pat.match(k)]
     if matched:
@@ -59,6 +70,8 @@ def count_device_id(device_id, nwa_data):
 
 
 def check_segment(network_id, res_name, nwa_data, dev_type):
+    if isinstance(nwa_data, tenant_state.TenantState):
+        return nwa_data.count_segment(network_id, res_name, dev_type)
     dev_pat = re.compile(r'DEV_.*_' + network_id + '_' + res_name)
     matched = [k for k in nwa_data
                if dev_pat.match(k) and dev_type == nwa_data[k]]
@@ -86,6 +99,10 @@ def get_resource_group_name(nwa_info, nwa_data, dev_type):
     network_id = nwa_info['network']['id']
     mac = nwa_info['port']['mac']
 
+    if isinstance(nwa_data, tenant_state.TenantState):
+        return nwa_data.get_resource_group_name(device_id, network_id,
+                                                mac, dev_type)
+
     found_mac = None
     found_dev_type = None
     dev_prefix = 'DEV_%s_%s_' % (device_id, network_id)
@@ -108,6 +125,15 @@ class AgentProxyL2(object):
         self.nwa_l2_rpc = nwa_l2_server_api.NwaL2ServerRpcApi(topics.PLUGIN)
         self.agent_top = agent_top
         self.client = client
+        # port_id -> timer of the deferred port state notification
+        self._deferred_notifies = {}
+        # (nwa_tenant_id, None) -> event of the creation or deletion of
+        # the tenant and its tenant network in flight.
+        self._ensuring = {}
+        self.ensure_stats = {
+            'created': 0,
+            'joined': 0,
+        }
 
     @property
     def proxy_tenant(self):
@@ -231,21 +257,9 @@ class AgentProxyL2(object):
 
         return nwa_data
 
-    def _ensure_l2_network(self, context, **kwargs):
+    def _ensure_tenant_nw(self, context, nwa_data, **kwargs):
         tenant_id = kwargs.get('tenant_id')
         nwa_tenant_id = kwargs.get('nwa_tenant_id')
-        nwa_info = kwargs.get('nwa_info')
-        network_id = nwa_info['network']['id']
-
-        LOG.debug("tenant_id=%(tenant_id)s, network_id=%(network_id)s, "
-                  "device_owner=%(device_owner)s",
-                  {'tenant_id': tenant_id,
-                   'network_id': network_id,
-                   'device_owner': nwa_info['device']['owner']})
-
-        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
-            context, tenant_id, nwa_tenant_id
-        )
 
         # create tenant
         if not nwa_data:
@@ -260,6 +274,48 @@ class AgentProxyL2(object):
             # raise AgentProxyException if fail
             self._create_tenant_nw(context, nwa_data=nwa_data, **kwargs)
 
+        return nwa_data
+
+    def _ensure_l2_network(self, context, **kwargs):
+        """Creates the tenant, tenant network and VLAN which are missing.
+
+        The requests of a tenant are run one at a time, but the warm
+        pool creates the tenant and tenant network in the background.
+        A caller which finds it doing so waits for it and reads the
+        binding again, instead of running the same scenarios.
+        """
+        tenant_id = kwargs.get('tenant_id')
+        nwa_tenant_id = kwargs.get('nwa_tenant_id')
+        nwa_info = kwargs.get('nwa_info')
+        network_id = nwa_info['network']['id']
+
+        LOG.debug("tenant_id=%(tenant_id)s, network_id=%(network_id)s, "
+                  "device_owner=%(device_owner)s",
+                  {'tenant_id': tenant_id,
+                   'network_id': network_id,
+                   'device_owner': nwa_info['device']['owner']})
+
+        key = (nwa_tenant_id, None)
+        while True:
+            running = self._ensuring.get(key)
+            if running is not None:
+                self.ensure_stats['joined'] += 1
+                running.wait()
+            nwa_data = self.proxy_tenant.get_tenant_binding(
+                context, tenant_id, nwa_tenant_id
+            )
+            # read again if a warm-up started meanwhile.
+            if key not in self._ensuring:
+                break
+
+        if not nwa_data or KEY_CREATE_TENANT_NW not in nwa_data:
+            with self._in_flight(key):
+                self.ensure_stats['created'] += 1
+                nwa_data = self._ensure_tenant_nw(context, nwa_data,
+                                                  **kwargs)
+            if not nwa_data:
+                return
+
         # create vlan
         nw_vlan_key = data_utils.get_network_key(network_id)
         if nw_vlan_key not in nwa_data:
@@ -268,13 +324,178 @@ class AgentProxyL2(object):
 
         return nwa_data
 
+    @contextlib.contextmanager
+    def _in_flight(self, key):
+        done = event.Event()
+        self._ensuring[key] = done
+        try:
+            yield
+        finally:
+            del self._ensuring[key]
+            done.send()
+
+    def warm_tenant_nw(self, context, tenant_id, nwa_tenant_id,
+                       resource_group_name_nw):
+        """Creates the tenant and tenant network before the first port.
+
+        @param context: contains user information.
+        @param tenant_id: Openstack Tenant UUID
+        @param nwa_tenant_id: NWA Tenand ID
+        @param resource_group_name_nw: resource group of the tenant NW
+        @return: True if they were created by this call.
+        """
+        key = (nwa_tenant_id, None)
+        if key in self._ensuring:
+            return False
+        nwa_data = self.proxy_tenant.get_tenant_binding(
+            context, tenant_id, nwa_tenant_id
+        )
+        # a binding is written by the first port operation of the
+        # tenant, which creates the tenant network itself.
+        if key in self._ensuring or nwa_data:
+            return False
+        nwa_info = {'resource_group_name_nw': resource_group_name_nw}
+        with self._in_flight(key):
+            self.ensure_stats['created'] += 1
+            nwa_data = self._ensure_tenant_nw(
+                context, nwa_data, tenant_id=tenant_id,
+                nwa_tenant_id=nwa_tenant_id, nwa_info=nwa_info)
+            if not nwa_data:
+                return False
+            # the callers waiting for the warm-up read the binding.
+            self.proxy_tenant.update_tenant_binding(
+                context, tenant_id, nwa_tenant_id, nwa_data)
+        return True
+
+    def reap_tenant_nw(self, context, tenant_id, nwa_tenant_id):
+        """Deletes the tenant network and tenant which have no network.
+
+        @param context: contains user information.
+        @param tenant_id: Openstack Tenant UUID
+        @param nwa_tenant_id: NWA Tenand ID
+        @return: True if they were deleted.
+        """
+        key = (nwa_tenant_id, None)
+        if key in self._ensuring:
+            return False
+        # callers of ensure_l2_network wait and read the binding again.
+        with self._in_flight(key):
+            nwa_data = self.proxy_tenant.get_tenant_binding(
+                context, tenant_id, nwa_tenant_id
+            )
+            if not nwa_data or KEY_CREATE_TENANT_NW not in nwa_data:
+                return False
+            if any(re.match('NW_.*', k) for k in nwa_data):
+                return False
+            # raise AgentProxyException if fail
+            nwa_data = self._delete_tenant_nw(
+                context, nwa_data=nwa_data, nwa_tenant_id=nwa_tenant_id)
+            self.proxy_tenant.delete_tenant(
+                context, nwa_data=nwa_data, nwa_tenant_id=nwa_tenant_id)
+            self.proxy_tenant.delete_tenant_binding(
+                context, tenant_id, nwa_tenant_id)
+        return True
+
+    def apply_resumed_workflow(self, context, entry, http_status, body):
+        """Applies a scenario resumed after a restart to the binding.
+
+        The binding is updated for the scenarios whose request and
+        result tell the whole change, and the dynamic segment of a
+        deleted VLAN is released. A VLAN whose CreateVLAN result
+        was lost is deleted again, since the network and subnet it was
+        created for are not in the request; the next port creates it.
+        The results of the other scenarios are only logged, and the
+        next operation on their port repeats them.
+
+        @param context: contains user information.
+        @param entry: journal entry of the execution.
+        @param http_status: HTTP status of the last poll.
+        @param body: result of the execution, None if unknown.
+        @return: True if the binding was updated.
+        """
+        name = entry['name']
+        nwa_tenant_id = entry['tenant_id']
+        request = entry['body'] or {}
+        if not (http_status == 200 and isinstance(body, dict) and
+                body.get('status') == 'SUCCEED'):
+            LOG.warning(_LW("resumed %(name)s did not succeed "
+                            "(nwa_tenant_id=%(nwa_tenant_id)s)"),
+                        {'name': name, 'nwa_tenant_id': nwa_tenant_id})
+            return False
+        region_name = cfgNWA.region_name
+        if not nwa_tenant_id.startswith(region_name):
+            LOG.warning(_LW("resumed %(name)s is not of region %(region)s "
+                            "(nwa_tenant_id=%(nwa_tenant_id)s)"),
+                        {'name': name, 'region': region_name,
+                         'nwa_tenant_id': nwa_tenant_id})
+            return False
+        tenant_id = nwa_tenant_id[len(region_name):]
+        nwa_data = self.proxy_tenant.get_tenant_binding(
+            context, tenant_id, nwa_tenant_id
+        )
+
+        if name == 'CreateTenantNW':
+            if not nwa_data or KEY_CREATE_TENANT_NW in nwa_data:
+                return False
+            nwa_data[KEY_CREATE_TENANT_NW] = True
+        elif name == 'DeleteTenantNW':
+            if KEY_CREATE_TENANT_NW not in nwa_data:
+                return False
+            nwa_data.pop(KEY_CREATE_TENANT_NW)
+        elif name == 'DeleteVLAN':
+            logical_name = request.get('DeleteNW_VlanLogicalName1')
+            network_ids = [k[3:-len('_nwa_network_name')] for k, v
+                           in nwa_data.items()
+                           if k.startswith('NW_') and
+                           k.endswith('_nwa_network_name') and
+                           v == logical_name]
+            if not network_ids:
+                return False
+            data_utils.strip_network_data(nwa_data, network_ids[0])
+            data_utils.strip_vlan_data(nwa_data, network_ids[0])
+            # the physical network is not in the binding; the segment
+            # is looked up by the network only.
+            self.nwa_l2_rpc.release_dynamic_segment_from_agent(
+                context, None, network_ids[0]
+            )
+        elif name == 'CreateVLAN':
+            network_id = request.get('CreateNW_VlanLogicalID1')
+            if network_id and \
+                    data_utils.get_network_key(network_id) in nwa_data:
+                return False
+            LOG.info(_LI("resumed CreateVLAN is deleted "
+                         "(nwa_tenant_id=%(nwa_tenant_id)s, "
+                         "network_id=%(network_id)s)"),
+                     {'nwa_tenant_id': nwa_tenant_id,
+                      'network_id': network_id})
+            self.client.l2.delete_vlan(
+                nwa_tenant_id, body['resultdata']['LogicalNWName'],
+                request.get('CreateNW_VlanType1', 'BusinessVLAN'))
+            return False
+        else:
+            LOG.warning(_LW("resumed %(name)s is not applied to the binding "
+                            "(nwa_tenant_id=%(nwa_tenant_id)s)"),
+                        {'name': name, 'nwa_tenant_id': nwa_tenant_id})
+            return False
+
+        self.proxy_tenant.update_tenant_binding(
+            context, tenant_id, nwa_tenant_id, nwa_data)
+        return True
+
     @helpers.log_method_call
     @tenant_util.catch_exception_and_update_tenant_binding
     def ensure_l2_network(self, context, **kwargs):
-        return self._ensure_l2_network(context, **kwargs)
+        nwa_data = self._ensure_l2_network(context, **kwargs)
+        if not nwa_data:
+            return
+        return self.proxy_tenant.update_tenant_binding(
+            context, kwargs.get('tenant_id'), kwargs.get('nwa_tenant_id'),
+            nwa_data
+        )
 
     @helpers.log_method_call
     @tenant_util.catch_exception_and_update_tenant_binding
+    @nwa_deadline.with_budget(lambda: cfgNWA.port_operation_deadline)
     def create_general_dev(self, context, **kwargs):
         """Create GeneralDev wrapper.
 
@@ -295,6 +516,7 @@ class AgentProxyL2(object):
         resource_group_name = nwa_info['resource_group_name']
 
         # create general dev
+        notify_delay = 0
         if not check_segment_gd(network_id, resource_group_name, nwa_data):
             # raise AgentProxyException if fail
             nwa_data = self._create_general_dev(
@@ -305,7 +527,7 @@ class AgentProxyL2(object):
             if ret_val:
                 nwa_data = ret_val
             # agent waits for notifier issue for libviert.
-            time.sleep(WAIT_AGENT_NOTIFIER)
+            notify_delay = WAIT_AGENT_NOTIFIER
         # create general dev end
 
         ret = self.proxy_tenant.update_tenant_binding(
@@ -321,13 +543,44 @@ class AgentProxyL2(object):
                 nwa_const.NWA_DEVICE_GDV)
         }
 
-        self.nwa_l2_rpc.update_port_state_with_notifier(
-            context, nwa_info['device']['id'], self.agent_top.agent_id,
-            nwa_info['port']['id'], segment, network_id
-        )
+        self._notify_port_state(context, nwa_info, segment, network_id,
+                                notify_delay)
 
         return ret
 
+    def _notify_port_state(self, context, nwa_info, segment, network_id,
+                           delay=0):
+        """Notify the port state to neutron-server.
+
+        A notification with delay is sent from a timer, so that neither
+        the RPC handler nor the tenant waits for it. A notification
+        scheduled again for the same port replaces the pending one.
+        """
+        port_id = nwa_info['port']['id']
+        args = (context, nwa_info['device']['id'], self.agent_top.agent_id,
+                port_id, segment, network_id)
+        self._cancel_port_state_notify(port_id)
+        if delay <= 0:
+            return self.nwa_l2_rpc.update_port_state_with_notifier(*args)
+        self._deferred_notifies[port_id] = eventlet.spawn_after(
+            delay, self._deferred_notify, *args)
+
+    def _cancel_port_state_notify(self, port_id):
+        pending = self._deferred_notifies.pop(port_id, None)
+        if pending is not None:
+            pending.cancel()
+
+    def _deferred_notify(self, context, device_id, agent_id, port_id,
+                         segment, network_id):
+        self._deferred_notifies.pop(port_id, None)
+        try:
+            self.nwa_l2_rpc.update_port_state_with_notifier(
+                context, device_id, agent_id, port_id, segment, network_id)
+        except Exception as e:
+            LOG.error(_LE("update_port_state_with_notifier failed "
+                          "(port_id=%(port_id)s): %(err)s"),
+                      {'port_id': port_id, 'err': e})
+
     def _append_device_for_gdv(self, nwa_info, nwa_data):
         network_id = nwa_info['network']['id']
         device_id = nwa_info['device']['id']
@@ -391,6 +644,7 @@ class AgentProxyL2(object):
 
     @helpers.log_method_call
     @tenant_util.catch_exception_and_update_tenant_binding
+    @nwa_deadline.with_budget(lambda: cfgNWA.port_operation_deadline)
     def delete_general_dev(self, context, **kwargs):
         """Delete GeneralDev.
 
@@ -405,7 +659,10 @@ class AgentProxyL2(object):
         network_id = nwa_info['network']['id']
         resource_group_name = nwa_info['resource_group_name']
 
-        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
+        # the port state of a deleted port is not notified.
+        self._cancel_port_state_notify(nwa_info['port']['id'])
+
+        nwa_data = self.proxy_tenant.get_tenant_binding(
             context, tenant_id, nwa_tenant_id
         )
 
@@ -448,7 +705,7 @@ class AgentProxyL2(object):
     def terminate_l2_network(self, context, **kwargs):
         tenant_id = kwargs.get('tenant_id')
         nwa_tenant_id = kwargs.get('nwa_tenant_id')
-        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
+        nwa_data = self.proxy_tenant.get_tenant_binding(
             context, tenant_id, nwa_tenant_id)
         return self._terminate_l2_network(context, nwa_data, **kwargs)
 
@@ -468,9 +725,13 @@ class AgentProxyL2(object):
         # delete vlan end.
 
         # tenant network check.
-        for k in nwa_data:
-            if re.match('NW_.*', k):
+        if isinstance(nwa_data, tenant_state.TenantState):
+            if nwa_data.has_network():
                 raise nwa_exc.AgentProxyException(value=nwa_data)
+        else:
+            for k in nwa_data:
+                if re.match('NW_.*', k):
+                    raise nwa_exc.AgentProxyException(value=nwa_data)
 
         LOG.info(_LI("delete_tenant_nw"))
         # raise AgentProxyException if fail
@@ -487,7 +748,7 @@ class AgentProxyL2(object):
 
         # delete nwa_tenant binding.
         LOG.info(_LI("delete_nwa_tenant_binding"))
-        return self.nwa_tenant_rpc.delete_nwa_tenant_binding(
+        return self.proxy_tenant.delete_tenant_binding(
             context, tenant_id, nwa_tenant_id
         )
 
@@ -31,6 +31,7 @@ from networking_nec.nwa.l2.rpc import nwa_l2_server_api
 from networking_nec.nwa.l2.rpc import tenant_binding_api
 from networking_nec.nwa.l3.rpc import nwa_l3_server_api
 from networking_nec.nwa.nwalib import data_utils
+from networking_nec.nwa.nwalib import tenant_state
 
 
 LOG = logging.getLogger(__name__)
@@ -66,7 +67,7 @@ class AgentProxyL3(object):
     @helpers.log_method_call
     @tenant_util.catch_exception_and_update_tenant_binding
     def create_tenant_fw(self, context, **kwargs):
-        nwa_data = self.proxy_l2.ensure_l2_network(context, **kwargs)
+        nwa_data = self.proxy_l2._ensure_l2_network(context, **kwargs)
         device_id = kwargs['nwa_info']['device']['id']
         network_id = kwargs['nwa_info']['network']['id']
         dev_key = data_utils.get_device_key(device_id)
@@ -296,13 +297,17 @@ class AgentProxyL3(object):
         network_id = nwa_info['network']['id']
         device_id = nwa_info['device']['id']
 
-        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
+        nwa_data = self.proxy_tenant.get_tenant_binding(
             context, tenant_id, nwa_tenant_id
         )
 
         # check tfw interface
-        tfwif = "^DEV_" + device_id + '_.*_TenantFWName$'
-        count = sum(not re.match(tfwif, k) is None for k in nwa_data.keys())
+        if isinstance(nwa_data, tenant_state.TenantState):
+            count = nwa_data.count_tfw_interfaces(device_id)
+        else:
+            tfwif = "^DEV_" + device_id + '_.*_TenantFWName$'
+            count = sum(not re.match(tfwif, k) is None
+                        for k in nwa_data.keys())
 
         if 1 < count:
             ret_val = self._update_tenant_fw(
@@ -335,7 +340,7 @@ class AgentProxyL3(object):
         nwa_tenant_id = kwargs.get('nwa_tenant_id')
         fip_id = kwargs['floating']['id']
 
-        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
+        nwa_data = self.proxy_tenant.get_tenant_binding(
             context, tenant_id, nwa_tenant_id)
 
         try:
@@ -390,7 +395,7 @@ class AgentProxyL3(object):
         nwa_tenant_id = kwargs.get('nwa_tenant_id')
         fip_id = kwargs['floating']['id']
 
-        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
+        nwa_data = self.proxy_tenant.get_tenant_binding(
             context, tenant_id, nwa_tenant_id)
 
         try:
@@ -12,16 +12,23 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
 from neutron.common import topics
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 
+from networking_nec._i18n import _LI, _LW
 from networking_nec.common import utils
+from networking_nec.nwa.common import config as nwaconf
 from networking_nec.nwa.common import exceptions as nwa_exc
 from networking_nec.nwa.l2.rpc import tenant_binding_api
+from networking_nec.nwa.nwalib import tenant_state
 
 LOG = logging.getLogger(__name__)
 
+cfgNWA = nwaconf.cfg.CONF.NWA
+
 
 def catch_exception_and_update_tenant_binding(method):
 
@@ -38,6 +45,45 @@ def catch_exception_and_update_tenant_binding(method):
     return wrapper
 
 
+class TenantBindingCache(object):
+    """LRU cache of the tenant bindings read and written by the agent.
+
+    Entries are TenantState copies whose version is the version of the
+    binding stored by neutron-server. Callers get a copy of an entry, so
+    that changes which are not written back never reach the cache.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+        }
+
+    def get(self, key):
+        nwa_data = self._entries.pop(key, None)
+        if nwa_data is not None:
+            self._entries[key] = nwa_data
+        return nwa_data
+
+    def put(self, key, nwa_data):
+        self._entries.pop(key, None)
+        self._entries[key] = nwa_data.copy()
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['size'] = len(self._entries)
+        return stats
+
+
 class AgentProxyTenant(object):
 
     def __init__(self, agent_top, client):
@@ -45,6 +91,12 @@ class AgentProxyTenant(object):
         self.client = client
         self.nwa_tenant_rpc = tenant_binding_api.TenantBindingServerRpcApi(
             topics.PLUGIN)
+        self.binding_cache = None
+        # only versioned bindings can be checked with neutron-server.
+        if cfgNWA.tenant_binding_cache_size > 0 and \
+                cfgNWA.tenant_binding_backend == 'document':
+            self.binding_cache = TenantBindingCache(
+                cfgNWA.tenant_binding_cache_size)
 
     @utils.log_method_return_value
     def create_tenant(self, context, **kwargs):
@@ -81,6 +133,56 @@ class AgentProxyTenant(object):
         # and catch the exception in a caller.
         return body
 
+    def get_tenant_binding(self, context, tenant_id, nwa_tenant_id):
+        """Get Tenant Binding from NECNWAL2Plugin.
+
+        @param context: contains user information.
+        @param tenant_id: Openstack Tenant UUID
+        @param nwa_tenant_id: NWA Tenand ID
+        @return: nwa_tenant_binding data as TenantState, or empty if not
+                 found.
+        """
+        if self.binding_cache is not None:
+            return self._get_cached_tenant_binding(
+                context, tenant_id, nwa_tenant_id)
+        nwa_data = self.nwa_tenant_rpc.get_nwa_tenant_binding(
+            context, tenant_id, nwa_tenant_id
+        )
+        if isinstance(nwa_data, dict):
+            return tenant_state.TenantState(nwa_data)
+        return nwa_data
+
+    def _get_cached_tenant_binding(self, context, tenant_id, nwa_tenant_id):
+        key = (tenant_id, nwa_tenant_id)
+        cached = self.binding_cache.get(key)
+        ret = self.nwa_tenant_rpc.get_nwa_tenant_binding_if_modified(
+            context, tenant_id, nwa_tenant_id,
+            cached.version if cached is not None else None
+        )
+        if cached is not None and 'nwa_data' not in ret:
+            self.binding_cache.stats['hits'] += 1
+            return cached.copy()
+        self.binding_cache.stats['misses'] += 1
+        nwa_data = tenant_state.TenantState(ret.get('nwa_data') or {})
+        nwa_data.reset_changes(ret.get('version'))
+        self._cache_tenant_binding(tenant_id, nwa_tenant_id, nwa_data)
+        return nwa_data
+
+    def _cache_tenant_binding(self, tenant_id, nwa_tenant_id, nwa_data):
+        if self.binding_cache is None:
+            return
+        key = (tenant_id, nwa_tenant_id)
+        if isinstance(nwa_data, tenant_state.TenantState) and \
+                nwa_data.version is not None:
+            self.binding_cache.put(key, nwa_data)
+        else:
+            self.binding_cache.invalidate(key)
+
+    def get_binding_cache_stats(self):
+        if self.binding_cache is None:
+            return {}
+        return self.binding_cache.get_stats()
+
     @utils.log_method_return_value
     def update_tenant_binding(
             self, context, tenant_id, nwa_tenant_id,
@@ -101,10 +203,103 @@ class AgentProxyTenant(object):
             sort_keys=True
         ))
         if nwa_created:
+            self._cache_tenant_binding(tenant_id, nwa_tenant_id, None)
             return self.nwa_tenant_rpc.add_nwa_tenant_binding(
                 context, tenant_id, nwa_tenant_id, nwa_data
             )
 
-        return self.nwa_tenant_rpc.set_nwa_tenant_binding(
+        if isinstance(nwa_data, tenant_state.TenantState):
+            ret = self._patch_tenant_binding(
+                context, tenant_id, nwa_tenant_id, nwa_data)
+            if ret.get('status') != 'SUCCESS' and \
+                    nwa_data.version is not None:
+                ret = self._rebase_tenant_binding(
+                    context, tenant_id, nwa_tenant_id, nwa_data)
+            if ret.get('status') == 'SUCCESS':
+                self._cache_tenant_binding(tenant_id, nwa_tenant_id, nwa_data)
+            else:
+                LOG.warning(_LW("patch of nwa_data failed (tid=%s)"),
+                            tenant_id)
+                self._cache_tenant_binding(tenant_id, nwa_tenant_id, None)
+            return ret
+
+        ret = self.nwa_tenant_rpc.set_nwa_tenant_binding(
             context, tenant_id, nwa_tenant_id, nwa_data
         )
+        if isinstance(nwa_data, tenant_state.TenantState) and \
+                isinstance(ret, dict) and ret.get('status') == 'SUCCESS':
+            nwa_data.reset_changes(ret.get('version'))
+            self._cache_tenant_binding(tenant_id, nwa_tenant_id, nwa_data)
+        else:
+            self._cache_tenant_binding(tenant_id, nwa_tenant_id, None)
+        return ret
+
+    def delete_tenant_binding(self, context, tenant_id, nwa_tenant_id):
+        """Delete Tenant Binding on NECNWAL2Plugin.
+
+        @param context: contains user information.
+        @param tenant_id: Openstack Tenant UUID
+        @param nwa_tenant_id: NWA Tenand ID
+        @return: dict of status.
+        """
+        self._cache_tenant_binding(tenant_id, nwa_tenant_id, None)
+        return self.nwa_tenant_rpc.delete_nwa_tenant_binding(
+            context, tenant_id, nwa_tenant_id
+        )
+
+    def _patch_tenant_binding(self, context, tenant_id, nwa_tenant_id,
+                              nwa_data):
+        """Send only the keys changed since nwa_data was read.
+
+        @param nwa_data: TenantState of the tenant.
+        @return: dict of status.
+        """
+        set_items, removed_keys = nwa_data.get_changes()
+        if not set_items and not removed_keys:
+            return {'status': 'SUCCESS'}
+        ret = self.nwa_tenant_rpc.update_nwa_tenant_binding(
+            context, tenant_id, nwa_tenant_id,
+            set_items, removed_keys, nwa_data.version
+        )
+        if not isinstance(ret, dict):
+            return {'status': 'FAILED'}
+        if ret.get('status') == 'SUCCESS':
+            nwa_data.reset_changes(ret.get('version'))
+        return ret
+
+    def _rebase_tenant_binding(self, context, tenant_id, nwa_tenant_id,
+                               nwa_data):
+        """Re-applies the changes of nwa_data on the stored binding.
+
+        Called when the patch of nwa_data is refused. If the binding has
+        been written since nwa_data was read, the changes are applied on
+        the binding read again and patched once more against its
+        version. On success nwa_data becomes the binding written.
+
+        @param nwa_data: TenantState of the tenant.
+        @return: dict of status.
+        """
+        ret = self.nwa_tenant_rpc.get_nwa_tenant_binding_if_modified(
+            context, tenant_id, nwa_tenant_id, None
+        )
+        if not isinstance(ret, dict) or not ret.get('nwa_data') or \
+                ret.get('version') in (None, nwa_data.version):
+            # not a conflict: the binding is gone or refuses the patch.
+            return {'status': 'FAILED'}
+        LOG.info(_LI("nwa_data of tid=%(tid)s updated since version "
+                     "%(base)s, applying the patch on version %(cur)s"),
+                 {'tid': tenant_id, 'base': nwa_data.version,
+                  'cur': ret['version']})
+        set_items, removed_keys = nwa_data.get_changes()
+        current = tenant_state.TenantState(ret['nwa_data'])
+        current.reset_changes(ret['version'])
+        for key in removed_keys:
+            current.pop(key, None)
+        current.update(set_items)
+        ret = self._patch_tenant_binding(
+            context, tenant_id, nwa_tenant_id, current)
+        if ret.get('status') == 'SUCCESS':
+            nwa_data.clear()
+            nwa_data.update(current)
+            nwa_data.reset_changes(current.version)
+        return ret
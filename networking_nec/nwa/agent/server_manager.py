@@ -12,16 +12,392 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import functools
+import time
+
+import eventlet
+from eventlet import event
 from neutron.common import rpc as n_rpc
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_messaging.rpc.server import get_rpc_server
 from oslo_messaging.target import Target
 
-from networking_nec._i18n import _LW
+from networking_nec._i18n import _LE, _LI, _LW
+from networking_nec.nwa.common import config  # noqa
 
 LOG = logging.getLogger(__name__)
 
+MULTIPLEXED = 'multiplexed'
+
+OPERATION_CREATE = 'create'
+OPERATION_DELETE = 'delete'
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+def is_multiplexed():
+    return cfg.CONF.NWA.tenant_queue_mode == MULTIPLEXED
+
+
+class TenantRequest(object):
+    """A request queued for a tenant.
+
+    :param priority: PRIORITY_HIGH is run before PRIORITY_NORMAL.
+    :param conflicts: frozenset of the resources the request works on,
+        e.g. ('network', network_id). A request is run before one queued
+        earlier only if they have no resource in common. None keeps the
+        request in its place in the queue.
+    :param tenant_wide: True if the request may delete the resources of
+        the whole tenant, e.g. DeleteTenantNW when it removes the last
+        port. It is never run before a request queued earlier.
+    """
+
+    def __init__(self, func, args=(), kwargs=None,
+                 priority=PRIORITY_NORMAL, conflicts=None,
+                 tenant_wide=False):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.priority = priority
+        self.conflicts = conflicts
+        self.tenant_wide = tenant_wide
+        # (tid, port_id) of a port operation
+        self.key = None
+        self.submitted = time.time()
+
+
+class TenantQueues(object):
+    """Work queues of tenants run by a bounded green thread pool.
+
+    The requests of a tenant are run one by one, the requests of
+    different tenants run concurrently up to the size of the pool. A
+    queue exists only while its tenant has pending requests.
+
+    With parallel, the requests of a tenant on different networks and
+    devices run concurrently as well, while a tenant-wide request, or
+    one whose resources are unknown, runs alone.
+
+    The next request of a tenant is the one with the best priority among
+    those which can pass the requests queued before them, the oldest
+    first. A request gains a priority level each aging seconds it waits,
+    so that nothing starves.
+
+    The operations on a port which have not started yet are kept in a
+    pending table, so that a create followed by a delete of the same
+    port is never run, and that a repeated operation is run once.
+
+    While hold() returns True, the queues stop before their next request
+    and keep it until resume() is called.
+    """
+
+    def __init__(self, pool_size, hold=None, aging=0, parallel=False):
+        self._pool = eventlet.GreenPool(pool_size)
+        self._hold = hold
+        self._aging = aging
+        self._parallel = parallel
+        self._queues = {}
+        # tid -> requests of the tenant running
+        self._running = {}
+        # tenants whose queue is stopped by hold()
+        self._held = set()
+        # (tid, port_id) -> (operation, request) of the queued operation
+        self._pending = {}
+        self.stats = {
+            'submitted': 0,
+            'max_queues': 0,
+            'elided': 0,
+            'merged': 0,
+            'reordered': 0,
+            'max_wait_time': 0.0,
+            'max_tenant_running': 0,
+        }
+
+    def submit(self, tid, func, *args, **kwargs):
+        self.submit_request(tid, TenantRequest(func, args, kwargs))
+
+    def submit_port_operation(self, tid, port_id, operation, func,
+                              *args, **kwargs):
+        self.submit_request(tid, TenantRequest(func, args, kwargs),
+                            port_id, operation)
+
+    def submit_request(self, tid, request, port_id=None, operation=None):
+        """Queues a request.
+
+        :param port_id: The port of a port operation.
+        :param operation: 'create' or 'delete' for a port operation.
+        """
+        if port_id is None:
+            self._enqueue(tid, request)
+            return
+        key = (tid, port_id)
+        pending = self._pending.get(key)
+        if pending is not None:
+            queued, entry = pending
+            if queued == operation:
+                # the newer arguments replace the queued ones.
+                entry.args = request.args
+                entry.kwargs = request.kwargs
+                self.stats['submitted'] += 1
+                self.stats['merged'] += 1
+                return
+            if queued == OPERATION_CREATE:
+                # the delete is still run: the create may be a rebind of
+                # a port whose GeneralDev was created before.
+                entry.func = None
+                del self._pending[key]
+                self.stats['elided'] += 1
+                LOG.info(_LI("create of port %(port_id)s elided by its "
+                             "delete (tid=%(tid)s)"),
+                         {'port_id': port_id, 'tid': tid})
+        request.key = key
+        self._pending[key] = (operation, request)
+        self._enqueue(tid, request)
+
+    def _enqueue(self, tid, request):
+        self.stats['submitted'] += 1
+        queue = self._queues.get(tid)
+        if queue is None:
+            queue = self._queues[tid] = collections.deque()
+            self._running[tid] = []
+            self.stats['max_queues'] = max(self.stats['max_queues'],
+                                           len(self._queues))
+        queue.append(request)
+        if tid not in self._held:
+            self._dispatch(tid)
+
+    def resume(self):
+        """Restarts the queues stopped by hold()."""
+        held, self._held = self._held, set()
+        for tid in held:
+            self._dispatch(tid)
+
+    @staticmethod
+    def _alone(request):
+        return request.conflicts is None or request.tenant_wide
+
+    def _next(self, queue, running=()):
+        """Returns the request of the queue to run next.
+
+        :param running: The requests of the tenant running.
+        :returns: None if no request can start while they run.
+        """
+        if running and (not self._parallel or
+                        any(self._alone(r) for r in running)):
+            return None
+        now = time.time()
+        best = None
+        best_rank = None
+        # resources of the requests running and passed over
+        passed = set()
+        for request in running:
+            passed.update(request.conflicts)
+        for index, request in enumerate(queue):
+            if request.func is None:
+                # cancelled, it is only removed.
+                return request
+            if self._alone(request):
+                if index == 0:
+                    # it starts once the running requests end.
+                    return None if running else request
+                if request.conflicts is None:
+                    break
+            elif passed.isdisjoint(request.conflicts):
+                aged = (now - request.submitted) / self._aging \
+                    if self._aging > 0 else 0
+                rank = (request.priority - aged, index)
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = request, rank
+            passed.update(request.conflicts)
+        if best is not None and best is not queue[0]:
+            self.stats['reordered'] += 1
+        return best
+
+    def _dispatch(self, tid, worker=False):
+        """Starts the requests of a tenant which can run now.
+
+        A worker of the pool calls it when its request ends, and gets
+        the next request to run itself instead of waiting for the pool.
+        """
+        queue = self._queues[tid]
+        running = self._running[tid]
+        own = None
+        while queue:
+            if self._hold is not None and self._hold():
+                self._held.add(tid)
+                break
+            if own is not None and not self._pool.free():
+                break
+            request = self._next(queue, running)
+            if request is None:
+                break
+            queue.remove(request)
+            if request.key is not None and self._pending.get(
+                    request.key, (None, None))[1] is request:
+                del self._pending[request.key]
+            if request.func is None:
+                continue
+            running.append(request)
+            self.stats['max_tenant_running'] = max(
+                self.stats['max_tenant_running'], len(running))
+            if worker and own is None:
+                own = request
+            else:
+                self._pool.spawn_n(self._run, tid, request)
+        if not queue and not running:
+            del self._queues[tid]
+            del self._running[tid]
+        return own
+
+    def _run(self, tid, request):
+        while request is not None:
+            self.stats['max_wait_time'] = max(
+                self.stats['max_wait_time'],
+                time.time() - request.submitted)
+            try:
+                request.func(*request.args, **request.kwargs)
+            except Exception as e:
+                LOG.exception(_LE("tenant request failed "
+                                  "(tid=%(tid)s): %(err)s"),
+                              {'tid': tid, 'err': e})
+            self._running[tid].remove(request)
+            request = self._dispatch(tid, worker=True)
+
+    def get_stats(self):
+        """Returns the counters of the queues.
+
+        'tenants' gives the depth of the queue of each tenant with
+        pending requests, its running requests, and the wait in seconds
+        of its oldest queued request.
+        """
+        now = time.time()
+        stats = dict(self.stats)
+        stats['queues'] = len(self._queues)
+        stats['pending'] = len(self._pending)
+        stats['held'] = len(self._held)
+        stats['running'] = self._pool.running()
+        stats['tenants'] = {
+            tid: {'depth': len(queue),
+                  'running': len(self._running[tid]),
+                  'oldest_wait': max([now - request.submitted
+                                      for request in queue] or [0])}
+            for tid, queue in self._queues.items()}
+        return stats
+
+
+class TenantSerializedProxy(object):
+    """Runs the methods of a proxy in the queue of the tenant.
+
+    The methods are RPC casts taking tenant_id in kwargs. They return
+    as soon as the request is queued.
+    """
+
+    port_operations = {
+        'create_general_dev': OPERATION_CREATE,
+        'delete_general_dev': OPERATION_DELETE,
+    }
+
+    # requests run before the requests queued earlier they do not
+    # depend on.
+    high_priority = ('delete_general_dev', 'delete_tenant_fw',
+                     'setting_nat', 'delete_nat')
+
+    # requests deleting the tenant NW and the tenant with the last port
+    # of the tenant.
+    tenant_wide = ('delete_general_dev', 'delete_tenant_fw',
+                   'terminate_l2_network')
+
+    def __init__(self, proxy, queues):
+        self._proxy = proxy
+        self._queues = queues
+
+    @staticmethod
+    def _conflicts(kwargs):
+        """Returns the networks and devices a request works on."""
+        nwa_info = kwargs.get('nwa_info') or {}
+        floating = kwargs.get('floating') or {}
+        conflicts = set()
+        for kind, value in (
+                ('network', nwa_info.get('network', {}).get('id')),
+                ('device', nwa_info.get('device', {}).get('id')),
+                ('network', floating.get('floating_network_id')),
+                ('device', floating.get('device_id'))):
+            if value:
+                conflicts.add((kind, value))
+        return frozenset(conflicts) or None
+
+    def __getattr__(self, name):
+        method = getattr(self._proxy, name)
+        operation = self.port_operations.get(name)
+        priority = PRIORITY_HIGH if name in self.high_priority \
+            else PRIORITY_NORMAL
+
+        def submit(context, **kwargs):
+            tid = kwargs.get('tenant_id')
+            port_id = kwargs.get('nwa_info', {}).get('port', {}).get('id')
+            request = TenantRequest(method, (context,), kwargs, priority,
+                                    self._conflicts(kwargs),
+                                    name in self.tenant_wide)
+            if operation and port_id:
+                self._queues.submit_request(tid, request, port_id, operation)
+            else:
+                self._queues.submit_request(tid, request)
+        return submit
+
+
+class HeldProxy(object):
+    """Holds the requests on a proxy while hold returns True.
+
+    The blocking RPC server of a tenant in the per_tenant mode waits
+    here while NWA does not answer, so that the requests left on the
+    topic of the tenant run in order afterwards instead of failing.
+    """
+
+    def __init__(self, proxy, hold):
+        self._proxy = proxy
+        self._hold = hold
+        self._resumed = event.Event()
+
+    def resume(self):
+        """Runs the held requests."""
+        resumed, self._resumed = self._resumed, event.Event()
+        resumed.send()
+
+    def __getattr__(self, name):
+        method = getattr(self._proxy, name)
+
+        def wait(context, **kwargs):
+            while self._hold():
+                self._resumed.wait()
+            return method(context, **kwargs)
+        return wait
+
+
+class TenantTrackingProxy(object):
+    """Records the requests of tenants running on a proxy.
+
+    ServerManager does not stop the RPC server of a tenant while one of
+    its requests is running, and measures idleness from the last one.
+    """
+
+    def __init__(self, proxy, server_manager):
+        self._proxy = proxy
+        self._server_manager = server_manager
+
+    def __getattr__(self, name):
+        method = getattr(self._proxy, name)
+
+        def track(context, **kwargs):
+            tid = kwargs.get('tenant_id')
+            self._server_manager.enter(tid)
+            try:
+                return method(context, **kwargs)
+            finally:
+                self._server_manager.leave(tid)
+        return track
+
 
 class ServerManager(object):
     """Implementation of nwa_agent_callback.NwaAgentRpcCallback."""
@@ -32,6 +408,80 @@ class ServerManager(object):
         super(ServerManager, self).__init__()
         self.topic = topic
         self.agent_top = agent_top
+        # tid -> time of the end of the last request
+        self.last_used = {}
+        # tid -> number of running requests
+        self.in_flight = collections.Counter()
+        # tenants whose server was stopped for idleness
+        self.evicted = set()
+        # tid -> functions run by release(), None unless held
+        self._deferred = None
+
+    def enter(self, tid):
+        self.in_flight[tid] += 1
+
+    def leave(self, tid):
+        self.in_flight[tid] -= 1
+        if self.in_flight[tid] <= 0:
+            del self.in_flight[tid]
+        self.last_used[tid] = time.time()
+
+    def hold(self):
+        """Defers starting the servers created until release().
+
+        The tenant warm-ups are deferred as well.
+        """
+        if self._deferred is None:
+            self._deferred = collections.OrderedDict()
+
+    def release(self):
+        """Starts the servers created since hold()."""
+        deferred, self._deferred = self._deferred, None
+        for funcs in (deferred or {}).values():
+            for func in funcs:
+                func()
+
+    def _start(self, tid, func):
+        if self._deferred is None:
+            func()
+        else:
+            self._deferred.setdefault(tid, []).append(func)
+
+    def get_evicted_tenant_ids(self):
+        return sorted(self.evicted)
+
+    def activate_tenant_rpc_server(self, tid):
+        """Creates the rpc server of the tenant unless it is running.
+
+        @param tid: openstack tenant id
+        """
+        if tid in self.rpc_servers:
+            self.last_used[tid] = time.time()
+            return {'result': 'SUCCESS', 'tenant_id': tid,
+                    'topic': self.rpc_servers[tid]['topic']}
+        LOG.info(_LI("RPC server re-activated (tid=%s)"), tid)
+        return self.create_tenant_rpc_server(tid)
+
+    def evict_idle_tenant_rpc_servers(self, now=None):
+        """Stops the rpc servers of tenants without recent requests."""
+        timeout = cfg.CONF.NWA.tenant_rpc_server_idle_timeout
+        if timeout <= 0:
+            return []
+        if now is None:
+            now = time.time()
+        evicted = []
+        for tid in list(self.rpc_servers):
+            if self.in_flight.get(tid):
+                continue
+            if now - self.last_used.get(tid, now) < timeout:
+                continue
+            self.delete_tenant_rpc_server(tid)
+            self.evicted.add(tid)
+            evicted.append(tid)
+        if evicted:
+            LOG.info(_LI("RPC servers of idle tenants stopped: %s"),
+                     evicted)
+        return evicted
 
     def get_rpc_server_topics(self):
         return [v['topic'] for v in self.rpc_servers.values()]
@@ -39,10 +489,12 @@ class ServerManager(object):
     def get_rpc_server_tenant_ids(self):
         return [{'tenant_id': tid} for tid in self.rpc_servers]
 
-    def create_tenant_rpc_server(self, tid):
+    def create_tenant_rpc_server(self, tid, new_tenant=False):
         """create_ blocking rpc server
 
         @param tid: openstack tenant id
+        @param new_tenant: True on the first creation of the queue of
+                           the tenant, whose NWA tenant is then warmed.
         """
         ret = {}
 
@@ -53,6 +505,20 @@ class ServerManager(object):
             )
             return {'result': 'FAILED'}
 
+        self.evicted.discard(tid)
+        self.last_used[tid] = time.time()
+        if new_tenant and self.agent_top.warm_pool is not None:
+            self._start(tid, functools.partial(
+                self.agent_top.warm_pool.warm, tid))
+        if is_multiplexed():
+            # requests of the tenant come on the topic of the agent.
+            self.rpc_servers[tid] = {
+                'server': None,
+                'topic': self.topic
+            }
+            return {'result': 'SUCCESS', 'tenant_id': tid,
+                    'topic': self.topic}
+
         topic = "%s-%s" % (self.topic, tid)
 
         target = Target(
@@ -73,7 +539,7 @@ class ServerManager(object):
 
         LOG.debug("RPCServer create: topic=%s", topic)
 
-        self.rpc_servers[tid]['server'].start()
+        self._start(tid, self.rpc_servers[tid]['server'].start)
 
         ret['result'] = 'SUCCESS'
         ret['tenant_id'] = tid
@@ -86,8 +552,15 @@ class ServerManager(object):
             LOG.warning(_LW("rpc server not found. tid=%s"), tid)
             return {'result': 'FAILED'}
 
-        self.rpc_servers[tid]['server'].stop()
+        deferred = None
+        if self._deferred is not None:
+            deferred = self._deferred.pop(tid, None)
+        # a server still held has not been started.
+        if self.rpc_servers[tid]['server'] is not None and deferred is None:
+            self.rpc_servers[tid]['server'].stop()
         self.rpc_servers.pop(tid)
+        self.last_used.pop(tid, None)
+        self.evicted.discard(tid)
 
         ret = {
             'result': 'SUCCESS',
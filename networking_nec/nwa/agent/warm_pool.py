@@ -0,0 +1,102 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import eventlet
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from networking_nec._i18n import _LI, _LW
+from networking_nec.nwa.common import utils as nwa_com_utils
+
+LOG = logging.getLogger(__name__)
+
+
+class TenantWarmPool(object):
+    """Creates the NWA tenant and tenant network of new tenants.
+
+    The tenants whose queue is started are warmed in the background, so
+    that their first port does not wait for CreateTenant and
+    CreateTenantNW. A warmed tenant which has got no network after ttl
+    seconds is deleted from NWA again.
+    """
+
+    def __init__(self, agent_top, pool_size, ttl):
+        self.agent_top = agent_top
+        self.ttl = ttl
+        self._pool = eventlet.GreenPool(pool_size)
+        # tid -> time the tenant was warmed
+        self.warmed = {}
+        self.stats = {
+            'warmed': 0,
+            'failed': 0,
+            'reaped': 0,
+        }
+
+    def warm(self, tid):
+        self._pool.spawn_n(self._warm, tid)
+
+    def _warm(self, tid):
+        nwa_tenant_id = nwa_com_utils.get_nwa_tenant_id(tid)
+        try:
+            created = self.agent_top.proxy_l2.warm_tenant_nw(
+                self.agent_top.context, tid, nwa_tenant_id,
+                cfg.CONF.NWA.resource_group_name)
+        except Exception as e:
+            self.stats['failed'] += 1
+            LOG.warning(_LW("tenant warm-up failed (tid=%(tid)s): "
+                            "%(err)s"), {'tid': tid, 'err': e})
+            return
+        if created:
+            LOG.info(_LI("tenant warmed (tid=%s)"), tid)
+            self.warmed[tid] = time.time()
+            self.stats['warmed'] += 1
+
+    def reap(self, now=None):
+        """Deletes the warmed tenants which are still unused.
+
+        :returns: list of the tenant ids being reaped.
+        """
+        if self.ttl <= 0:
+            return []
+        if now is None:
+            now = time.time()
+        reaped = []
+        for tid, warmed in list(self.warmed.items()):
+            if now - warmed < self.ttl:
+                continue
+            if self.agent_top.server_manager.in_flight.get(tid):
+                continue
+            del self.warmed[tid]
+            reaped.append(tid)
+            self._pool.spawn_n(self._reap, tid)
+        return reaped
+
+    def _reap(self, tid):
+        nwa_tenant_id = nwa_com_utils.get_nwa_tenant_id(tid)
+        try:
+            if self.agent_top.proxy_l2.reap_tenant_nw(
+                    self.agent_top.context, tid, nwa_tenant_id):
+                LOG.info(_LI("unused warmed tenant deleted (tid=%s)"), tid)
+                self.stats['reaped'] += 1
+        except Exception as e:
+            LOG.warning(_LW("unused warmed tenant not deleted "
+                            "(tid=%(tid)s): %(err)s"), {'tid': tid, 'err': e})
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['unused'] = len(self.warmed)
+        stats['running'] = self._pool.running()
+        return stats
@@ -30,10 +30,64 @@ config.register_agent_state_opts_helper(cfg.CONF)
 NWA_opts = [
     cfg.StrOpt('server_url',
                help=_("URL for NWA REST API.")),
+    cfg.ListOpt('server_urls', default=[],
+                help=_("URLs for NWA REST API of the nodes of an NWA "
+                       "cluster. Requests are spread over the nodes "
+                       "which answer, and the workflow instance requests "
+                       "of a scenario are sent to the node which started "
+                       "it. Overrides server_url when specified.")),
+    cfg.IntOpt('endpoint_failure_threshold', default=3,
+               help=_("Number of failed requests in a row after which a "
+                      "node of server_urls is no longer used until it "
+                      "answers a probe.")),
+    cfg.IntOpt('endpoint_probe_interval', default=10,
+               help=_("Seconds between the probes of the nodes of "
+                      "server_urls which are no longer used.")),
+    cfg.IntOpt('http_connect_timeout', default=10,
+               help=_("Seconds to wait for the connection to NWA. 0 "
+                      "waits forever.")),
+    cfg.IntOpt('http_read_timeout', default=60,
+               help=_("Seconds to wait for each read of a response of "
+                      "NWA. 0 waits forever.")),
+    cfg.IntOpt('port_operation_deadline', default=0,
+               help=_("Seconds within which the agent creates or deletes "
+                      "a port in NWA, including the wait for the tenant "
+                      "lock, the tenant network and VLAN it creates or "
+                      "deletes on the way, and the polling of their "
+                      "scenarios. The HTTP timeouts are cut to the time "
+                      "left, a scenario still running at the deadline is "
+                      "stopped and no request is sent after it. 0 means "
+                      "no deadline.")),
+    cfg.IntOpt('circuit_breaker_threshold', default=0,
+               help=_("Number of failed requests to NWA in a row after "
+                      "which the requests fail without being sent, until "
+                      "NWA answers a probe again. The requests of tenants "
+                      "which have not started wait until then, in the "
+                      "queues of the multiplexed tenant_queue_mode or on "
+                      "the topics of the per_tenant one. 0 disables the "
+                      "circuit breaker.")),
+    cfg.IntOpt('circuit_breaker_reset_timeout', default=30,
+               help=_("Seconds between the probes of NWA while the "
+                      "requests fail fast.")),
+    cfg.DictOpt('read_cache_ttls', default={},
+                help=_("Seconds the responses of NWA read APIs are cached, "
+                       "by API: dcresource_groups, reserveddcresource and "
+                       "workflow_list, e.g. dcresource_groups:300,"
+                       "reserveddcresource:30. The reserved resources of a "
+                       "tenant are dropped from the cache when a scenario "
+                       "of the tenant is run. Concurrent identical "
+                       "requests share one request to NWA whether cached "
+                       "or not.")),
     cfg.StrOpt('access_key_id',
                help=_("Access ID for NWA REST API.")),
     cfg.StrOpt('secret_access_key',
                help=_("Secret key for NWA REST API.")),
+    cfg.IntOpt('http_pool_maxsize', default=10,
+               help=_("Number of keep-alive HTTP connections kept "
+                      "for each NWA endpoint.")),
+    cfg.IntOpt('http_pool_idle_timeout', default=30,
+               help=_("Seconds after which an idle HTTP session to NWA "
+                      "is closed and re-created. 0 means never.")),
     cfg.StrOpt('resource_group_name',
                help=_(
                    "Resouce Group Name specified at creating tenant NW.")),
@@ -46,6 +100,68 @@ NWA_opts = [
                help=_("Timer value for polling scenario status.")),
     cfg.IntOpt('scenario_polling_count', default=6,
                help=_("Count value for polling scenario status.")),
+    cfg.DictOpt('scenario_deadlines', default={},
+                help=_("Seconds after which a scenario still running is "
+                       "stopped, by scenario name, e.g. "
+                       "CreateGeneralDev:120,CreateTenantFW:300. The "
+                       "other scenarios are stopped when the polling by "
+                       "scenario_polling_timer and scenario_polling_count "
+                       "gives up.")),
+    cfg.IntOpt('scenario_stop_polling_count', default=3,
+               help=_("Count value for polling the status of a stopped "
+                      "scenario.")),
+    cfg.BoolOpt('scenario_polling_adaptive', default=False,
+                help=_("Schedule scenario status polling from the "
+                       "completion times observed for each scenario "
+                       "instead of the fixed polling timers.")),
+    cfg.IntOpt('scenario_polling_history', default=100,
+               help=_("Number of completion times kept for each "
+                      "scenario by adaptive polling.")),
+    cfg.IntOpt('scenario_polling_min_samples', default=10,
+               help=_("Number of completion times required before "
+                      "adaptive polling is used for a scenario.")),
+    cfg.IntOpt('scenario_queue_aging', default=30,
+               help=_("Seconds of waiting in the queue of a tenant after "
+                      "which a request is raised by one priority level. "
+                      "With the 'multiplexed' tenant_queue_mode, NAT "
+                      "changes are run before the requests queued earlier "
+                      "on other networks and devices, while port and "
+                      "tenant FW deletions, which may delete the tenant, "
+                      "are never run before them. 0 disables the "
+                      "aging.")),
+    cfg.StrOpt('scenario_lock_granularity', default='network',
+               choices=['tenant', 'network'],
+               help=_("Scope of the lock taken while a scenario runs. "
+                      "'tenant' runs one scenario at a time per tenant. "
+                      "'network' runs the scenarios on different networks "
+                      "and devices of a tenant in parallel, while "
+                      "CreateTenantNW and DeleteTenantNW run alone. With "
+                      "the 'multiplexed' tenant_queue_mode, the requests "
+                      "of a tenant on different networks and devices are "
+                      "then run in parallel as well; with 'per_tenant', "
+                      "the RPC server of a tenant still passes its "
+                      "requests one at a time.")),
+    cfg.StrOpt('workflow_journal_file',
+               help=_("SQLite file in which the agent records the "
+                      "scenario executions it is waiting for, so that "
+                      "it resumes them and applies their results to the "
+                      "tenant bindings after a restart. Empty disables "
+                      "the journal.")),
+    cfg.StrOpt('workflow_list_cache_file',
+               help=_("File in which the agent saves the scenario ids "
+                      "read from NWA, so that it uses them as soon as it "
+                      "starts, before it reads them from NWA again. Empty "
+                      "uses the default scenario ids until then.")),
+    cfg.IntOpt('workflow_list_refresh_interval', default=3600,
+               help=_("Seconds between the reads of the scenario ids "
+                      "from NWA, which run in the background. 0 reads "
+                      "them once at start.")),
+    cfg.IntOpt('workflow_list_wait', default=30,
+               help=_("Seconds a scenario waits at most, after the agent "
+                      "starts, for the scenario ids to be read from NWA "
+                      "or from workflow_list_cache_file. It is sent with "
+                      "the default scenario ids after that. 0 does not "
+                      "wait.")),
     cfg.StrOpt('ironic_az_prefix',
                help=_("The prefix name of device_owner used in ironic"),
                default='BM_'),
@@ -68,6 +184,58 @@ NWA_opts = [
            },
            { ... },
         ]""")),
+    cfg.StrOpt('tenant_binding_backend', default='key_value',
+               choices=['key_value', 'document'],
+               help=_("Storage of the NWA tenant bindings. 'key_value' "
+                      "stores a row per key in nwa_tenant_key_value, "
+                      "'document' stores a JSON document per tenant in "
+                      "nwa_tenant_binding. Existing bindings are converted "
+                      "by the database migration, so the backend should "
+                      "be switched right after the upgrade. Only "
+                      "'document' versions the bindings, so that an "
+                      "update of the agent made on an outdated binding "
+                      "is detected and applied again.")),
+    cfg.IntOpt('tenant_binding_cache_size', default=0,
+               help=_("Number of tenant bindings cached by the agent. "
+                      "A cached binding is used after checking its version "
+                      "with neutron-server, so the cache is used only "
+                      "with the 'document' tenant_binding_backend. "
+                      "0 disables the cache.")),
+    cfg.StrOpt('tenant_queue_mode', default='per_tenant',
+               choices=['per_tenant', 'multiplexed'],
+               help=_("How the agent receives the requests for tenants. "
+                      "'per_tenant' starts an RPC server on topic "
+                      "nwa_agent-<tenant_id> for each tenant. "
+                      "'multiplexed' receives them on the agent topic and "
+                      "runs them in a serial queue for each tenant. "
+                      "neutron-server and the agent must use the same "
+                      "mode.")),
+    cfg.IntOpt('tenant_queue_workers', default=16,
+               help=_("Number of requests of tenants processed "
+                      "concurrently in the multiplexed mode.")),
+    cfg.IntOpt('tenant_rpc_server_idle_timeout', default=0,
+               help=_("Seconds without request after which the agent "
+                      "stops the RPC server of a tenant. neutron-server "
+                      "re-activates it before sending the next request. "
+                      "neutron-server and the agent must use the same "
+                      "value. 0 means never.")),
+    cfg.BoolOpt('tenant_warm_pool', default=False,
+                help=_("Create the NWA tenant and its tenant network in "
+                       "the background as soon as the agent starts the "
+                       "queue of a tenant, instead of on its first port.")),
+    cfg.IntOpt('tenant_warm_pool_workers', default=4,
+               help=_("Number of tenants warmed concurrently.")),
+    cfg.IntOpt('tenant_warm_pool_ttl', default=3600,
+               help=_("Seconds after which a warmed tenant which has no "
+                      "network yet is deleted from NWA. 0 means never.")),
+    cfg.StrOpt('l2_network_prewarm', default='none',
+               choices=['none', 'business', 'all'],
+               help=_("Networks for which the tenant, tenant network and "
+                      "VLAN are created in NWA when a subnet is created, "
+                      "instead of when their first port is bound. 'none' "
+                      "waits for the first port, 'business' pre-creates "
+                      "them for the networks which are not external, 'all' "
+                      "for every network.")),
     cfg.StrOpt('lbaas_driver',
                help=_("LBaaS Driver Name")),
     cfg.StrOpt('fwaas_driver',
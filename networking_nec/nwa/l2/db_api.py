@@ -13,18 +13,25 @@
 #    under the License.
 
 from neutron.plugins.ml2 import models as models_ml2
+from oslo_serialization import jsonutils
+import six
 import sqlalchemy as sa
 from sqlalchemy import and_
+from sqlalchemy.dialects import postgresql
 
+from networking_nec.nwa.common import config as nwaconf
 from networking_nec.nwa.l2 import models as nmodels
 
+cfgNWA = nwaconf.cfg.CONF.NWA
+
 
 class NWATenantBinding(object):
     """Relation between OpenStack Tenant ID and NWA Tenant ID."""
-    def __init__(self, tenant_id, nwa_tenant_id, value_json):
+    def __init__(self, tenant_id, nwa_tenant_id, value_json, version=None):
         self.tenant_id = tenant_id
         self.nwa_tenant_id = nwa_tenant_id
         self.value_json = value_json
+        self.version = version
 
     def __repr__(self):
         return "<TenantBinding(%s,%s,%s)>" % (
@@ -32,7 +39,14 @@ class NWATenantBinding(object):
         )
 
 
+def _use_document():
+    return cfgNWA.tenant_binding_backend == 'document'
+
+
 def add_nwa_tenant_binding(session, tenant_id, nwa_tenant_id, json_value):
+    if _use_document():
+        return _add_nwa_tenant_binding_document(
+            session, tenant_id, nwa_tenant_id, json_value)
     try:
         if not isinstance(json_value, dict):
             return False
@@ -59,6 +73,9 @@ def convert_if_special_value(s):
 
 
 def get_nwa_tenant_binding(session, tenant_id, nwa_tenant_id):
+    if _use_document():
+        return _get_nwa_tenant_binding_document(
+            session, tenant_id, nwa_tenant_id)
     try:
         value_json = {
             nwa.json_key: convert_if_special_value(nwa.json_value)
@@ -76,6 +93,9 @@ def get_nwa_tenant_binding(session, tenant_id, nwa_tenant_id):
 
 
 def set_nwa_tenant_binding(session, tenant_id, nwa_tenant_id, value_json):
+    if _use_document():
+        return _set_nwa_tenant_binding_document(
+            session, tenant_id, nwa_tenant_id, value_json)
     item = get_nwa_tenant_binding(session, tenant_id, nwa_tenant_id)
     if not item:
         return False
@@ -85,37 +105,137 @@ def set_nwa_tenant_binding(session, tenant_id, nwa_tenant_id, value_json):
     if not isinstance(value_json, dict):
         return False
     with session.begin(subtransactions=True):
-        for key, value in value_json.items():
-            if key in _json:
-                if value != _json[key]:
-                    # update
-                    item = session.query(nmodels.NWATenantKeyValue).filter(
+        _apply_key_value_changes(
+            session, tenant_id, nwa_tenant_id, _json, value_json,
+            [key for key in _json if key not in value_json])
+    return True
+
+
+def update_nwa_tenant_binding(session, tenant_id, nwa_tenant_id,
+                              set_items, removed_keys, base_version=None):
+    """Applies a patch to the nwa_data of a tenant.
+
+    :param set_items: dict of the keys to add or to update.
+    :param removed_keys: list of the keys to remove.
+    :param base_version: The version the patch was made against. The
+        patch is refused if the binding has been updated since. Only the
+        document backend checks it: the key/value backend keeps no
+        version, get_nwa_tenant_binding_version returns None for it and
+        its patches are applied key by key whatever was read before.
+    :returns: True if the patch is applied.
+    """
+    if not isinstance(set_items, dict):
+        return False
+    if _use_document():
+        return _update_nwa_tenant_binding_document(
+            session, tenant_id, nwa_tenant_id, set_items, removed_keys,
+            base_version)
+    with session.begin(subtransactions=True):
+        if not session.query(nmodels.NWATenantKeyValue.json_key).filter(
+                nmodels.NWATenantKeyValue.tenant_id == tenant_id).filter(
+                    nmodels.NWATenantKeyValue.nwa_tenant_id ==
+                    nwa_tenant_id).first():
+            return False
+        old = {}
+        if set_items:
+            old = {
+                row.json_key: convert_if_special_value(row.json_value)
+                for row in session.query(
+                    nmodels.NWATenantKeyValue.json_key,
+                    nmodels.NWATenantKeyValue.json_value).filter(
                         and_(nmodels.NWATenantKeyValue.tenant_id == tenant_id,
-                             nmodels.NWATenantKeyValue.json_key == key)).one()
-                    item.json_value = value
-            else:
-                # insert
-                # item = nmodels.NWATenantKeyValue(
-                #        tenant_id, nwa_tenant_id, key, value)
-                # session.add(item)
-                insert = ("INSERT INTO nwa_tenant_key_value (tenant_id,"
-                          "nwa_tenant_id,json_key,json_value) "
-                          " VALUES (\'%s\',\'%s\',\'%s\',\'%s\') "
-                          "ON DUPLICATE KEY UPDATE "
-                          " json_value=\'%s\'" % (tenant_id, nwa_tenant_id,
-                                                  key, value, value))
-                session.execute(insert)
-        for key, value in _json.items():
-            if key not in value_json:
-                # delete
-                item = session.query(nmodels.NWATenantKeyValue).filter(
-                    and_(nmodels.NWATenantKeyValue.tenant_id == tenant_id,
-                         nmodels.NWATenantKeyValue.json_key == key)).one()
-                session.delete(item)
+                             nmodels.NWATenantKeyValue.json_key.in_(
+                                 list(set_items))))
+            }
+        _apply_key_value_changes(session, tenant_id, nwa_tenant_id, old,
+                                 set_items, list(removed_keys or []))
     return True
 
 
+def get_nwa_tenant_binding_version(session, tenant_id, nwa_tenant_id):
+    """Returns the version of the binding, None if it is not versioned."""
+    if not _use_document():
+        return None
+    row = session.query(nmodels.NWATenantBindingDocument.version).filter(
+        nmodels.NWATenantBindingDocument.tenant_id == tenant_id).filter(
+            nmodels.NWATenantBindingDocument.nwa_tenant_id ==
+            nwa_tenant_id).first()
+    return row.version if row else None
+
+
+def _apply_key_value_changes(session, tenant_id, nwa_tenant_id, old,
+                             set_items, removed_keys):
+    """Writes the changes with at most one statement of each kind.
+
+    :param old: dict of the stored values of (at least) the keys of
+        set_items which exist.
+    """
+    table = nmodels.NWATenantKeyValue.__table__
+    inserts = []
+    updates = []
+    for key, value in set_items.items():
+        if key not in old:
+            inserts.append({'tenant_id': tenant_id,
+                            'nwa_tenant_id': nwa_tenant_id,
+                            'json_key': key,
+                            'json_value': _normalize_key_value(value)})
+        elif value != old[key]:
+            updates.append({'b_json_key': key,
+                            'b_json_value': _normalize_key_value(value)})
+    if inserts:
+        session.execute(_upsert_key_value(session, table), inserts)
+    if updates:
+        session.execute(
+            table.update().where(
+                and_(table.c.tenant_id == tenant_id,
+                     table.c.json_key == sa.bindparam('b_json_key'))
+            ).values(json_value=sa.bindparam('b_json_value')),
+            updates)
+    if removed_keys:
+        session.query(nmodels.NWATenantKeyValue).filter(
+            and_(nmodels.NWATenantKeyValue.tenant_id == tenant_id,
+                 nmodels.NWATenantKeyValue.json_key.in_(removed_keys))
+        ).delete(synchronize_session=False)
+
+
+def _normalize_key_value(value):
+    # bound as is by executemany, so it has to be a string already.
+    if value is None:
+        return ''
+    return six.text_type(value)
+
+
+_MYSQL_UPSERT = sa.text(
+    "INSERT INTO nwa_tenant_key_value "
+    "(tenant_id, nwa_tenant_id, json_key, json_value) "
+    "VALUES (:tenant_id, :nwa_tenant_id, :json_key, :json_value) "
+    "ON DUPLICATE KEY UPDATE json_value = VALUES(json_value)")
+
+
+def _upsert_key_value(session, table):
+    """Returns the statement to insert rows of nwa_tenant_key_value.
+
+    The keys are new as far as the preceding read can tell, but a row
+    written concurrently by another server must be overwritten rather
+    than failing the whole batch.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == 'mysql':
+        return _MYSQL_UPSERT
+    if dialect == 'postgresql' and hasattr(postgresql, 'insert'):
+        stmt = postgresql.insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.tenant_id, table.c.json_key],
+            set_={'json_value': stmt.excluded.json_value})
+    if dialect == 'sqlite':
+        return table.insert().prefix_with('OR REPLACE')
+    return table.insert()
+
+
 def del_nwa_tenant_binding(session, tenant_id, nwa_tenant_id):
+    if _use_document():
+        return _del_nwa_tenant_binding_document(
+            session, tenant_id, nwa_tenant_id)
     try:
         with session.begin(subtransactions=True):
             item = get_nwa_tenant_binding(session, tenant_id, nwa_tenant_id)
@@ -131,6 +251,110 @@ def del_nwa_tenant_binding(session, tenant_id, nwa_tenant_id):
         return False
 
 
+# nwa_tenant_binding: the whole nwa_data of a tenant in one row.
+
+def _normalize_value(value):
+    # the same values as read back from nwa_tenant_key_value.
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return value
+    return six.text_type(value)
+
+
+def _dump_document(value_json):
+    return jsonutils.dumps({k: _normalize_value(v)
+                            for k, v in value_json.items()},
+                           sort_keys=True)
+
+
+def _load_document(doc):
+    value_json = jsonutils.loads(doc)
+    return {k: convert_if_special_value(v) for k, v in value_json.items()}
+
+
+def _add_nwa_tenant_binding_document(session, tenant_id, nwa_tenant_id,
+                                     value_json):
+    if not isinstance(value_json, dict):
+        return False
+    with session.begin(subtransactions=True):
+        if session.query(nmodels.NWATenantBindingDocument).filter(
+                nmodels.NWATenantBindingDocument.tenant_id ==
+                tenant_id).first():
+            return False
+        session.add(nmodels.NWATenantBindingDocument(
+            tenant_id, nwa_tenant_id, _dump_document(value_json)))
+    return True
+
+
+def _get_nwa_tenant_binding_document(session, tenant_id, nwa_tenant_id):
+    doc = session.query(nmodels.NWATenantBindingDocument).filter(
+        nmodels.NWATenantBindingDocument.tenant_id == tenant_id).filter(
+            nmodels.NWATenantBindingDocument.nwa_tenant_id ==
+            nwa_tenant_id).first()
+    if doc is None:
+        return None
+    value_json = _load_document(doc.value_json)
+    if not value_json:
+        return None
+    return NWATenantBinding(tenant_id, nwa_tenant_id, value_json,
+                            version=doc.version)
+
+
+def _set_nwa_tenant_binding_document(session, tenant_id, nwa_tenant_id,
+                                     value_json):
+    if not isinstance(value_json, dict):
+        return False
+    with session.begin(subtransactions=True):
+        updated = session.query(nmodels.NWATenantBindingDocument).filter(
+            nmodels.NWATenantBindingDocument.tenant_id == tenant_id).filter(
+                nmodels.NWATenantBindingDocument.nwa_tenant_id ==
+                nwa_tenant_id).update(
+                    {'value_json': _dump_document(value_json),
+                     'version':
+                     nmodels.NWATenantBindingDocument.version + 1},
+                    synchronize_session=False)
+    return updated > 0
+
+
+def _update_nwa_tenant_binding_document(session, tenant_id, nwa_tenant_id,
+                                        set_items, removed_keys,
+                                        base_version):
+    with session.begin(subtransactions=True):
+        doc = session.query(
+            nmodels.NWATenantBindingDocument.value_json,
+            nmodels.NWATenantBindingDocument.version).filter(
+                nmodels.NWATenantBindingDocument.tenant_id ==
+                tenant_id).filter(
+                    nmodels.NWATenantBindingDocument.nwa_tenant_id ==
+                    nwa_tenant_id).first()
+        if doc is None:
+            return False
+        if base_version is not None and doc.version != base_version:
+            return False
+        value_json = jsonutils.loads(doc.value_json)
+        for key in removed_keys or []:
+            value_json.pop(key, None)
+        value_json.update(set_items)
+        updated = session.query(nmodels.NWATenantBindingDocument).filter(
+            nmodels.NWATenantBindingDocument.tenant_id == tenant_id).filter(
+                nmodels.NWATenantBindingDocument.version ==
+                doc.version).update(
+                    {'value_json': _dump_document(value_json),
+                     'version': doc.version + 1},
+                    synchronize_session=False)
+    return updated > 0
+
+
+def _del_nwa_tenant_binding_document(session, tenant_id, nwa_tenant_id):
+    with session.begin(subtransactions=True):
+        deleted = session.query(nmodels.NWATenantBindingDocument).filter(
+            nmodels.NWATenantBindingDocument.tenant_id == tenant_id).filter(
+                nmodels.NWATenantBindingDocument.nwa_tenant_id ==
+                nwa_tenant_id).delete(synchronize_session=False)
+    return deleted > 0
+
+
 def ensure_port_binding(session, port_id):
 
     with session.begin(subtransactions=True):
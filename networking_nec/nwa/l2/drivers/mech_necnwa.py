@@ -25,7 +25,7 @@ from neutron_lib import constants
 from oslo_config import cfg
 from oslo_log import log as logging
 
-from networking_nec._i18n import _LW
+from networking_nec._i18n import _LE, _LW
 from networking_nec.nwa.common import exceptions as nwa_exc
 from networking_nec.nwa.common import utils as nwa_com_utils
 from networking_nec.nwa.l2 import utils as nwa_l2_utils
@@ -52,6 +52,16 @@ class NECNWAMechanismDriver(ovs.OpenvswitchMechanismDriver):
                                               context.network._plugin_context)
         return nwa_l3_proxy_api.NwaL3ProxyApi(proxy.client)
 
+    def create_subnet_postcommit(self, context):
+        policy = cfg.CONF.NWA.l2_network_prewarm
+        if policy == 'none':
+            return
+        network_id = context.current['network_id']
+        if policy == 'business' and nwa_l2_utils.is_external_network(
+                context._plugin_context, network_id):
+            return
+        self._l2_ensure_l2_network(context)
+
     def create_port_precommit(self, context):
         device_owner = context._port['device_owner']
         if device_owner not in (constants.DEVICE_OWNER_ROUTER_INTF,
@@ -177,6 +187,21 @@ class NECNWAMechanismDriver(ovs.OpenvswitchMechanismDriver):
         proxy = self._get_l2api_proxy(context, kwargs['tenant_id'])
         proxy.create_general_dev(context.network._plugin_context, **kwargs)
 
+    def _l2_ensure_l2_network(self, context):
+        # the first port of the network does not wait for the
+        # creation of the tenant, tenant network and VLAN.
+        try:
+            nwa_info = nwa_l2_utils.subnetcontext_to_nwa_info(context)
+            proxy = self._get_l2api_proxy(context, nwa_info['tenant_id'])
+            proxy.ensure_l2_network(context._plugin_context,
+                                    tenant_id=nwa_info['tenant_id'],
+                                    nwa_tenant_id=nwa_info['nwa_tenant_id'],
+                                    nwa_info=nwa_info)
+        except Exception as e:
+            LOG.error(_LE("ensure_l2_network failed (network_id=%(id)s): "
+                          "%(err)s"),
+                      {'id': context.current['network_id'], 'err': e})
+
     def _l2_delete_general_dev(self, context, use_original_port=False):
         try:
             kwargs = self._make_l2api_kwargs(
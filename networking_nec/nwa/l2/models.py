@@ -14,6 +14,7 @@
 
 from neutron.db import model_base
 import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
 
 
 class NWATenantKeyValue(model_base.BASEV2):
@@ -40,6 +41,30 @@ class NWATenantKeyValue(model_base.BASEV2):
         )
 
 
+class NWATenantBindingDocument(model_base.BASEV2):
+    """Whole nwa_data of NWA tenant stored as one JSON document"""
+    __tablename__ = 'nwa_tenant_binding'
+
+    tenant_id = sa.Column(sa.String(36), primary_key=True)
+    nwa_tenant_id = sa.Column(sa.String(64))
+    value_json = sa.Column(sa.Text().with_variant(mysql.MEDIUMTEXT(),
+                                                  'mysql'),
+                           nullable=False)
+    version = sa.Column(sa.Integer, nullable=False, default=1)
+
+    def __init__(self, tenant_id, nwa_tenant_id, value_json, version=1):
+        self.tenant_id = tenant_id
+        self.nwa_tenant_id = nwa_tenant_id
+        self.value_json = value_json
+        self.version = version
+
+    def __repr__(self):
+        return "<TenantBindingDocument(%s,%s,%s,%s)>" % (
+            self.tenant_id, self.nwa_tenant_id, self.version,
+            self.value_json
+        )
+
+
 class NWATenantQueue(model_base.BASEV2):
     """Queue for each NWA Tenant between server and agent"""
     __tablename__ = 'nwa_tenant_queue'
@@ -12,17 +12,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from neutron.api.rpc.handlers import dhcp_rpc
 from neutron.api.rpc.handlers import metadata_rpc
 from neutron.api.rpc.handlers import securitygroups_rpc
 from neutron.common import rpc as n_rpc
 from neutron.common import topics
+from neutron import context as n_context
 from neutron.db import agents_db
 from neutron.extensions import multiprovidernet as mpnet
 from neutron.extensions import providernet as provider
 from neutron.plugins.ml2 import db as db_ml2
 from neutron.plugins.ml2 import driver_api as api
 from neutron.plugins.ml2 import plugin as ml2_plugin
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from networking_nec._i18n import _LE, _LI, _LW
@@ -48,6 +52,8 @@ class NECNWAL2Plugin(ml2_plugin.Ml2Plugin):
             nwa_const.NWA_AGENT_TOPIC
         )
         self.nwa_proxies = {}
+        # tid -> time the agent last had to run the server of the tenant
+        self.nwa_proxy_used = {}
 
     def start_rpc_listeners(self):
         self.endpoints = [
@@ -122,7 +128,7 @@ class NECNWAL2Plugin(ml2_plugin.Ml2Plugin):
                     tenant_id
                 ) is None
         ):
-            self.nwa_rpc.create_server(context, tenant_id)
+            self.nwa_rpc.create_server(context, tenant_id, new_tenant=True)
             necnwa_api.add_nwa_tenant_queue(context.session, tenant_id)
         else:
             LOG.warning(_LW('%s is not alive.'),
@@ -154,6 +160,8 @@ class NECNWAL2Plugin(ml2_plugin.Ml2Plugin):
             return []
 
     def get_nwa_proxy(self, tid, context=None):
+        if cfg.CONF.NWA.tenant_rpc_server_idle_timeout > 0:
+            self._activate_nwa_agent_tenant_server(tid, context)
         if tid not in self.nwa_proxies:
             self.nwa_proxies[tid] = nwa_proxy_api.NECNWAProxyApi(
                 nwa_const.NWA_AGENT_TOPIC, tid
@@ -170,6 +178,31 @@ class NECNWAL2Plugin(ml2_plugin.Ml2Plugin):
         LOG.debug('proxy tid=%s', tid)
         return self.nwa_proxies[tid]
 
+    def _activate_nwa_agent_tenant_server(self, tid, context=None):
+        """Makes sure the agent runs the rpc server of the tenant.
+
+        The agent stops the server of a tenant after
+        tenant_rpc_server_idle_timeout seconds without request. A
+        request sent within half of the timeout after the previous one
+        finds the server running, otherwise it is re-activated first.
+        The activation is cast, since this is called within the DB
+        transactions of port and floating IP operations: the requests
+        sent meanwhile wait in the topic queue of the tenant until its
+        server is started again.
+        """
+        now = time.time()
+        timeout = cfg.CONF.NWA.tenant_rpc_server_idle_timeout
+        if now - self.nwa_proxy_used.get(tid, 0) > timeout / 2.0:
+            try:
+                self.nwa_rpc.activate_server(
+                    context or n_context.get_admin_context(), tid)
+            except Exception as e:
+                LOG.warning(_LW('NWA tenant queue: activation failed '
+                                '(tid=%(tid)s): %(err)s'),
+                            {'tid': tid, 'err': e})
+                return
+        self.nwa_proxy_used[tid] = now
+
     def _is_alive_nwa_agent(self, context):
         agents = self.get_agents(
             context,
@@ -25,9 +25,17 @@ class NECNWAAgentApi(object):
                                        version=self.BASE_RPC_API_VERSION)
         self.client = n_rpc.get_client(target)
 
-    def create_server(self, context, tenant_id):
-        cctxt = self.client.prepare()
-        return cctxt.cast(context, 'create_server', tenant_id=tenant_id)
+    def create_server(self, context, tenant_id, new_tenant=False):
+        if not new_tenant:
+            cctxt = self.client.prepare()
+            return cctxt.cast(context, 'create_server', tenant_id=tenant_id)
+        cctxt = self.client.prepare(version='1.2')
+        return cctxt.cast(context, 'create_server', tenant_id=tenant_id,
+                          new_tenant=True)
+
+    def activate_server(self, context, tenant_id):
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.cast(context, 'activate_server', tenant_id=tenant_id)
 
     def delete_server(self, context, tenant_id):
         cctxt = self.client.prepare()
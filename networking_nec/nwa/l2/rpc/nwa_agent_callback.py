@@ -18,7 +18,10 @@ import oslo_messaging
 
 class NwaAgentRpcCallback(object):
 
-    target = oslo_messaging.Target(version='1.0')
+    # 1.0 - Initial version
+    # 1.1 - Add activate_server
+    # 1.2 - Add new_tenant to create_server
+    target = oslo_messaging.Target(version='1.2')
 
     def __init__(self, context, agent):
         self.context = context
@@ -37,7 +40,13 @@ class NwaAgentRpcCallback(object):
     @helpers.log_method_call
     def create_server(self, context, **kwargs):
         tenant_id = kwargs.get('tenant_id')
-        return self.agent.create_tenant_rpc_server(tenant_id)
+        return self.agent.create_tenant_rpc_server(
+            tenant_id, new_tenant=kwargs.get('new_tenant', False))
+
+    @helpers.log_method_call
+    def activate_server(self, context, **kwargs):
+        tenant_id = kwargs.get('tenant_id')
+        return self.agent.activate_tenant_rpc_server(tenant_id)
 
     @helpers.log_method_call
     def delete_server(self, context, **kwargs):
@@ -14,14 +14,19 @@
 
 
 from neutron.common import rpc as n_rpc
+from oslo_config import cfg
 import oslo_messaging
 
+from networking_nec.nwa.common import config  # noqa
+
 
 class NECNWAProxyApi(object):
     BASE_RPC_API_VERSION = '1.0'
 
     def __init__(self, topic, tenant_id):
-        target = oslo_messaging.Target(topic='%s-%s' % (topic, tenant_id),
+        if cfg.CONF.NWA.tenant_queue_mode != 'multiplexed':
+            topic = '%s-%s' % (topic, tenant_id)
+        target = oslo_messaging.Target(topic=topic,
                                        version=self.BASE_RPC_API_VERSION)
         self._client = n_rpc.get_client(target)
 
@@ -55,3 +60,13 @@ class NECNWAProxyApi(object):
             nwa_tenant_id=nwa_tenant_id,
             nwa_info=nwa_info
         )
+
+    def ensure_l2_network(self, context, tenant_id, nwa_tenant_id, nwa_info):
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.cast(
+            context,
+            'ensure_l2_network',
+            tenant_id=tenant_id,
+            nwa_tenant_id=nwa_tenant_id,
+            nwa_info=nwa_info
+        )
@@ -20,7 +20,9 @@ LOG = logging.getLogger(__name__)
 
 
 class NwaProxyCallback(object):
-    target = oslo_messaging.Target(version='1.0')
+    # 1.0 - Initial version
+    # 1.1 - Add ensure_l2_network
+    target = oslo_messaging.Target(version='1.1')
 
     def __init__(self, context, agent):
         super(NwaProxyCallback, self).__init__()
@@ -42,3 +44,11 @@ class NwaProxyCallback(object):
             sort_keys=True
         ))
         return self.agent.delete_general_dev(context, **kwargs)
+
+    def ensure_l2_network(self, context, **kwargs):
+        LOG.debug("Rpc callback kwargs=%s", jsonutils.dumps(
+            kwargs,
+            indent=4,
+            sort_keys=True
+        ))
+        return self.agent.ensure_l2_network(context, **kwargs)
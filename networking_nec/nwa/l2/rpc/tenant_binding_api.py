@@ -34,6 +34,17 @@ class TenantBindingServerRpcApi(object):
             nwa_tenant_id=nwa_tenant_id
         )
 
+    def get_nwa_tenant_binding_if_modified(self, context, tenant_id,
+                                           nwa_tenant_id, version):
+        cctxt = self.client.prepare(version='1.2')
+        return cctxt.call(
+            context,
+            'get_nwa_tenant_binding_if_modified',
+            tenant_id=tenant_id,
+            nwa_tenant_id=nwa_tenant_id,
+            version=version
+        )
+
     def add_nwa_tenant_binding(self, context, tenant_id,
                                nwa_tenant_id, nwa_data):
         cctxt = self.client.prepare()
@@ -56,6 +67,19 @@ class TenantBindingServerRpcApi(object):
             nwa_data=nwa_data
         )
 
+    def update_nwa_tenant_binding(self, context, tenant_id, nwa_tenant_id,
+                                  set_items, removed_keys, base_version):
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.call(
+            context,
+            'update_nwa_tenant_binding',
+            tenant_id=tenant_id,
+            nwa_tenant_id=nwa_tenant_id,
+            set_items=set_items,
+            removed_keys=removed_keys,
+            base_version=base_version
+        )
+
     def delete_nwa_tenant_binding(self, context, tenant_id,
                                   nwa_tenant_id):
         cctxt = self.client.prepare()
@@ -66,7 +90,15 @@ class TenantBindingServerRpcApi(object):
             nwa_tenant_id=nwa_tenant_id
         )
 
-    def update_tenant_rpc_servers(self, context, rpc_servers):
+    def update_tenant_rpc_servers(self, context, rpc_servers, evicted=None):
+        if evicted:
+            cctxt = self.client.prepare(version='1.3')
+            return cctxt.call(
+                context,
+                'update_tenant_rpc_servers',
+                servers=rpc_servers,
+                evicted=evicted
+            )
         cctxt = self.client.prepare()
         return cctxt.call(
             context,
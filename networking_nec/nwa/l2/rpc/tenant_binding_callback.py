@@ -27,7 +27,11 @@ LOG = logging.getLogger(__name__)
 
 class TenantBindingServerRpcCallback(object):
 
-    target = oslo_messaging.Target(version='1.0')
+    # 1.0 - Initial version
+    # 1.1 - Add update_nwa_tenant_binding
+    # 1.2 - Add get_nwa_tenant_binding_if_modified
+    # 1.3 - Add evicted to update_tenant_rpc_servers
+    target = oslo_messaging.Target(version='1.3')
 
     @helpers.log_method_call
     def get_nwa_tenant_binding(self, rpc_context, **kwargs):
@@ -54,6 +58,32 @@ class TenantBindingServerRpcCallback(object):
 
         return {}
 
+    @helpers.log_method_call
+    def get_nwa_tenant_binding_if_modified(self, rpc_context, **kwargs):
+        """get nwa_tenant_binding unless the agent has its version.
+
+        @param rpc_context: rpc context.
+        @param kwargs: tenant_id, nwa_tenant_id, version
+        @return: dict of version, and nwa_data unless version is the
+                 current version of the binding.
+        """
+        tenant_id = kwargs.get('tenant_id')
+        nwa_tenant_id = kwargs.get('nwa_tenant_id')
+        version = kwargs.get('version')
+
+        session = db_api.get_session()
+        with session.begin(subtransactions=True):
+            current = necnwa_api.get_nwa_tenant_binding_version(
+                session, tenant_id, nwa_tenant_id)
+            if version is not None and current == version:
+                return {'version': current}
+            recode = necnwa_api.get_nwa_tenant_binding(
+                session, tenant_id, nwa_tenant_id
+            )
+            if recode is None:
+                return {'version': None, 'nwa_data': {}}
+            return {'version': recode.version, 'nwa_data': recode.value_json}
+
     @helpers.log_method_call
     def add_nwa_tenant_binding(self, rpc_context, **kwargs):
         """get nwa_tenant_binding from neutorn db.
@@ -96,7 +126,41 @@ class TenantBindingServerRpcCallback(object):
                     nwa_tenant_id,
                     nwa_data
             ):
-                return {'status': 'SUCCESS'}
+                return {
+                    'status': 'SUCCESS',
+                    'version': necnwa_api.get_nwa_tenant_binding_version(
+                        session, tenant_id, nwa_tenant_id)
+                }
+
+        return {'status': 'FAILED'}
+
+    @helpers.log_method_call
+    def update_nwa_tenant_binding(self, rpc_context, **kwargs):
+        """apply a patch of nwa_tenant_binding to neutron db.
+
+        @param rpc_context: rpc context.
+        @param kwargs: tenant_id, nwa_tenant_id, set_items, removed_keys,
+                       base_version
+        @return: dict of status and version of the binding after update.
+        """
+        tenant_id = kwargs.get('tenant_id')
+        nwa_tenant_id = kwargs.get('nwa_tenant_id')
+
+        session = db_api.get_session()
+        with session.begin(subtransactions=True):
+            if necnwa_api.update_nwa_tenant_binding(
+                    session,
+                    tenant_id,
+                    nwa_tenant_id,
+                    kwargs.get('set_items'),
+                    kwargs.get('removed_keys'),
+                    kwargs.get('base_version')
+            ):
+                return {
+                    'status': 'SUCCESS',
+                    'version': necnwa_api.get_nwa_tenant_binding_version(
+                        session, tenant_id, nwa_tenant_id)
+                }
 
         return {'status': 'FAILED'}
 
@@ -120,6 +184,9 @@ class TenantBindingServerRpcCallback(object):
         ret = {'servers': []}
 
         servers = kwargs.get('servers')
+        # servers stopped by the agent for idleness are re-activated
+        # by the plugin when a request is sent to the tenant.
+        evicted = set(kwargs.get('evicted') or [])
         plugin = manager.NeutronManager.get_plugin()
         session = db_api.get_session()
 
@@ -131,6 +198,8 @@ class TenantBindingServerRpcCallback(object):
                     LOG.info(_LI("RPC Server active(tid=%s)"),
                              queue.tenant_id)
                     continue
+                elif queue.tenant_id in evicted:
+                    continue
                 else:
                     # create rpc server for tenant
                     LOG.debug("create_server: tid=%s", queue.tenant_id)
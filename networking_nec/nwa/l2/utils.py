@@ -107,6 +107,38 @@ def portcontext_to_nwa_info(context, resource_groups,
     return nwa_info
 
 
+def subnetcontext_to_nwa_info(context):
+    """Returns nwa_info of a network for ensure_l2_network.
+
+    The port, device and resource group of the device are empty, only
+    the tenant, the network and the subnet of the VLAN are given.
+    """
+    tenant_id, nwa_tenant_id = nwa_com_utils.get_tenant_info(context)
+    network_name, network_id = get_network_info(context)
+    subnet = context.current
+    vlan_type = 'PublicVLAN' \
+        if is_external_network(context._plugin_context, network_id) \
+        else 'BusinessVLAN'
+    return {
+        'tenant_id': tenant_id,
+        'nwa_tenant_id': nwa_tenant_id,
+        'network': {'id': network_id,
+                    'name': network_name,
+                    'vlan_type': vlan_type},
+        'device': {'owner': '',
+                   'id': ''},
+        'subnet': {'id': subnet['id'],
+                   'netaddr': subnet['cidr'].split('/')[0],
+                   'mask': subnet['cidr'].split('/')[1]},
+        'port': {'id': '',
+                 'ip': '',
+                 'mac': ''},
+        'resource_group_name': None,
+        'resource_group_name_nw': cfg.CONF.NWA.resource_group_name,
+        'physical_network': None,
+    }
+
+
 # Private methods
 
 def _get_resource_group_name(context, resource_groups,
@@ -0,0 +1,128 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+from oslo_log import log as logging
+
+from networking_nec._i18n import _LE, _LI, _LW
+
+
+LOG = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker(object):
+    """Fails the requests to NWA fast while it does not answer.
+
+    The circuit opens after failure_threshold failed requests in a row.
+    While it is open, requests are refused without being sent. After
+    reset_timeout seconds the circuit is half-open and the probe is
+    sent; the circuit closes if it succeeds and opens again otherwise.
+    The listeners are called when the circuit closes, so that the work
+    deferred meanwhile can be resumed.
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    breakers = {}
+
+    @classmethod
+    def get_breaker(cls, key, probe, failure_threshold, reset_timeout):
+        with CircuitBreaker.lock:
+            if key not in CircuitBreaker.breakers:
+                CircuitBreaker.breakers[key] = CircuitBreaker(
+                    probe, failure_threshold, reset_timeout)
+            return CircuitBreaker.breakers[key]
+
+    @classmethod
+    def delete_breakers(cls):
+        with CircuitBreaker.lock:
+            CircuitBreaker.breakers = {}
+
+    def __init__(self, probe, failure_threshold, reset_timeout):
+        """Creates a new closed circuit.
+
+        :param probe: callable returning True if NWA answers.
+        :param failure_threshold: The number of failures in a row after
+            which the circuit opens.
+        :param reset_timeout: Seconds after which an open circuit is
+            probed.
+        """
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._listeners = []
+        self.stats = {
+            'opened': 0,
+            'rejected': 0,
+            'probes': 0,
+        }
+
+    def add_listener(self, listener):
+        """Adds a callable called when the circuit closes."""
+        self._listeners.append(listener)
+
+    def is_closed(self):
+        return self.state == CLOSED
+
+    def allow(self):
+        """Returns True if a request may be sent."""
+        if self.state == CLOSED:
+            return True
+        self.stats['rejected'] += 1
+        return False
+
+    def succeeded(self):
+        self._failures = 0
+
+    def failed(self):
+        self._failures += 1
+        if self.state == CLOSED and self._failures >= self.failure_threshold:
+            LOG.warning(_LW('NWA circuit opened after %s failures'),
+                        self._failures)
+            self.stats['opened'] += 1
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        eventlet.spawn_after(self.reset_timeout, self._probe)
+
+    def _probe(self):
+        self.state = HALF_OPEN
+        self.stats['probes'] += 1
+        try:
+            alive = self.probe()
+        except Exception as e:
+            LOG.debug('NWA circuit probe failed: %s', e)
+            alive = False
+        if not alive:
+            self._open()
+            return
+        LOG.info(_LI('NWA circuit closed'))
+        self.state = CLOSED
+        self._failures = 0
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                LOG.error(_LE('NWA circuit listener failed: %s'), e)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['state'] = self.state
+        return stats
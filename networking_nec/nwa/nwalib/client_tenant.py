@@ -24,10 +24,14 @@ class NwaClientTenant(object):
         body = {
             'TenantName': tenant_id,
         }
-        return self.client.post('/umf/tenant/' + tenant_id, body)
+        status_code, data = self.client.post('/umf/tenant/' + tenant_id,
+                                             body)
+        self.client.invalidate_tenant_resource(tenant_id)
+        return status_code, data
 
     def delete_tenant(self, tenant_id):
         status_code, data = self.client.delete('/umf/tenant/' + tenant_id)
+        self.client.invalidate_tenant_resource(tenant_id)
         if status_code == 200:
             nwa_sem.Semaphore.delete_tenant_semaphore(tenant_id)
         return status_code, data
@@ -0,0 +1,102 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+import functools
+import time
+
+from eventlet import corolocal
+
+from networking_nec.nwa.nwalib import exceptions as nwa_exc
+
+
+# the deadline of the green thread
+_local = corolocal.local()
+
+
+def current():
+    """Returns the time the operation of the green thread must end by."""
+    return getattr(_local, 'expires', None)
+
+
+def remaining():
+    """Returns the seconds left to the operation, None if unbounded."""
+    expires = current()
+    if expires is None:
+        return None
+    return expires - time.time()
+
+
+def budget(seconds):
+    """Bounds the requests to NWA sent by the block to seconds from now.
+
+    A nested budget cannot extend the one it runs in. A budget of 0 or
+    None leaves the block as bounded as its caller.
+    """
+    if not seconds or seconds <= 0:
+        return until(None)
+    return until(time.time() + seconds)
+
+
+@contextlib.contextmanager
+def until(expires):
+    """Bounds the requests to NWA sent by the block to the time expires.
+
+    It carries the deadline returned by current() to another green
+    thread. None leaves the block as bounded as its caller.
+    """
+    outer = current()
+    if expires is None:
+        yield
+        return
+    if outer is not None:
+        expires = min(expires, outer)
+    _local.expires = expires
+    try:
+        yield
+    finally:
+        _local.expires = outer
+
+
+def with_budget(get_seconds):
+    """Decorator running a method in a budget of get_seconds() seconds."""
+
+    def decorator(method):
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with budget(get_seconds()):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timeout(connect_timeout, read_timeout):
+    """Returns the timeout of an HTTP request sent now.
+
+    The connect and read timeouts are cut to the seconds left to the
+    operation, for requests.request.
+
+    :raises NwaDeadlineExceeded: if no time is left.
+    """
+    left = remaining()
+    if left is None:
+        if connect_timeout is None and read_timeout is None:
+            return None
+        return (connect_timeout, read_timeout)
+    if left <= 0:
+        raise nwa_exc.NwaDeadlineExceeded(
+            'deadline exceeded by %.1f seconds' % -left)
+    return (min(connect_timeout or left, left),
+            min(read_timeout or left, left))
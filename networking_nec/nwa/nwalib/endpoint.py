@@ -0,0 +1,185 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import time
+
+import eventlet
+from oslo_log import log as logging
+
+from networking_nec._i18n import _LI, _LW
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_PROBE_INTERVAL = 10
+# number of execution ids whose endpoint is remembered
+MAX_BINDINGS = 10000
+
+Endpoint = collections.namedtuple('Endpoint', ['host', 'port', 'use_ssl'])
+
+
+class _Health(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.quarantined = None
+
+
+class EndpointSelector(object):
+    """Spreads the requests to NWA over the healthy endpoints.
+
+    Requests are sent to the endpoints in turn. An endpoint failing
+    failure_threshold requests in a row is quarantined: no request is
+    sent to it but the probes, which are sent every probe_interval
+    seconds until one succeeds. When all endpoints are quarantined,
+    the one quarantined first is used anyway.
+
+    A workflow execution is bound to the endpoint which accepted it,
+    so that its workflowinstance requests are sent there while it is
+    healthy.
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    selectors = {}
+
+    @classmethod
+    def get_selector(cls, endpoints, probe,
+                     failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                     probe_interval=DEFAULT_PROBE_INTERVAL):
+        key = tuple(endpoints)
+        with EndpointSelector.lock:
+            if key not in EndpointSelector.selectors:
+                EndpointSelector.selectors[key] = EndpointSelector(
+                    endpoints, probe, failure_threshold, probe_interval)
+            return EndpointSelector.selectors[key]
+
+    @classmethod
+    def delete_selectors(cls):
+        with EndpointSelector.lock:
+            EndpointSelector.selectors = {}
+
+    def __init__(self, endpoints, probe,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 probe_interval=DEFAULT_PROBE_INTERVAL):
+        """Creates a new selector.
+
+        :param endpoints: list of Endpoint.
+        :param probe: callable taking an Endpoint, returning True if
+            the endpoint answers.
+        :param failure_threshold: The number of failures in a row after
+            which an endpoint is quarantined.
+        :param probe_interval: Seconds between the probes of the
+            quarantined endpoints.
+        """
+        self.endpoints = list(endpoints)
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self._health = {ep: _Health() for ep in self.endpoints}
+        self._next = 0
+        # execution id -> endpoint
+        self._bindings = collections.OrderedDict()
+        self._prober = None
+
+    def _healthy(self):
+        return [ep for ep in self.endpoints
+                if self._health[ep].quarantined is None]
+
+    def select(self):
+        """Returns the endpoint of the next request."""
+        healthy = self._healthy()
+        if not healthy:
+            return min(self.endpoints,
+                       key=lambda ep: self._health[ep].quarantined)
+        endpoint = healthy[self._next % len(healthy)]
+        self._next += 1
+        return endpoint
+
+    def select_for(self, execution_id):
+        """Returns the endpoint of a request on an execution."""
+        endpoint = self._bindings.get(execution_id)
+        if endpoint is None or self._health[endpoint].quarantined:
+            return self.select()
+        return endpoint
+
+    def bind(self, execution_id, endpoint):
+        self._bindings.pop(execution_id, None)
+        self._bindings[execution_id] = endpoint
+        while len(self._bindings) > MAX_BINDINGS:
+            self._bindings.popitem(last=False)
+
+    def unbind(self, execution_id):
+        self._bindings.pop(execution_id, None)
+
+    def succeeded(self, endpoint):
+        health = self._health[endpoint]
+        health.requests += 1
+        health.consecutive_failures = 0
+
+    def failed(self, endpoint):
+        health = self._health[endpoint]
+        health.requests += 1
+        health.failures += 1
+        health.consecutive_failures += 1
+        if (health.quarantined is None and
+                health.consecutive_failures >= self.failure_threshold):
+            self._quarantine(endpoint)
+
+    def _quarantine(self, endpoint):
+        LOG.warning(_LW('NWA endpoint %(host)s:%(port)s quarantined after '
+                        '%(count)s failures'),
+                    {'host': endpoint.host, 'port': endpoint.port,
+                     'count': self._health[endpoint].consecutive_failures})
+        self._health[endpoint].quarantined = time.time()
+        if self._prober is None:
+            self._prober = eventlet.spawn(self._run_probes)
+
+    def _restore(self, endpoint):
+        LOG.info(_LI('NWA endpoint %(host)s:%(port)s restored'),
+                 {'host': endpoint.host, 'port': endpoint.port})
+        health = self._health[endpoint]
+        health.quarantined = None
+        health.consecutive_failures = 0
+
+    def probe_quarantined(self):
+        """Probes the quarantined endpoints once, restoring the healthy."""
+        for endpoint in self.endpoints:
+            if self._health[endpoint].quarantined is None:
+                continue
+            try:
+                alive = self.probe(endpoint)
+            except Exception as e:
+                LOG.debug('NWA endpoint probe failed: %s', e)
+                alive = False
+            if alive:
+                self._restore(endpoint)
+
+    def _run_probes(self):
+        try:
+            while len(self._healthy()) < len(self.endpoints):
+                eventlet.sleep(self.probe_interval)
+                self.probe_quarantined()
+        finally:
+            self._prober = None
+
+    def get_stats(self):
+        return {'%s:%s' % (ep.host, ep.port): {
+            'requests': self._health[ep].requests,
+            'failures': self._health[ep].failures,
+            'quarantined': self._health[ep].quarantined is not None,
+        } for ep in self.endpoints}
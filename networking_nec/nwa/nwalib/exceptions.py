@@ -13,6 +13,12 @@
 #    under the License.
 
 
+# http_status of the requests failed fast while NWA is unreachable
+HTTP_STATUS_CIRCUIT_OPEN = -2
+# http_status of the requests not sent because the operation is late
+HTTP_STATUS_DEADLINE_EXCEEDED = -3
+
+
 class NwaException(Exception):
     '''Raised when there is an error in Nwa. '''
     def __init__(self, http_status, errmsg, orgexc=None):
@@ -23,3 +29,10 @@ class NwaException(Exception):
 
     def __str__(self):
         return 'http status: %s, %s' % (self.http_status, self.errmsg)
+
+
+class NwaDeadlineExceeded(NwaException):
+    '''Raised instead of sending a request after the operation deadline. '''
+    def __init__(self, errmsg):
+        super(NwaDeadlineExceeded, self).__init__(
+            HTTP_STATUS_DEADLINE_EXCEEDED, errmsg)
@@ -16,9 +16,13 @@ import base64
 import copy
 import hashlib
 import hmac
+import itertools
+import os
 import re
+import time
 
 import eventlet
+from eventlet import event
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
@@ -28,10 +32,17 @@ from six.moves.urllib import parse as urlparse
 
 from networking_nec._i18n import _LI, _LW, _LE
 from networking_nec.nwa.common import config as nwaconf
+from networking_nec.nwa.nwalib import circuit_breaker
+from networking_nec.nwa.nwalib import deadline as nwa_deadline
+from networking_nec.nwa.nwalib import endpoint as nwa_endpoint
 from networking_nec.nwa.nwalib import exceptions as nwa_exc
+from networking_nec.nwa.nwalib import read_cache
 from networking_nec.nwa.nwalib import restclient
 from networking_nec.nwa.nwalib import semaphore as nwa_sem
 from networking_nec.nwa.nwalib import workflow
+from networking_nec.nwa.nwalib import workflow_journal
+from networking_nec.nwa.nwalib import workflow_latency
+from networking_nec.nwa.nwalib import workflow_poller
 
 
 LOG = logging.getLogger(__name__)
@@ -40,36 +51,72 @@ cfgNWA = nwaconf.cfg.CONF.NWA
 
 CRLF = '\x0D\x0A'
 
+WORKFLOWINSTANCE = re.compile(r'^/umf/workflowinstance/(.+)$')
+
+# the scenarios run alone in the tenant
+TENANT_SCENARIOS = ('CreateTenantNW', 'DeleteTenantNW')
+
+SCENARIO_RESOURCE = re.compile(
+    r'^[A-Za-z]+NW_(VlanLogicalName|DeviceName)\d+$')
+
 
 class NwaRestClient(restclient.RestClient):
     '''Client class of NWA rest. '''
 
-    workflow_list_is_loaded = False
+    workflow_list_refresher = None
+    # sent once the workflow ids are read from NWA or from the cache file
+    workflow_list_loaded = None
 
     def __init__(self, host=None, port=None, use_ssl=True, auth=None,
                  access_key_id=None, secret_access_key=None, **kwargs):
         load_workflow_list = kwargs.pop('load_workflow_list', True)
         if auth is None:
             auth = self._define_auth_function(access_key_id, secret_access_key)
+        self.endpoints = None
         if not host or not port:
-            if not cfgNWA.server_url:
+            if cfgNWA.server_urls:
+                endpoints = [nwa_endpoint.Endpoint(*self._parse_server_url(u))
+                             for u in cfgNWA.server_urls]
+                if len(endpoints) > 1:
+                    selector = nwa_endpoint.EndpointSelector
+                    self.endpoints = selector.get_selector(
+                        endpoints, self._probe_endpoint,
+                        cfgNWA.endpoint_failure_threshold,
+                        cfgNWA.endpoint_probe_interval)
+                host, port, use_ssl = endpoints[0]
+            elif cfgNWA.server_url:
+                host, port, use_ssl = self._parse_server_url(
+                    cfgNWA.server_url)
+            else:
                 raise cfg.Error("'server_url' or (host, port) "
                                 "must be specified.")
-            host, port, use_ssl = self._parse_server_url(cfgNWA.server_url)
+        self.breaker = None
+        if cfgNWA.circuit_breaker_threshold > 0:
+            self.breaker = circuit_breaker.CircuitBreaker.get_breaker(
+                (host, port), self._probe_circuit,
+                cfgNWA.circuit_breaker_threshold,
+                cfgNWA.circuit_breaker_reset_timeout)
+        self.read_cache = read_cache.ReadCache.get_cache((host, port))
+        kwargs.setdefault('pool_maxsize', cfgNWA.http_pool_maxsize)
+        kwargs.setdefault('pool_idle_timeout', cfgNWA.http_pool_idle_timeout)
+        kwargs.setdefault('connect_timeout',
+                          cfgNWA.http_connect_timeout or None)
+        kwargs.setdefault('read_timeout', cfgNWA.http_read_timeout or None)
         super(NwaRestClient, self).__init__(host, port, use_ssl, auth,
                                             **kwargs)
         self._post_data = None
+        self.load_workflow_list = load_workflow_list
         self.workflow_first_wait = cfg.CONF.NWA.scenario_polling_first_timer
         self.workflow_wait_sleep = cfg.CONF.NWA.scenario_polling_timer
         self.workflow_retry_count = cfg.CONF.NWA.scenario_polling_count
+        self.workflow_polling_adaptive = cfgNWA.scenario_polling_adaptive
         LOG.info(_LI('NWA init: workflow wait: %(first_wait)ss + '
                      '%(wait_sleep)ss x %(retry_count)s times.'),
                  {'first_wait': self.workflow_first_wait,
                   'wait_sleep': self.workflow_wait_sleep,
                   'retry_count': self.workflow_retry_count})
-        if load_workflow_list and not NwaRestClient.workflow_list_is_loaded:
-            self.update_workflow_list()
-            NwaRestClient.workflow_list_is_loaded = True
+        if load_workflow_list:
+            self.start_workflow_list_refresh()
 
     def _parse_server_url(self, url):
         url_parts = urlparse.urlparse(url)
@@ -156,17 +203,90 @@ class NwaRestClient(restclient.RestClient):
         elif status == 'SUCCEED':
             self._log_workflow_success(data)
 
+    def _select_endpoint(self, url):
+        if self.endpoints is None:
+            return None
+        m = WORKFLOWINSTANCE.match(url)
+        if m:
+            return self.endpoints.select_for(m.group(1))
+        return self.endpoints.select()
+
+    def _endpoint_succeeded(self, endpoint, method, url, data):
+        if endpoint is None:
+            return
+        self.endpoints.succeeded(endpoint)
+        if not isinstance(data, dict):
+            return
+        m = WORKFLOWINSTANCE.match(url)
+        if method == 'POST' and \
+                isinstance(data.get('executionid'), six.string_types):
+            self.endpoints.bind(data['executionid'], endpoint)
+        elif m and (method == 'DELETE' or data.get('status') != 'RUNNING'):
+            self.endpoints.unbind(m.group(1))
+
+    def _probe_endpoint(self, endpoint):
+        status_code, __ = super(NwaRestClient, self).rest_api(
+            'GET', '/umf/dcresource/groups', endpoint=endpoint)
+        return status_code == 200
+
+    def _probe_circuit(self):
+        return self._probe_endpoint(self._select_endpoint(''))
+
+    def circuit_open(self):
+        """Returns True while the requests to NWA fail fast."""
+        return self.breaker is not None and not self.breaker.is_closed()
+
+    def add_circuit_listener(self, listener):
+        """Calls listener when NWA answers again after failing."""
+        if self.breaker is not None:
+            self.breaker.add_listener(listener)
+
+    def get_circuit_stats(self):
+        if self.breaker is None:
+            return {}
+        return self.breaker.get_stats()
+
+    def get_endpoint_stats(self):
+        """Returns the requests, failures and health of the endpoints."""
+        if self.endpoints is None:
+            return {}
+        return self.endpoints.get_stats()
+
     def rest_api(self, method, url, body=None):
         status_code = 200
+        if self.breaker is not None and not self.breaker.allow():
+            LOG.warning(_LW('NWA %(method)s %(url)s failed fast: '
+                            'NWA does not answer'),
+                        {'method': method, 'url': url})
+            return nwa_exc.HTTP_STATUS_CIRCUIT_OPEN, None
+        endpoint = self._select_endpoint(url)
         try:
             self._log_rest_request(method, url, body)
-            status_code, data = super(NwaRestClient,
-                                      self).rest_api(method, url, body)
+            status_code, data = super(NwaRestClient, self).rest_api(
+                method, url, body, endpoint=endpoint)
+            self._endpoint_succeeded(endpoint, method, url, data)
+            if self.breaker is not None:
+                self.breaker.succeeded()
             self._log_rest_response(status_code, data)
             return status_code, data
 
         except nwa_exc.NwaException as e:
             status_code = e.http_status
+            # refused connections and server errors tell NWA is
+            # unhealthy, other errors are answers to the request.
+            unhealthy = status_code >= 500 or (
+                status_code < 0 and
+                status_code != nwa_exc.HTTP_STATUS_DEADLINE_EXCEEDED)
+            if endpoint is not None:
+                if unhealthy:
+                    self.endpoints.failed(endpoint)
+                else:
+                    self.endpoints.succeeded(endpoint)
+            if self.breaker is not None:
+                if unhealthy:
+                    self.breaker.failed()
+                else:
+                    self.breaker.succeeded()
             return status_code, None
 
     def workflowinstance(self, execution_id):
@@ -175,9 +295,113 @@ class NwaRestClient(restclient.RestClient):
     def stop_workflowinstance(self, execution_id):
         return self.delete('/umf/workflowinstance/' + execution_id)
 
-    def workflow_kick_and_wait(self, call, url, body):
+    def _workflow_polling_delays(self, name=None):
+        if name and self.workflow_polling_adaptive:
+            latency = workflow_latency.WorkflowLatency.get_latency(
+                name, cfgNWA.scenario_polling_history)
+            if len(latency.samples) >= cfgNWA.scenario_polling_min_samples:
+                budget = sum(self._workflow_fixed_polling_delays())
+                return latency.delays(self.workflow_wait_sleep, budget)
+        return self._workflow_fixed_polling_delays()
+
+    def _workflow_fixed_polling_delays(self):
+        # the first two polls wait workflow_first_wait, the others
+        # workflow_wait_sleep.
+        for count in range(self.workflow_retry_count):
+            if count < 2:
+                yield self.workflow_first_wait
+            else:
+                yield self.workflow_wait_sleep
+
+    def _workflow_deadline(self, name):
+        try:
+            return int(cfgNWA.scenario_deadlines.get(name, 0))
+        except ValueError:
+            LOG.warning(_LW('Invalid deadline of scenario %(name)s: '
+                            '%(deadline)s'),
+                        {'name': name,
+                         'deadline': cfgNWA.scenario_deadlines[name]})
+            return 0
+
+    def _read_cache_ttl(self, api):
+        try:
+            return int(cfgNWA.read_cache_ttls.get(api, 0))
+        except ValueError:
+            LOG.warning(_LW('Invalid cache ttl of %(api)s: %(ttl)s'),
+                        {'api': api, 'ttl': cfgNWA.read_cache_ttls[api]})
+            return 0
+
+    def _cached_get(self, api, url, tenant_id=None):
+        return self.read_cache.get(url, lambda: self.get(url),
+                                   self._read_cache_ttl(api),
+                                   tenant_id=tenant_id)
+
+    def invalidate_tenant_resource(self, tenant_id):
+        """Drops the cached reserved resources of a tenant."""
+        self.read_cache.invalidate(tenant_id)
+
+    def get_read_cache_stats(self):
+        """Returns the hits and misses of the cache of read APIs."""
+        return self.read_cache.get_stats()
+
+    def _workflow_deadline_delays(self, delays, deadline, extend=True):
+        """Polls until the deadline instead of the polling count.
+
+        With extend False, the polling still ends with the delays if
+        they end before the deadline.
+        """
+        spent = 0
+        if extend:
+            delays = itertools.chain(
+                delays, itertools.repeat(self.workflow_wait_sleep))
+        for delay in delays:
+            if spent >= deadline:
+                return
+            delay = min(delay, deadline - spent)
+            spent += delay
+            yield delay
+
+    def stop_expired_workflow(self, execution_id):
+        """Stops an execution still running when its polling gives up.
+
+        The execution is stopped, so that it does not hold the tenant
+        in NWA while the following scenarios of the tenant are run, and
+        polled until it is no longer RUNNING.
+
+        :param execution_id: The execution id returned by the kick.
+        :returns: (http_status, body) of the execution if it ended
+            before it was stopped, (http_status, None) otherwise.
+        """
+        LOG.warning(_LW('NWA workflow: stop %s'), execution_id)
+        http_status, __ = self.stop_workflowinstance(execution_id)
+        for count in range(cfgNWA.scenario_stop_polling_count):
+            if count:
+                eventlet.sleep(self.workflow_wait_sleep)
+            http_status, rw = self.workflowinstance(execution_id)
+            if isinstance(rw, dict) and rw.get('status') != 'RUNNING':
+                if rw.get('status') == 'SUCCEED':
+                    return http_status, rw
+                LOG.info(_LI('NWA workflow: %(id)s stopped (%(status)s)'),
+                         {'id': execution_id, 'status': rw.get('status')})
+                return http_status, None
+        LOG.error(_LE('NWA workflow: %s is not stopped'), execution_id)
+        return http_status, None
+
+    def _workflow_journal(self):
+        if not cfgNWA.workflow_journal_file:
+            return None
+        try:
+            return workflow_journal.WorkflowJournal.get_journal(
+                cfgNWA.workflow_journal_file)
+        except Exception as e:
+            LOG.error(_LE('NWA journal %(path)s not opened: %(err)s'),
+                      {'path': cfgNWA.workflow_journal_file, 'err': e})
+            return None
+
+    def workflow_kick_and_wait(self, call, url, body, tenant_id=None):
         http_status = -1
         rj = None
+        kicked = time.time()
         (http_status, rj) = call(url, body)
 
         if not isinstance(rj, dict):
@@ -186,42 +410,152 @@ class NwaRestClient(restclient.RestClient):
         exeid = rj.get('executionid')
         if not isinstance(exeid, six.string_types):
             LOG.error(_LE('Invalid executin id %s'), exeid)
-        try:
-            wait_time = self.workflow_first_wait
-            eventlet.sleep(wait_time)
-            for __ in range(self.workflow_retry_count):
-                (http_status, rw) = self.workflowinstance(exeid)
-                if not isinstance(rw, dict):
-                    LOG.error(
-                        _LE('NWA workflow: failed %(http_status)s %(body)s'),
-                        {'http_status': http_status, 'body': rw}
-                    )
-                    return (http_status, None)
-                if rw.get('status') != 'RUNNING':
-                    LOG.debug('%s', rw)
-                    return (http_status, rw)
-                eventlet.sleep(wait_time)
-                wait_time = self.workflow_wait_sleep
-            LOG.warning(_LW('NWA workflow: retry over. retry count is %s.'),
-                        self.workflow_retry_count)
-        except Exception as e:
-            LOG.error(_LE('NWA workflow: %s'), e)
-        return (http_status, None)
+        name = workflow.NwaWorkflow.name(url) if url else None
+        journal = self._workflow_journal()
+        if journal and tenant_id and isinstance(exeid, six.string_types):
+            journal.record(exeid, tenant_id, name, body)
+        else:
+            journal = None
+        delays = self._workflow_polling_delays(name)
+        deadline = self._workflow_deadline(name) if name else 0
+        if deadline > 0:
+            delays = self._workflow_deadline_delays(delays, deadline)
+        budget = nwa_deadline.remaining()
+        if budget is not None:
+            # the execution is stopped when the operation budget ends.
+            delays = self._workflow_deadline_delays(delays, max(budget, 0),
+                                                    extend=False)
+        expired = []
+
+        def on_retry_over(execution_id):
+            expired.append(time.time() - kicked)
+            return self.stop_expired_workflow(execution_id)
+
+        poller = workflow_poller.WorkflowPoller.get_poller(self.pool_maxsize)
+        done = poller.register(exeid, self.workflowinstance, delays,
+                               http_status, on_retry_over=on_retry_over,
+                               deadline=nwa_deadline.current())
+        http_status, rw = done.wait()
+        if journal:
+            journal.complete(exeid)
+        if name and (isinstance(rw, dict) or expired):
+            # an execution stopped when its polling gave up is recorded
+            # at the time it was given up, a lower bound of its latency,
+            # so that the slow executions are not left out.
+            if isinstance(rw, dict):
+                elapsed = time.time() - kicked
+            else:
+                elapsed = expired[0]
+            workflow_latency.WorkflowLatency.get_latency(
+                name, cfgNWA.scenario_polling_history
+            ).add(elapsed)
+        return (http_status, rw)
+
+    def resume_workflows(self, apply_result):
+        """Polls the executions left in the journal by a previous run.
+
+        The executions are polled to their end with the fixed polling
+        timers, then apply_result(entry, http_status, result) is called
+        with the journal entry, and the entry is removed. Executions
+        whose result is still unknown at the end of the polling are
+        removed as well, so that a lost execution is reported once.
+
+        :param apply_result: The callable applying a result.
+        :returns: number of resumed executions.
+        """
+        journal = self._workflow_journal()
+        if not journal:
+            return 0
+        entries = journal.pending()
+        poller = workflow_poller.WorkflowPoller.get_poller(self.pool_maxsize)
+        polls = [(entry, poller.register(
+            entry['execution_id'], self.workflowinstance,
+            self._workflow_fixed_polling_delays(), 200))
+            for entry in entries]
+        for entry, done in polls:
+            http_status, rw = done.wait()
+            LOG.info(_LI('NWA workflow resumed: %(name)s %(id)s '
+                         '(tenant=%(tenant)s) status=%(status)s'),
+                     {'name': entry['name'], 'id': entry['execution_id'],
+                      'tenant': entry['tenant_id'],
+                      'status': rw.get('status')
+                      if isinstance(rw, dict) else http_status})
+            try:
+                apply_result(entry, http_status, rw)
+            except Exception as e:
+                LOG.exception(_LE('NWA workflow resumed: %(name)s %(id)s '
+                                  'not applied: %(err)s'),
+                              {'name': entry['name'],
+                               'id': entry['execution_id'], 'err': e})
+            journal.complete(entry['execution_id'])
+        return len(entries)
+
+    def get_workflow_latency_stats(self):
+        """Returns completion time percentiles learned per workflow."""
+        return workflow_latency.WorkflowLatency.get_stats()
+
+    def get_scenario_queue_stats(self):
+        """Returns the depth and wait times of the tenant queues."""
+        return nwa_sem.Semaphore.get_stats()
+
+    def get_stats(self):
+        """Returns the stats of the requests sent to NWA."""
+        poller = workflow_poller.WorkflowPoller.get_poller(self.pool_maxsize)
+        return {
+            'http_pool': self.get_pool_stats(),
+            'endpoints': self.get_endpoint_stats(),
+            'circuit': self.get_circuit_stats(),
+            'read_cache': self.get_read_cache_stats(),
+            'workflow_poller': poller.get_stats(),
+            'workflow_latency': self.get_workflow_latency_stats(),
+        }
+
+    @staticmethod
+    def _scenario_resources(body):
+        """Returns the networks and devices named by a scenario body."""
+        resources = set()
+        for key, value in body.items():
+            m = SCENARIO_RESOURCE.match(key)
+            if m and value:
+                kind = 'network' if m.group(1) == 'VlanLogicalName' \
+                    else 'device'
+                resources.add((kind, value))
+        device = (body.get('DeviceInfo') or {}).get('DeviceName')
+        if device:
+            resources.add(('device', device))
+        return resources
+
+    def _scenario_lock(self, wkf, name, body):
+        """Returns the lock of the tenant taken by a scenario."""
+        if cfgNWA.scenario_lock_granularity != 'network' or \
+                name in TENANT_SCENARIOS or not isinstance(body, dict):
+            return wkf.tenant_lock()
+        return wkf.resource_lock(self._scenario_resources(body))
 
     def call_workflow(self, tenant_id, post, name, body):
+        if self.circuit_open():
+            # fail before queueing for the tenant lock.
+            LOG.warning(_LW('NWA workflow: %s failed fast: NWA does not '
+                            'answer'), name)
+            return nwa_exc.HTTP_STATUS_CIRCUIT_OPEN, None
+        self.wait_workflow_list()
         url = workflow.NwaWorkflow.path(name)
         try:
             wkf = nwa_sem.Semaphore.get_tenant_semaphore(tenant_id)
-            if wkf.sem.locked():
+            if wkf.locked():
                 LOG.info(_LI('NWA sem %s(count)s: %(name)s %(url)s %(body)s'),
                          {'count': wkf.sem.balance,
                           'name': post.__name__,
                           'url': url,
                           'body': body})
-            with wkf.sem:
+            with self._scenario_lock(wkf, name, body):
                 n = copy.copy(self)
                 n.workflow_polling_log_post_data(url, body)
-                http_status, rj = n.workflow_kick_and_wait(post, url, body)
+                try:
+                    http_status, rj = n.workflow_kick_and_wait(
+                        post, url, body, tenant_id=tenant_id)
+                finally:
+                    self.invalidate_tenant_resource(tenant_id)
                 return http_status, rj
         except Exception as e:
             LOG.exception(_LE('%s'), e)
@@ -233,26 +567,29 @@ class NwaRestClient(restclient.RestClient):
         LOG.debug('*** end wait')
 
     def get_tenant_resource(self, tenant_id):
-        return self.get('/umf/reserveddcresource/' + tenant_id)
+        return self._cached_get('reserveddcresource',
+                                '/umf/reserveddcresource/' + tenant_id,
+                                tenant_id=tenant_id)
 
     def get_dc_resource_groups(self, group=None):
         if not group:
             url = '/umf/dcresource/groups'
         else:
             url = '/umf/dcresource/groups/' + str(group)
-        return self.get(url)
+        return self._cached_get('dcresource_groups', url)
 
     def get_reserved_dc_resource(self, tenant_id):
         url = '/umf/reserveddcresource/' + str(tenant_id)
-        return self.get(url)
+        return self._cached_get('reserveddcresource', url,
+                                tenant_id=str(tenant_id))
 
     def get_workflow_list(self):
         try:
             url = '/umf/workflow/list'
-            return self.get(url)
+            return self._cached_get('workflow_list', url)
         except Exception as e:
-            LOG.warning(_LW('The initial worklist is not updated,'
-                            ' using default worklist. (%s)'), e)
+            LOG.warning(_LW('The worklist is not updated,'
+                            ' using current worklist. (%s)'), e)
             return None, None
 
     def update_workflow_list(self):
@@ -268,4 +605,79 @@ class NwaRestClient(restclient.RestClient):
                         nameid[key] = str(wf.get('Id'))
             for _wf in rj.get('Workflows'):
                 new_nameid(_wf)
-        workflow.NwaWorkflow.update_nameid(nameid)
+        if nameid:
+            self._workflow_list_loaded()
+        if not workflow.NwaWorkflow.update_nameid(nameid):
+            return False
+        LOG.info(_LI('NWA workflow ids updated: %s'),
+                 jsonutils.dumps(nameid, sort_keys=True))
+        path = cfgNWA.workflow_list_cache_file
+        if path:
+            try:
+                workflow.NwaWorkflow.save_nameid(path)
+            except Exception as e:
+                LOG.error(_LE('NWA workflow ids not saved to %(path)s: '
+                              '%(err)s'), {'path': path, 'err': e})
+        return True
+
+    def load_workflow_list_cache(self):
+        """Loads the workflow ids saved by a previous run."""
+        path = cfgNWA.workflow_list_cache_file
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            changed = workflow.NwaWorkflow.load_nameid(path)
+        except Exception as e:
+            LOG.warning(_LW('NWA workflow ids not loaded from %(path)s: '
+                            '%(err)s'), {'path': path, 'err': e})
+            return False
+        self._workflow_list_loaded()
+        return changed
+
+    @staticmethod
+    def _workflow_list_loaded():
+        loaded = NwaRestClient.workflow_list_loaded
+        if loaded is not None and not loaded.ready():
+            loaded.send()
+
+    def wait_workflow_list(self):
+        """Waits for the first workflow ids, workflow_list_wait at most.
+
+        The default ids are used by the scenarios sent before the ids
+        are read from NWA or from the cache file.
+        """
+        loaded = NwaRestClient.workflow_list_loaded
+        if (not self.load_workflow_list or loaded is None or
+                loaded.ready() or cfgNWA.workflow_list_wait <= 0):
+            return
+        LOG.info(_LI('NWA workflow: waiting for the workflow ids'))
+        with eventlet.Timeout(cfgNWA.workflow_list_wait, False):
+            loaded.wait()
+        if not loaded.ready():
+            LOG.warning(_LW('NWA workflow: the workflow ids are not read, '
+                            'using the default ids.'))
+
+    def start_workflow_list_refresh(self):
+        """Loads the saved workflow ids and refreshes them from NWA.
+
+        The workflow list is read in a green thread, so that the
+        client does not wait for NWA. The first client starts it, and
+        it runs every workflow_list_refresh_interval seconds. The
+        scenarios wait for the first ids, see wait_workflow_list().
+        """
+        if NwaRestClient.workflow_list_refresher is not None:
+            return
+        NwaRestClient.workflow_list_loaded = event.Event()
+        self.load_workflow_list_cache()
+        NwaRestClient.workflow_list_refresher = eventlet.spawn(
+            self._refresh_workflow_list)
+
+    def _refresh_workflow_list(self):
+        while True:
+            try:
+                self.update_workflow_list()
+            except Exception as e:
+                LOG.exception(_LE('NWA workflow ids not updated: %s'), e)
+            if cfgNWA.workflow_list_refresh_interval <= 0:
+                return
+            eventlet.sleep(cfgNWA.workflow_list_refresh_interval)
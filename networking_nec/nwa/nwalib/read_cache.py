@@ -0,0 +1,122 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import copy
+import time
+
+import eventlet
+from eventlet import event
+
+_Entry = collections.namedtuple('_Entry', ['result', 'expires', 'tenant_id'])
+_InFlight = collections.namedtuple('_InFlight', ['done', 'tenant_id'])
+
+
+class ReadCache(object):
+    """Read-through cache of the GET requests to NWA.
+
+    A successful response is kept for the ttl given by the caller, and
+    concurrent requests of the same url share one request to NWA. The
+    responses on a tenant are dropped by invalidate(tenant_id) once a
+    scenario of the tenant changes them; a request sent before the
+    invalidation neither caches its response nor shares it with the
+    requests made after it.
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    caches = {}
+
+    @classmethod
+    def get_cache(cls, key):
+        with ReadCache.lock:
+            if key not in ReadCache.caches:
+                ReadCache.caches[key] = ReadCache()
+            return ReadCache.caches[key]
+
+    @classmethod
+    def delete_caches(cls):
+        with ReadCache.lock:
+            ReadCache.caches = {}
+
+    def __init__(self):
+        self._entries = {}
+        # url -> _InFlight of the request being sent
+        self._inflight = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, url, fetch, ttl, tenant_id=None):
+        """Returns the response of url, sending fetch() if needed.
+
+        :param url: The key of the response.
+        :param fetch: callable returning (http_status, body).
+        :param ttl: Seconds the response is kept, 0 to share it with
+            the concurrent requests only.
+        :param tenant_id: The tenant the response depends on, if any.
+        :returns: (http_status, body)
+        """
+        entry = self._entries.get(url)
+        if entry is not None:
+            if entry.expires > time.time():
+                self.stats['hits'] += 1
+                return copy.deepcopy(entry.result)
+            del self._entries[url]
+        waiting = self._inflight.get(url)
+        if waiting is not None:
+            self.stats['coalesced'] += 1
+            return copy.deepcopy(waiting.done.wait())
+        self.stats['misses'] += 1
+        inflight = self._inflight[url] = _InFlight(event.Event(), tenant_id)
+        try:
+            result = fetch()
+        except Exception as e:
+            self._finish(url, inflight)
+            inflight.done.send_exception(e)
+            raise
+        # an invalidation while fetching detached the request.
+        if (self._finish(url, inflight) and ttl > 0 and
+                result[0] == 200):
+            self._entries[url] = _Entry(result, time.time() + ttl, tenant_id)
+        inflight.done.send(result)
+        return result
+
+    def _finish(self, url, inflight):
+        """Removes a request sent, returns False if it was detached."""
+        if self._inflight.get(url) is not inflight:
+            return False
+        del self._inflight[url]
+        return True
+
+    def invalidate(self, tenant_id=None):
+        """Drops the responses on tenant_id, or all with None."""
+        self.stats['invalidations'] += 1
+        if tenant_id is None:
+            self._entries = {}
+            self._inflight = {}
+            return
+        self._entries = {url: entry for url, entry in self._entries.items()
+                         if entry.tenant_id != tenant_id}
+        # the next requests are sent again instead of waiting for these.
+        self._inflight = {url: inflight
+                          for url, inflight in self._inflight.items()
+                          if inflight.tenant_id != tenant_id}
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['size'] = len(self._entries)
+        return stats
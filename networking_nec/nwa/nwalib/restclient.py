@@ -13,12 +13,16 @@
 #    under the License.
 
 import datetime
+import time
 
+import eventlet
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 import requests
+from requests import adapters
 
 from networking_nec._i18n import _, _LI
+from networking_nec.nwa.nwalib import deadline
 from networking_nec.nwa.nwalib import exceptions as nwa_exc
 
 
@@ -29,6 +33,9 @@ DATE_HEADER_FORMAT = '%a, %d %b %Y %H:%M:%S GMT'
 UMF_API_VERSION = '2.0.2.1.201502'
 OLD_UMF_API_VERSION = '2.0.2.201402'
 
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_POOL_IDLE_TIMEOUT = 30
+
 
 # datetime.datetime.utcnow cannot be mocked.
 # It is required to mock utcnow in unit test.
@@ -36,23 +43,132 @@ def utcnow():
     return datetime.datetime.utcnow()
 
 
+class SessionPool(object):
+    """Keep-alive HTTP sessions shared among clients of the same NWA.
+
+    One requests.Session is kept for each endpoint, so that POSTs and
+    workflowinstance polls reuse established TCP (and TLS) connections
+    instead of opening a new one per request.
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    pools = {}
+
+    @classmethod
+    def get_pool(cls, scheme, host, port, maxsize=DEFAULT_POOL_MAXSIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        key = (scheme, host, int(port))
+        with SessionPool.lock:
+            if key not in SessionPool.pools:
+                LOG.info(_LI('create http session pool for %(scheme)s://'
+                             '%(host)s:%(port)s (maxsize=%(maxsize)s)'),
+                         {'scheme': scheme, 'host': host, 'port': port,
+                          'maxsize': maxsize})
+                SessionPool.pools[key] = SessionPool(maxsize, idle_timeout)
+            return SessionPool.pools[key]
+
+    @classmethod
+    def delete_pools(cls):
+        with SessionPool.lock:
+            for pool in SessionPool.pools.values():
+                pool.close()
+            SessionPool.pools = {}
+
+    def __init__(self, maxsize=DEFAULT_POOL_MAXSIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        """Creates a new session pool.
+
+        :param maxsize: The number of connections kept alive.
+        :param idle_timeout: Seconds after which an idle session is
+            recycled. 0 means that sessions are never recycled.
+        """
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self._session = None
+        self._last_used = 0
+        self.stats = {
+            'requests': 0,
+            'in_use': 0,
+            'max_in_use': 0,
+            'exhausted': 0,
+            'recycled': 0,
+        }
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = adapters.HTTPAdapter(pool_connections=1,
+                                       pool_maxsize=self.maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _get_session(self):
+        idle = time.time() - self._last_used
+        if (self._session is not None and self.idle_timeout and
+                self.stats['in_use'] == 0 and idle > self.idle_timeout):
+            LOG.debug('recycle http session idle for %d seconds', idle)
+            self._session.close()
+            self._session = None
+            self.stats['recycled'] += 1
+        if self._session is None:
+            self._session = self._new_session()
+        return self._session
+
+    def request(self, method, url, **kwargs):
+        session = self._get_session()
+        self.stats['requests'] += 1
+        self.stats['in_use'] += 1
+        in_use = self.stats['in_use']
+        if in_use > self.stats['max_in_use']:
+            self.stats['max_in_use'] = in_use
+        if in_use > self.maxsize:
+            # urllib3 opens an extra connection and drops it afterwards.
+            self.stats['exhausted'] += 1
+        try:
+            return session.request(method, url, **kwargs)
+        finally:
+            self.stats['in_use'] -= 1
+            self._last_used = time.time()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def get_stats(self):
+        return dict(self.stats)
+
+
 class RestClient(object):
     """A HTTP/HTTPS client for NEC NWA Drivers."""
 
     def __init__(self, host=None, port=None, use_ssl=True, auth=None,
-                 umf_api_version=UMF_API_VERSION):
+                 umf_api_version=UMF_API_VERSION,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT,
+                 connect_timeout=None, read_timeout=None):
         """Creates a new client to some NWA.
 
         :param host: The host where service resides
         :param port: The port where service resides
         :param use_ssl: True to use SSL, False to use HTTP
         :param: auth: function to generate Authorization header.
+        :param pool_maxsize: The number of keep-alive connections to NWA.
+        :param pool_idle_timeout: Seconds to keep an idle session.
+        :param connect_timeout: Seconds to wait for the connection to
+            NWA, None waits forever.
+        :param read_timeout: Seconds to wait for each read from NWA,
+            None waits forever.
         """
         self.host = host
         self.port = port
         self.use_ssl = use_ssl
         self.auth = auth
         self.umf_api_version = umf_api_version
+        self.pool_maxsize = pool_maxsize
+        self.pool_idle_timeout = pool_idle_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
 
         LOG.info(
             _LI('NWA init: host=%(host)s port=%(port)s use_ssl=%(use_ssl)s '
@@ -80,33 +196,52 @@ class RestClient(object):
         }
         return headers
 
-    def _send_receive(self, method, path, body=None):
+    def _send_receive(self, method, path, body=None, endpoint=None):
+        host, port, use_ssl = endpoint or (self.host, self.port,
+                                           self.use_ssl)
         scheme = "http"
-        if self.use_ssl:
+        if use_ssl:
             scheme = "https"
 
-        url = "%s://%s:%d%s" % (scheme, self.host, int(self.port), path)
+        url = "%s://%s:%d%s" % (scheme, host, int(port), path)
+        # raise NwaDeadlineExceeded if the operation is already late
+        timeout = deadline.timeout(self.connect_timeout, self.read_timeout)
         headers = self._make_headers(path)
         LOG.debug('NWA HTTP Headers %s', headers)
-        res = requests.request(method, url, data=body, headers=headers,
-                               verify=False, proxies={'no': 'pass'})
+        pool = SessionPool.get_pool(scheme, host, port,
+                                    self.pool_maxsize, self.pool_idle_timeout)
+        res = pool.request(method, url, data=body, headers=headers,
+                           verify=False, proxies={'no': 'pass'},
+                           timeout=timeout)
         return res
 
-    def rest_api(self, method, url, body=None):
+    def get_pool_stats(self):
+        scheme = "https" if self.use_ssl else "http"
+        return SessionPool.get_pool(scheme, self.host, self.port,
+                                    self.pool_maxsize,
+                                    self.pool_idle_timeout).get_stats()
+
+    def rest_api(self, method, url, body=None, endpoint=None):
+        """Sends a request to NWA.
+
+        :param endpoint: (host, port, use_ssl) to send the request to,
+            the endpoint of the client if None.
+        """
         if isinstance(body, dict):
             body = jsonutils.dumps(body, indent=4, sort_keys=True)
+        host, port = endpoint[:2] if endpoint else (self.host, self.port)
 
         LOG.debug("NWA %(method)s %(host)s:%(port)s%(url)s body=%(body)s",
-                  {'method': method, 'host': self.host, 'port': self.port,
+                  {'method': method, 'host': host, 'port': port,
                    'url': url, 'body': body})
 
         status_code = -1
         try:
-            res = self._send_receive(method, url, body)
+            res = self._send_receive(method, url, body, endpoint)
         except requests.exceptions.RequestException as e:
             msg = _("NWA Failed to connect %(host)s:%(port)s: %(reason)s")
-            msg_params = {'host': self.host,
-                          'port': self.port,
+            msg_params = {'host': host,
+                          'port': port,
                           'reason': e}
             LOG.error(msg, msg_params)
             raise nwa_exc.NwaException(status_code, msg % msg_params, e)
@@ -126,8 +261,8 @@ class RestClient(object):
             msg = _("NWA failed: %(method)s %(host)s:%(port)s%(url)s "
                     "(HTTP/1.1 %(status_code)s %(reason)s) body=%(data)s")
             msg_params = {'method': method,
-                          'host': self.host,
-                          'port': self.port,
+                          'host': host,
+                          'port': port,
                           'url': url,
                           'status_code': res.status_code,
                           'reason': res.reason,
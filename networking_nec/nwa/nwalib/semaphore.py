@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
+import time
+
 import eventlet
 from oslo_log import log as logging
 import six
@@ -34,6 +37,19 @@ class Thread(object):
 
 
 class Semaphore(object):
+    """Locks of the scenarios of a tenant.
+
+    A scenario on the whole tenant (CreateTenantNW, DeleteTenantNW)
+    runs alone in the tenant. The other scenarios share the tenant and
+    run one at a time on each of their resources, so that the scenarios
+    on different networks and devices of a tenant run in parallel,
+    while e.g. UpdateTenantFW, SettingNAT and DeleteNAT on one tenant FW
+    still run one after the other.
+
+    A scenario on the whole tenant waits for the running scenarios to
+    end, and the scenarios coming after it wait for it.
+    """
+
     lock = eventlet.semaphore.Semaphore(1)
     tenants = {}
 
@@ -47,6 +63,18 @@ class Semaphore(object):
                 Semaphore.tenants[tenant_id] = Semaphore()
             return Semaphore.tenants[tenant_id]
 
+    @classmethod
+    def get_stats(cls):
+        """Returns the scenario queue of each tenant.
+
+        :returns: dict of tenant_id to {'waiting', 'locked', 'shared',
+            'acquired', 'waited', 'wait_time', 'max_wait_time'}, wait
+            times in seconds.
+        """
+        with Semaphore.lock:
+            return {tid: sem.get_tenant_stats()
+                    for tid, sem in Semaphore.tenants.items()}
+
     @classmethod
     def delete_tenant_semaphore(cls, tenant_id):
         with Semaphore.lock:
@@ -56,7 +84,101 @@ class Semaphore(object):
 
     def __init__(self):
         self._sem = eventlet.semaphore.Semaphore(1)
+        # held while scenarios sharing the tenant are running
+        self._exclusive = eventlet.semaphore.Semaphore(1)
+        # number of scenarios sharing the tenant
+        self._shared = 0
+        # resource -> [semaphore, number of users]
+        self._resources = {}
+        self.stats = {
+            'acquired': 0,
+            'waited': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+        }
 
     @property
     def sem(self):
         return self._sem
+
+    @staticmethod
+    def _acquire(sem):
+        """Acquires sem, returns True if it had to wait for it."""
+        if sem.acquire(blocking=False):
+            return False
+        sem.acquire()
+        return True
+
+    def _acquired(self, start, waited):
+        self.stats['acquired'] += 1
+        if waited:
+            wait_time = time.time() - start
+            self.stats['waited'] += 1
+            self.stats['wait_time'] += wait_time
+            self.stats['max_wait_time'] = max(self.stats['max_wait_time'],
+                                              wait_time)
+
+    @contextlib.contextmanager
+    def tenant_lock(self):
+        """Runs a scenario alone in the tenant."""
+        start = time.time()
+        waited = self._acquire(self._sem)
+        try:
+            waited = self._acquire(self._exclusive) or waited
+            try:
+                self._acquired(start, waited)
+                yield
+            finally:
+                self._exclusive.release()
+        finally:
+            self._sem.release()
+
+    @contextlib.contextmanager
+    def resource_lock(self, resources):
+        """Runs a scenario alone on its resources.
+
+        :param resources: iterable of the resources of the scenario,
+            e.g. ('network', logical_name).
+        """
+        start = time.time()
+        waited = self._acquire(self._sem)
+        try:
+            if self._shared == 0:
+                waited = self._acquire(self._exclusive) or waited
+            self._shared += 1
+        finally:
+            self._sem.release()
+        keys = sorted(set(resources))
+        entries = []
+        for key in keys:
+            entry = self._resources.setdefault(
+                key, [eventlet.semaphore.Semaphore(1), 0])
+            entry[1] += 1
+            entries.append(entry)
+        taken = []
+        try:
+            # in order, so that two scenarios never wait for each other.
+            for entry in entries:
+                waited = self._acquire(entry[0]) or waited
+                taken.append(entry)
+            self._acquired(start, waited)
+            yield
+        finally:
+            for entry in taken:
+                entry[0].release()
+            for key, entry in zip(keys, entries):
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._resources[key]
+            self._shared -= 1
+            if self._shared == 0:
+                self._exclusive.release()
+
+    def locked(self):
+        return self._sem.locked() or self._exclusive.locked()
+
+    def get_tenant_stats(self):
+        stats = dict(self.stats, waiting=max(-self._sem.balance, 0))
+        stats['locked'] = self.locked()
+        stats['shared'] = self._shared
+        return stats
@@ -0,0 +1,238 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import copy
+
+import six
+
+
+# attributes of DEV_<device>_<network> which are not a resource group.
+INTERFACE_ATTRS = ('ip_address', 'mac_address', 'TenantFWName')
+
+_MISSING = object()
+
+
+class TenantState(dict):
+    """nwa_data of a tenant with indexes on its key/value layout.
+
+    The key/value layout built by data_utils is kept as is, so that an
+    instance can be sent wherever nwa_data is expected, while the
+    questions asked on each port operation (is a VLAN still used by a
+    device, how many interfaces a device has, ...) are answered from
+    indexes maintained on every update instead of scanning all keys.
+
+    The keys changed since the state was read are also tracked, so that
+    only a patch of them has to be written back.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TenantState, self).__init__()
+        # number of NW_* keys
+        self._network_keys = 0
+        # network_id -> number of VLAN_*<network_id>_*_VlanID keys
+        self._vlan_segments = collections.Counter()
+        # device_id -> number of DEV_<device_id>_* keys
+        self._device_keys = collections.Counter()
+        # (network_id, resource_group, dev_type) -> number of interfaces
+        self._segments = collections.Counter()
+        # (device_id, network_id) -> {resource_group: dev_type}
+        self._interface_groups = collections.defaultdict(dict)
+        # device_id -> number of DEV_<device_id>_<network_id>_TenantFWName
+        self._tfw_interfaces = collections.Counter()
+        # key -> value before the first change, _MISSING if it was added
+        self._changes = {}
+        # version of the stored binding this state is based on
+        self.version = None
+        self.update(*args, **kwargs)
+        self._changes.clear()
+
+    def _index(self, key, value, delta):
+        if not isinstance(key, six.string_types):
+            return
+        if key.startswith('NW_'):
+            self._network_keys += delta
+        elif key.startswith('VLAN_'):
+            self._index_vlan(key[5:], delta)
+        elif key.startswith('DEV_'):
+            self._index_device(key[4:], value, delta)
+
+    def _index_vlan(self, rest, delta):
+        if not rest.endswith('_VlanID'):
+            return
+        rest = rest[:-len('_VlanID')]
+        if rest.startswith('LB_'):
+            rest = rest[3:]
+        network_id, sep, segment = rest.partition('_')
+        if sep and segment:
+            self._count(self._vlan_segments, network_id, delta)
+
+    def _index_device(self, rest, value, delta):
+        device_id, sep, rest = rest.partition('_')
+        if not sep:
+            return
+        self._count(self._device_keys, device_id, delta)
+        network_id, sep, attr = rest.partition('_')
+        if not sep or rest in ('device_owner', 'TenantFWName'):
+            return
+        if attr == 'TenantFWName':
+            self._count(self._tfw_interfaces, device_id, delta)
+        elif attr not in INTERFACE_ATTRS:
+            self._count(self._segments, (network_id, attr, value), delta)
+            groups = self._interface_groups[(device_id, network_id)]
+            if delta > 0:
+                groups[attr] = value
+            else:
+                groups.pop(attr, None)
+                if not groups:
+                    del self._interface_groups[(device_id, network_id)]
+
+    @staticmethod
+    def _count(counter, key, delta):
+        counter[key] += delta
+        if counter[key] <= 0:
+            del counter[key]
+
+    # dict interface
+
+    def _track(self, key):
+        if key not in self._changes:
+            self._changes[key] = self.get(key, _MISSING)
+
+    def __setitem__(self, key, value):
+        self._track(key)
+        if key in self:
+            self._index(key, self[key], -1)
+        super(TenantState, self).__setitem__(key, value)
+        self._index(key, value, 1)
+
+    def __delitem__(self, key):
+        value = self[key]
+        self._track(key)
+        super(TenantState, self).__delitem__(key)
+        self._index(key, value, -1)
+
+    def pop(self, key, default=_MISSING):
+        if key not in self:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        key, value = super(TenantState, self).popitem()
+        self._changes.setdefault(key, value)
+        self._index(key, value, -1)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in six.iteritems(dict(*args, **kwargs)):
+            self[key] = value
+
+    def clear(self):
+        for key in self:
+            self._track(key)
+        super(TenantState, self).clear()
+        self._network_keys = 0
+        self._vlan_segments.clear()
+        self._device_keys.clear()
+        self._segments.clear()
+        self._interface_groups.clear()
+        self._tfw_interfaces.clear()
+
+    def _copy_tracking(self, state):
+        state._changes = dict(self._changes)
+        state.version = self.version
+        return state
+
+    def copy(self):
+        return self._copy_tracking(TenantState(self))
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self._copy_tracking(TenantState(
+            {k: copy.deepcopy(v, memo) for k, v in six.iteritems(self)}))
+
+    def __reduce__(self):
+        return (TenantState, (dict(self),))
+
+    def to_dict(self):
+        """Returns nwa_data in the key/value layout as a plain dict."""
+        return dict(self)
+
+    # changes
+
+    def get_changes(self):
+        """Returns the patch of the changes since the state was read.
+
+        :returns: (set_items, removed_keys), dict of the keys added or
+            updated and list of the keys removed.
+        """
+        set_items = {}
+        removed_keys = []
+        for key, old in six.iteritems(self._changes):
+            if key in self:
+                if old is _MISSING or old != self[key]:
+                    set_items[key] = self[key]
+            elif old is not _MISSING:
+                removed_keys.append(key)
+        return set_items, removed_keys
+
+    def reset_changes(self, version=None):
+        """Marks the changes as written as the given version."""
+        self._changes.clear()
+        self.version = version
+
+    # queries
+
+    def has_network(self):
+        return self._network_keys > 0
+
+    def count_vlan_segments(self, network_id):
+        """Number of VLAN_*<network_id>_<group>_<type>_VlanID keys."""
+        return self._vlan_segments.get(network_id, 0)
+
+    def count_device_keys(self, device_id):
+        """Number of DEV_<device_id>_* keys."""
+        return self._device_keys.get(device_id, 0)
+
+    def count_segment(self, network_id, resource_group_name, dev_type):
+        """Number of interfaces of dev_type in network and group."""
+        return self._segments.get((network_id, resource_group_name,
+                                   dev_type), 0)
+
+    def count_tfw_interfaces(self, device_id):
+        """Number of tenant FW interfaces of the device."""
+        return self._tfw_interfaces.get(device_id, 0)
+
+    def get_resource_group_name(self, device_id, network_id, mac, dev_type):
+        """Returns the group of the interface with mac and dev_type."""
+        prefix = 'DEV_%s_%s_' % (device_id, network_id)
+        if self.get(prefix + 'mac_address') != mac:
+            return None
+        groups = self._interface_groups.get((device_id, network_id), {})
+        for group, value in six.iteritems(groups):
+            if value == dev_type:
+                return group
+        return None
+
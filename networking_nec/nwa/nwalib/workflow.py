@@ -12,15 +12,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
 import re
 
+from oslo_serialization import jsonutils
 import six
 
 
 class NwaWorkflow(object):
     '''Workflow definition of NWA. '''
     _path_prefix = '/umf/workflow/'
-    _nameid_initialized = False
     _nameid = {
         'CreateTenantNW': '40030001',
         'DeleteTenantNW': '40030016',
@@ -169,8 +170,41 @@ class NwaWorkflow(object):
 
     @staticmethod
     def update_nameid(new_nameid):
-        if NwaWorkflow._nameid_initialized:
-            return
-        if new_nameid:
-            NwaWorkflow._nameid = new_nameid
-            NwaWorkflow._nameid_initialized = True
+        """Replaces the ids of the workflows.
+
+        The ids are swapped at once, so that a scenario looks its id up
+        in either the old or the new ids.
+
+        :param new_nameid: dict of the ids by workflow name. An empty
+            dict keeps the current ids.
+        :returns: True if the ids changed.
+        """
+        if not new_nameid or new_nameid == NwaWorkflow._nameid:
+            return False
+        NwaWorkflow._nameid = dict(new_nameid)
+        return True
+
+    @staticmethod
+    def load_nameid(path):
+        """Loads the ids of the workflows saved by save_nameid.
+
+        :param path: The path of the file.
+        :returns: True if the ids changed.
+        """
+        with open(path) as f:
+            nameid = jsonutils.loads(f.read())
+        if not isinstance(nameid, dict):
+            raise ValueError('%s is not a dict of workflow ids' % path)
+        return NwaWorkflow.update_nameid(
+            {str(k): str(v) for k, v in nameid.items()})
+
+    @staticmethod
+    def save_nameid(path):
+        """Saves the ids of the workflows, replacing the file at once.
+
+        :param path: The path of the file.
+        """
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(jsonutils.dumps(NwaWorkflow._nameid, sort_keys=True))
+        os.rename(tmp, path)
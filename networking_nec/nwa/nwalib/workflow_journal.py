@@ -0,0 +1,115 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sqlite3
+import time
+
+import eventlet
+from oslo_log import log as logging
+from oslo_serialization import jsonutils
+
+from networking_nec._i18n import _LE
+
+
+LOG = logging.getLogger(__name__)
+
+_SCHEMA = ('CREATE TABLE IF NOT EXISTS executions ('
+           'execution_id TEXT PRIMARY KEY, '
+           'tenant_id TEXT NOT NULL, '
+           'name TEXT, '
+           'body TEXT, '
+           'kicked REAL NOT NULL)')
+
+
+class WorkflowJournal(object):
+    """SQLite file of the NWA workflow executions being polled.
+
+    An execution id is recorded as soon as NWA returns it and removed
+    once its result is known, so that the executions left in the file
+    after a restart of the agent are the ones whose result was never
+    applied. A journal fails open: an error on the file is logged and
+    the scenario goes on without it.
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    journals = {}
+
+    @classmethod
+    def get_journal(cls, path):
+        with WorkflowJournal.lock:
+            if path not in WorkflowJournal.journals:
+                WorkflowJournal.journals[path] = WorkflowJournal(path)
+            return WorkflowJournal.journals[path]
+
+    def __init__(self, path):
+        """Opens the journal, creating the file if needed.
+
+        :param path: The path of the SQLite file.
+        """
+        self.path = path
+        self._lock = eventlet.semaphore.Semaphore(1)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    def record(self, execution_id, tenant_id, name, body):
+        """Records a kicked execution.
+
+        :param execution_id: The execution id returned by NWA.
+        :param tenant_id: The NWA tenant id of the scenario.
+        :param name: The name of the scenario, None if unknown.
+        :param body: The request body of the scenario.
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO executions VALUES (?,?,?,?,?)',
+                    (execution_id, tenant_id, name,
+                     jsonutils.dumps(body, sort_keys=True), time.time()))
+        except Exception as e:
+            LOG.error(_LE('NWA journal %(path)s: execution %(id)s not '
+                          'recorded: %(err)s'),
+                      {'path': self.path, 'id': execution_id, 'err': e})
+
+    def complete(self, execution_id):
+        """Removes an execution whose result is applied."""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'DELETE FROM executions WHERE execution_id = ?',
+                    (execution_id,))
+        except Exception as e:
+            LOG.error(_LE('NWA journal %(path)s: execution %(id)s not '
+                          'removed: %(err)s'),
+                      {'path': self.path, 'id': execution_id, 'err': e})
+
+    def pending(self):
+        """Returns the recorded executions in the order they were kicked.
+
+        :returns: list of dicts with the keys execution_id, tenant_id,
+            name, body and kicked.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT execution_id, tenant_id, name, body, kicked '
+                'FROM executions ORDER BY kicked').fetchall()
+        return [{'execution_id': r[0],
+                 'tenant_id': r[1],
+                 'name': r[2],
+                 'body': jsonutils.loads(r[3]) if r[3] else None,
+                 'kicked': r[4]} for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
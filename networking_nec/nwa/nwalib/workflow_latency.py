@@ -0,0 +1,100 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+
+import eventlet
+
+
+DEFAULT_HISTORY = 100
+MIN_INTERVAL = 0.5
+PERCENTILES = (50, 90, 99)
+
+
+class WorkflowLatency(object):
+    """Completion times observed for one NWA workflow.
+
+    Each scenario (CreateVLAN, CreateGeneralDev, ...) keeps its own
+    window of samples, which is used to schedule the status polling of
+    the next executions of the same scenario.
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    workflows = {}
+
+    @classmethod
+    def get_latency(cls, name, history=DEFAULT_HISTORY):
+        with WorkflowLatency.lock:
+            if name not in WorkflowLatency.workflows:
+                WorkflowLatency.workflows[name] = WorkflowLatency(history)
+            return WorkflowLatency.workflows[name]
+
+    @classmethod
+    def get_stats(cls):
+        """Returns the learned percentiles of all workflows.
+
+        :returns: dict of name to {'count', 'min', 'max', 'p50', 'p90',
+            'p99'} in seconds.
+        """
+        with WorkflowLatency.lock:
+            return {name: latency.stats()
+                    for name, latency in WorkflowLatency.workflows.items()}
+
+    @classmethod
+    def delete_latencies(cls):
+        with WorkflowLatency.lock:
+            WorkflowLatency.workflows = {}
+
+    def __init__(self, history=DEFAULT_HISTORY):
+        self.samples = collections.deque(maxlen=history)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        index = int(round((len(samples) - 1) * p / 100.0))
+        return samples[index]
+
+    def stats(self):
+        if not self.samples:
+            return {'count': 0}
+        stats = {'count': len(self.samples),
+                 'min': min(self.samples),
+                 'max': max(self.samples)}
+        for p in PERCENTILES:
+            stats['p%d' % p] = self.percentile(p)
+        return stats
+
+    def delays(self, max_interval, budget):
+        """Generates the waits before each status polling.
+
+        The first polling is done near the median completion time, then
+        the interval is doubled up to max_interval until the polls
+        cover budget seconds.
+
+        :param max_interval: The longest wait between two pollings.
+        :param budget: Seconds after which polling is given up.
+        """
+        median = self.percentile(50)
+        wait = max(MIN_INTERVAL, min(median, budget))
+        interval = max(MIN_INTERVAL, min(median / 2.0, max_interval))
+        elapsed = 0
+        while elapsed < budget:
+            yield wait
+            elapsed += wait
+            wait = interval
+            interval = min(interval * 2, max_interval)
@@ -0,0 +1,205 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import eventlet
+from eventlet import event
+from oslo_log import log as logging
+
+from networking_nec._i18n import _LE, _LI, _LW
+from networking_nec.nwa.nwalib import deadline as nwa_deadline
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+
+
+class _PollEntry(object):
+
+    def __init__(self, execution_id, fetch, delays, http_status,
+                 on_retry_over=None, deadline=None):
+        self.execution_id = execution_id
+        self.fetch = fetch
+        self.delays = iter(delays)
+        self.http_status = http_status
+        self.on_retry_over = on_retry_over
+        self.deadline = deadline
+        self.polls = 0
+        self.due = None
+        self.polling = False
+        self.event = event.Event()
+
+    def schedule(self, now):
+        """Sets the time of the next poll, returns False if none is left."""
+        try:
+            self.due = now + next(self.delays)
+            return True
+        except StopIteration:
+            return False
+
+
+class WorkflowPoller(object):
+    """Polls all outstanding NWA workflow executions on one schedule.
+
+    Instead of each scenario sleeping in its own loop, execution ids
+    are registered here and a single green thread issues the
+    workflowinstance requests when they become due. The result of an
+    execution is delivered through the event returned by register().
+    """
+
+    lock = eventlet.semaphore.Semaphore(1)
+    poller = None
+
+    @classmethod
+    def get_poller(cls, pool_size=DEFAULT_POOL_SIZE):
+        with WorkflowPoller.lock:
+            if WorkflowPoller.poller is None:
+                WorkflowPoller.poller = WorkflowPoller(pool_size)
+            return WorkflowPoller.poller
+
+    def __init__(self, pool_size=DEFAULT_POOL_SIZE):
+        """Creates a new poller.
+
+        :param pool_size: The number of workflowinstance requests sent
+            to NWA concurrently.
+        """
+        self._entries = set()
+        self._pool = eventlet.GreenPool(pool_size)
+        self._thread = None
+        self._wakeup = event.Event()
+        self.stats = {
+            'registered': 0,
+            'polls': 0,
+            'retry_over': 0,
+        }
+
+    def register(self, execution_id, fetch, delays, http_status,
+                 on_retry_over=None, deadline=None):
+        """Starts polling an execution.
+
+        :param execution_id: The execution id returned by the kick.
+        :param fetch: callable taking execution_id, returning
+            (http_status, body) of the workflowinstance.
+        :param delays: iterable of the seconds to wait before each poll.
+            Polling gives up when it is exhausted, at once if empty.
+        :param http_status: HTTP status returned until the first poll.
+        :param on_retry_over: callable taking execution_id, called in
+            its own green thread when polling gives up. The event is
+            sent what it returns instead of (http_status, None).
+        :param deadline: The time the requests of the polls must end
+            by, as returned by deadline.current(), None if unbounded.
+        :returns: an event sent (http_status, body) when the execution
+            is no longer RUNNING, or (http_status, None) on failure.
+        """
+        entry = _PollEntry(execution_id, fetch, delays, http_status,
+                           on_retry_over, deadline)
+        self.stats['registered'] += 1
+        if not entry.schedule(time.time()):
+            if on_retry_over is None:
+                entry.event.send((http_status, None))
+            else:
+                # the execution is kicked, and still has to be stopped.
+                self.stats['retry_over'] += 1
+                eventlet.spawn_n(self._retry_over, entry)
+            return entry.event
+        self._entries.add(entry)
+        if self._thread is None:
+            LOG.info(_LI('NWA workflow poller: start'))
+            self._thread = eventlet.spawn(self._run)
+        else:
+            self._wake()
+        return entry.event
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['outstanding'] = len(self._entries)
+        return stats
+
+    def _wake(self):
+        if not self._wakeup.ready():
+            self._wakeup.send()
+
+    def _finish(self, entry, result):
+        self._entries.discard(entry)
+        entry.event.send(result)
+
+    def _retry_over(self, entry):
+        result = (entry.http_status, None)
+        expires = entry.deadline
+        if expires is not None and expires <= time.time():
+            # the stop of an execution at its deadline is sent anyway.
+            expires = None
+        try:
+            with nwa_deadline.until(expires):
+                result = entry.on_retry_over(entry.execution_id)
+        except Exception as e:
+            LOG.error(_LE('NWA workflow: %s'), e)
+        finally:
+            entry.event.send(result)
+
+    def _run(self):
+        try:
+            while self._entries:
+                now = time.time()
+                next_due = None
+                for entry in list(self._entries):
+                    if entry.polling:
+                        continue
+                    if entry.due <= now:
+                        entry.polling = True
+                        self._pool.spawn_n(self._poll, entry)
+                    elif next_due is None or entry.due < next_due:
+                        next_due = entry.due
+                if self._wakeup.ready():
+                    self._wakeup = event.Event()
+                timeout = None if next_due is None else next_due - now
+                with eventlet.Timeout(timeout, False):
+                    self._wakeup.wait()
+        finally:
+            self._thread = None
+            LOG.info(_LI('NWA workflow poller: stop'))
+
+    def _poll(self, entry):
+        try:
+            self.stats['polls'] += 1
+            entry.polls += 1
+            with nwa_deadline.until(entry.deadline):
+                http_status, rw = entry.fetch(entry.execution_id)
+            if not isinstance(rw, dict):
+                LOG.error(_LE('NWA workflow: failed %(http_status)s '
+                              '%(body)s'),
+                          {'http_status': http_status, 'body': rw})
+                self._finish(entry, (http_status, None))
+            elif rw.get('status') != 'RUNNING':
+                LOG.debug('%s', rw)
+                self._finish(entry, (http_status, rw))
+            else:
+                entry.http_status = http_status
+                if not entry.schedule(time.time()):
+                    LOG.warning(_LW('NWA workflow: retry over. retry count '
+                                    'is %s.'), entry.polls)
+                    self.stats['retry_over'] += 1
+                    if entry.on_retry_over is None:
+                        self._finish(entry, (http_status, None))
+                    else:
+                        self._entries.discard(entry)
+                        eventlet.spawn_n(self._retry_over, entry)
+        except Exception as e:
+            LOG.error(_LE('NWA workflow: %s'), e)
+            self._finish(entry, (entry.http_status, None))
+        finally:
+            entry.polling = False
+            self._wake()
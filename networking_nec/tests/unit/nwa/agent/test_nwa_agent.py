@@ -34,9 +34,45 @@ class TestNECNWANeutronAgentAsNwaClient(base.TestNWAAgentBase):
         self.assertIsNotNone(self.agent.callback_nwa)
         self.assertIsNotNone(self.agent.callback_proxy)
 
+    @patch('eventlet.spawn_n')
+    @patch('neutron.common.rpc.Connection')
+    @patch('neutron.agent.rpc.PluginReportStateAPI')
+    @patch('networking_nec.nwa.l2.rpc.tenant_binding_api.'
+           'TenantBindingServerRpcApi')
+    def test__setup_rpc_resume_workflows(self, f1, f2, f3, spawn_n):
+        self.agent.setup_rpc()
+        self.assertTrue(self.agent.resuming)
+        self.assertEqual(0, self.agent.client.resume_workflows.call_count)
+        spawn_n.assert_called_once_with(self.agent._resume_workflows)
+        self.agent._resume_workflows()
+        self.assertFalse(self.agent.resuming)
+        self.assertEqual(1, self.agent.client.resume_workflows.call_count)
+        self.assertIsNone(self.agent.server_manager._deferred)
+
+    def test__resume_workflows_fail(self):
+        self.agent.resuming = True
+        self.agent.server_manager.hold()
+        self.agent.client.resume_workflows.side_effect = ValueError('dummy')
+        self.agent._resume_workflows()
+        self.assertFalse(self.agent.resuming)
+        self.assertIsNone(self.agent.server_manager._deferred)
+
     def test__report_state(self):
         self.assertIsNone(self.agent._report_state())
 
+    def test_get_stats(self):
+        self.agent.client.get_stats.return_value = {'http_pool': {}}
+        self.agent.warm_pool = None
+        stats = self.agent.get_stats()
+        self.assertEqual({}, stats['http_pool'])
+        self.assertIn('binding_cache', stats)
+        self.assertNotIn('warm_pool', stats)
+
+    def test__report_state_stats(self):
+        self.agent.client.get_stats.return_value = {'http_pool': {}}
+        self.agent._report_state()
+        self.assertIn('nwa_stats', self.agent.agent_state['configurations'])
+
     def test_loop_handler(self):
         self.assertIsNone(self.agent.loop_handler())
 
@@ -14,6 +14,7 @@
 
 import os.path
 
+import eventlet
 import mock
 from oslo_serialization import jsonutils
 import six
@@ -21,6 +22,7 @@ import testscenarios
 
 from networking_nec.nwa.agent import proxy_l2
 from networking_nec.nwa.common import exceptions as nwa_exc
+from networking_nec.nwa.nwalib import tenant_state
 from networking_nec.tests.unit.nwa.agent import base
 
 
@@ -121,6 +123,273 @@ class TestAgentProxyL2(base.TestNWAAgentBase):
         nwa_data = {'VLAN_LB_%s_%s_VlanID' % (network_id, segment): '4000'}
         self.assertEqual(1, proxy_l2.check_vlan(network_id, nwa_data))
 
+    def test_check_vlan_tenant_state(self):
+        network_id = '546a8551-5c2b-4050-a769-cc3c962fc5cf'
+        segment = 'OpenStack/DC1/APP'
+        nwa_data = tenant_state.TenantState({
+            'VLAN_%s' % network_id: 'physical_network',
+            'VLAN_%s_VlanID' % network_id: '4000',
+            'VLAN_%s_%s_GD' % (network_id, segment): 'physical_network',
+            'VLAN_%s_%s_GD_VlanID' % (network_id, segment): '4000',
+            'VLAN_LB_%s_%s_VlanID' % (network_id, segment): '4001'})
+        self.assertEqual(2, proxy_l2.check_vlan(network_id, nwa_data))
+        self.assertEqual(0, proxy_l2.check_vlan('X', nwa_data))
+
+    @mock.patch('eventlet.spawn_after')
+    def test__notify_port_state_deferred(self, spawn_after):
+        nwa_info = {'device': {'id': 'dev-1'}, 'port': {'id': 'port-1'}}
+        l2 = self.agent.proxy_l2
+        l2.nwa_l2_rpc = mock.MagicMock()
+        l2._notify_port_state(mock.sentinel.context, nwa_info,
+                              mock.sentinel.segment, 'net-1', delay=20)
+        self.assertEqual(0, l2.nwa_l2_rpc.
+                         update_port_state_with_notifier.call_count)
+        spawn_after.assert_called_once_with(
+            20, l2._deferred_notify, mock.sentinel.context, 'dev-1',
+            self.agent.agent_id, 'port-1', mock.sentinel.segment, 'net-1')
+
+        # scheduled again before it is sent
+        first = spawn_after.return_value
+        l2._notify_port_state(mock.sentinel.context, nwa_info,
+                              mock.sentinel.segment, 'net-1', delay=20)
+        first.cancel.assert_called_once_with()
+        self.assertEqual(2, spawn_after.call_count)
+
+        l2._deferred_notify(*spawn_after.call_args[0][2:])
+        l2.nwa_l2_rpc.update_port_state_with_notifier.assert_called_once_with(
+            mock.sentinel.context, 'dev-1', self.agent.agent_id, 'port-1',
+            mock.sentinel.segment, 'net-1')
+        self.assertEqual({}, l2._deferred_notifies)
+
+    @mock.patch('networking_nec.nwa.agent.proxy_tenant.'
+                'AgentProxyTenant.get_tenant_binding')
+    @mock.patch('eventlet.spawn_after')
+    def test_delete_general_dev_cancels_notify(self, spawn_after, gtb):
+        nwa_info = {'device': {'id': 'dev-1'}, 'port': {'id': 'port-1'},
+                    'network': {'id': 'net-1'},
+                    'resource_group_name': 'OpenStack/DC1/APP'}
+        l2 = self.agent.proxy_l2
+        l2.nwa_l2_rpc = mock.MagicMock()
+        l2._notify_port_state(mock.sentinel.context, nwa_info,
+                              mock.sentinel.segment, 'net-1', delay=20)
+        gtb.return_value = {}
+        l2.delete_general_dev(mock.sentinel.context, tenant_id='T1',
+                              nwa_tenant_id='DC1_T1', nwa_info=nwa_info)
+        spawn_after.return_value.cancel.assert_called_once_with()
+        self.assertEqual({}, l2._deferred_notifies)
+
+    def test__notify_port_state_no_delay(self):
+        nwa_info = {'device': {'id': 'dev-1'}, 'port': {'id': 'port-1'}}
+        l2 = self.agent.proxy_l2
+        l2.nwa_l2_rpc = mock.MagicMock()
+        l2._notify_port_state(mock.sentinel.context, nwa_info,
+                              mock.sentinel.segment, 'net-1')
+        l2.nwa_l2_rpc.update_port_state_with_notifier.assert_called_once_with(
+            mock.sentinel.context, 'dev-1', self.agent.agent_id, 'port-1',
+            mock.sentinel.segment, 'net-1')
+
+    def test__ensure_l2_network_joins_warm_up(self):
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_' + tenant_id
+        l2 = self.agent.proxy_l2
+        stored = {}
+
+        def create_tenant_nw(nwa_tenant_id, resource_group_name):
+            eventlet.sleep(0)
+            return 200, {'status': 'SUCCEED'}
+
+        def update_tenant_binding(context, tid, ntid, nwa_data, **kwargs):
+            stored.update(nwa_data)
+            return True
+
+        def create_vlan(context, nwa_data=None, **kwargs):
+            nwa_data['NW_net-1'] = 'LNW_BusinessVLAN_100'
+            return nwa_data
+
+        proxy_tenant = mock.MagicMock()
+        proxy_tenant.get_tenant_binding.side_effect = (
+            lambda *args: dict(stored))
+        proxy_tenant.create_tenant.return_value = {'CreateTenant': True}
+        proxy_tenant.update_tenant_binding.side_effect = (
+            update_tenant_binding)
+        self.nwacli.l2.create_tenant_nw.side_effect = create_tenant_nw
+        nwa_info = {'network': {'id': 'net-1'},
+                    'device': {'owner': 'compute:DC1_KVM'},
+                    'resource_group_name_nw': 'OpenStack/DC1/APP'}
+        with mock.patch.object(l2.agent_top, 'proxy_tenant', proxy_tenant), \
+                mock.patch.object(l2, '_create_vlan',
+                                  side_effect=create_vlan):
+            warm = eventlet.spawn(l2.warm_tenant_nw, mock.sentinel.context,
+                                  tenant_id, nwa_tenant_id,
+                                  'OpenStack/DC1/APP')
+            eventlet.sleep(0)
+            nwa_data = l2._ensure_l2_network(
+                mock.sentinel.context, tenant_id=tenant_id,
+                nwa_tenant_id=nwa_tenant_id, nwa_info=nwa_info)
+            self.assertTrue(warm.wait())
+        self.assertEqual(1, self.nwacli.l2.create_tenant_nw.call_count)
+        self.assertTrue(nwa_data['CreateTenantNW'])
+        self.assertEqual('LNW_BusinessVLAN_100', nwa_data['NW_net-1'])
+        # only the warm-up wrote the binding.
+        self.assertEqual(2, proxy_tenant.update_tenant_binding.call_count)
+        self.assertEqual({'created': 1, 'joined': 1}, l2.ensure_stats)
+        self.assertEqual({}, l2._ensuring)
+
+    def test__ensure_l2_network_no_intermediate_binding(self):
+        l2 = self.agent.proxy_l2
+        proxy_tenant = mock.MagicMock()
+        proxy_tenant.get_tenant_binding.return_value = {'CreateTenant': True}
+        self.nwacli.l2.create_tenant_nw.return_value = (
+            200, {'status': 'SUCCEED'})
+        nwa_info = {'network': {'id': 'net-1'},
+                    'device': {'owner': 'compute:DC1_KVM'},
+                    'resource_group_name_nw': 'OpenStack/DC1/APP'}
+        with mock.patch.object(l2.agent_top, 'proxy_tenant', proxy_tenant), \
+                mock.patch.object(l2, '_create_vlan') as create_vlan:
+            nwa_data = l2._ensure_l2_network(
+                mock.sentinel.context, tenant_id='T1', nwa_tenant_id='DC1T1',
+                nwa_info=nwa_info)
+        self.assertTrue(nwa_data['CreateTenantNW'])
+        self.assertEqual(1, create_vlan.call_count)
+        self.assertEqual(0, proxy_tenant.update_tenant_binding.call_count)
+
+    def test_ensure_l2_network_updates_binding(self):
+        l2 = self.agent.proxy_l2
+        proxy_tenant = mock.MagicMock()
+        proxy_tenant.get_tenant_binding.return_value = {'CreateTenant': True}
+        self.nwacli.l2.create_tenant_nw.return_value = (
+            200, {'status': 'SUCCEED'})
+        self.nwacli.l2.create_vlan.return_value = (
+            200, {'status': 'SUCCEED',
+                  'resultdata': {'LogicalNWName': 'LNW_BusinessVLAN_100',
+                                 'VlanID': '4000'}})
+        nwa_info = {'network': {'id': 'net-1', 'name': 'net1',
+                                'vlan_type': 'BusinessVLAN'},
+                    'subnet': {'id': 'sub-1', 'netaddr': '192.168.1.0',
+                               'mask': '24'},
+                    'device': {'owner': 'network:dhcp'},
+                    'resource_group_name_nw': 'OpenStack/DC1/APP'}
+        with mock.patch.object(l2.agent_top, 'proxy_tenant', proxy_tenant):
+            l2.ensure_l2_network(
+                mock.sentinel.context, tenant_id='T1', nwa_tenant_id='DC1T1',
+                nwa_info=nwa_info)
+        proxy_tenant.update_tenant_binding.assert_called_once_with(
+            mock.sentinel.context, 'T1', 'DC1T1', mock.ANY)
+        nwa_data = proxy_tenant.update_tenant_binding.call_args[0][3]
+        self.assertTrue(nwa_data['CreateTenantNW'])
+        self.assertEqual('LNW_BusinessVLAN_100',
+                         nwa_data['NW_net-1_nwa_network_name'])
+        self.assertEqual('4000', nwa_data['VLAN_net-1_VlanID'])
+
+    def test_warm_tenant_nw(self):
+        l2 = self.agent.proxy_l2
+        proxy_tenant = mock.MagicMock()
+        proxy_tenant.get_tenant_binding.return_value = {}
+        proxy_tenant.create_tenant.return_value = {'CreateTenant': True}
+        self.nwacli.l2.create_tenant_nw.return_value = (
+            200, {'status': 'SUCCEED'})
+        with mock.patch.object(l2.agent_top, 'proxy_tenant', proxy_tenant):
+            self.assertTrue(l2.warm_tenant_nw(
+                mock.sentinel.context, 'T1', 'DC1T1', 'OpenStack/DC1/APP'))
+            proxy_tenant.get_tenant_binding.return_value = {
+                'CreateTenant': True}
+            self.assertFalse(l2.warm_tenant_nw(
+                mock.sentinel.context, 'T1', 'DC1T1', 'OpenStack/DC1/APP'))
+        self.nwacli.l2.create_tenant_nw.assert_called_once_with(
+            'DC1T1', 'OpenStack/DC1/APP')
+        proxy_tenant.update_tenant_binding.assert_called_with(
+            mock.sentinel.context, 'T1', 'DC1T1',
+            {'CreateTenant': True, 'CreateTenantNW': True})
+
+    def test_reap_tenant_nw(self):
+        l2 = self.agent.proxy_l2
+        proxy_tenant = mock.MagicMock()
+        proxy_tenant.get_tenant_binding.return_value = {
+            'CreateTenant': True, 'CreateTenantNW': True, 'NW_net-1': 'x'}
+        self.nwacli.l2.delete_tenant_nw.return_value = (
+            200, {'status': 'SUCCEED'})
+        with mock.patch.object(l2.agent_top, 'proxy_tenant', proxy_tenant):
+            self.assertFalse(l2.reap_tenant_nw(
+                mock.sentinel.context, 'T1', 'DC1T1'))
+            proxy_tenant.get_tenant_binding.return_value = {
+                'CreateTenant': True, 'CreateTenantNW': True}
+            self.assertTrue(l2.reap_tenant_nw(
+                mock.sentinel.context, 'T1', 'DC1T1'))
+        self.nwacli.l2.delete_tenant_nw.assert_called_once_with('DC1T1')
+        proxy_tenant.delete_tenant_binding.assert_called_once_with(
+            mock.sentinel.context, 'T1', 'DC1T1')
+        self.assertEqual({}, l2._ensuring)
+
+    def _apply_resumed_workflow(self, nwa_data, name, request, http_status,
+                                body):
+        l2 = self.agent.proxy_l2
+        proxy_tenant = mock.MagicMock()
+        proxy_tenant.get_tenant_binding.return_value = nwa_data
+        entry = {'execution_id': '1', 'tenant_id': 'RegionOneT1',
+                 'name': name, 'body': request}
+        with mock.patch.object(l2.agent_top, 'proxy_tenant', proxy_tenant):
+            applied = l2.apply_resumed_workflow(
+                mock.sentinel.context, entry, http_status, body)
+        return applied, proxy_tenant
+
+    def test_apply_resumed_workflow_create_tenant_nw(self):
+        nwa_data = {'CreateTenant': True}
+        applied, proxy_tenant = self._apply_resumed_workflow(
+            nwa_data, 'CreateTenantNW', {}, 200, {'status': 'SUCCEED'})
+        self.assertTrue(applied)
+        self.assertTrue(nwa_data['CreateTenantNW'])
+        proxy_tenant.update_tenant_binding.assert_called_once_with(
+            mock.sentinel.context, 'T1', 'RegionOneT1', nwa_data)
+
+    def test_apply_resumed_workflow_failed(self):
+        applied, proxy_tenant = self._apply_resumed_workflow(
+            {'CreateTenant': True}, 'CreateTenantNW', {}, 200,
+            {'status': 'FAILED'})
+        self.assertFalse(applied)
+        self.assertEqual(0, proxy_tenant.get_tenant_binding.call_count)
+
+    def test_apply_resumed_workflow_delete_vlan(self):
+        nwa_data = {'CreateTenant': True, 'CreateTenantNW': True,
+                    'NW_net-1': 'net1',
+                    'NW_net-1_network_id': 'net-1',
+                    'NW_net-1_subnet_id': 'sub-1',
+                    'NW_net-1_subnet': '192.168.1.0',
+                    'NW_net-1_nwa_network_name': 'LNW_BusinessVLAN_100',
+                    'VLAN_net-1': 'physical_network',
+                    'VLAN_net-1_VlanID': '4000',
+                    'VLAN_net-1_CreateVlan': ''}
+        request = {'DeleteNW_VlanLogicalName1': 'LNW_BusinessVLAN_100'}
+        l2 = self.agent.proxy_l2
+        l2.nwa_l2_rpc = mock.MagicMock()
+        applied, __ = self._apply_resumed_workflow(
+            nwa_data, 'DeleteVLAN', request, 200, {'status': 'SUCCEED'})
+        self.assertTrue(applied)
+        self.assertEqual({'CreateTenant': True, 'CreateTenantNW': True},
+                         nwa_data)
+        rpc = l2.nwa_l2_rpc.release_dynamic_segment_from_agent
+        rpc.assert_called_once_with(mock.sentinel.context, None, 'net-1')
+
+    def test_apply_resumed_workflow_create_vlan(self):
+        request = {'CreateNW_VlanLogicalID1': 'net-1',
+                   'CreateNW_VlanType1': 'BusinessVLAN'}
+        body = {'status': 'SUCCEED',
+                'resultdata': {'LogicalNWName': 'LNW_BusinessVLAN_100',
+                               'VlanID': '4000'}}
+        applied, proxy_tenant = self._apply_resumed_workflow(
+            {'CreateTenant': True, 'CreateTenantNW': True}, 'CreateVLAN',
+            request, 200, body)
+        self.assertFalse(applied)
+        self.nwacli.l2.delete_vlan.assert_called_once_with(
+            'RegionOneT1', 'LNW_BusinessVLAN_100', 'BusinessVLAN')
+        self.assertEqual(0, proxy_tenant.update_tenant_binding.call_count)
+
+    def test_apply_resumed_workflow_general_dev(self):
+        applied, proxy_tenant = self._apply_resumed_workflow(
+            {'CreateTenant': True}, 'CreateGeneralDev', {}, 200,
+            {'status': 'SUCCEED'})
+        self.assertFalse(applied)
+        self.assertEqual(0, proxy_tenant.update_tenant_binding.call_count)
+
 
 class TestAgentProxyL2CreateGeneralDev(testscenarios.WithScenarios,
                                        base.TestNWAAgentBase):
@@ -384,6 +653,13 @@ class TestGetResourceGroupName(base.TestNWAAgentBase):
                                              dev_type))
 
 
+class TestGetResourceGroupNameTenantState(TestGetResourceGroupName):
+
+    def setUp(self):
+        super(TestGetResourceGroupNameTenantState, self).setUp()
+        self.nwa_data = tenant_state.TenantState(self.nwa_data)
+
+
 class TestNECNWANeutronAgentRpc(testscenarios.WithScenarios,
                                 base.TestNWAAgentBase):
 
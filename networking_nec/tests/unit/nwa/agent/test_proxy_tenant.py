@@ -13,7 +13,10 @@
 #    under the License.
 
 import mock
+from oslo_config import cfg
 
+from networking_nec.nwa.agent import proxy_tenant
+from networking_nec.nwa.nwalib import tenant_state
 from networking_nec.tests.unit.nwa.agent import base
 
 
@@ -95,3 +98,212 @@ class TestAgentProxyTenant(base.TestNWAAgentBase):
             nwa_data,
             False
         )
+
+    @mock.patch('networking_nec.nwa.l2.rpc.tenant_binding_api.'
+                'TenantBindingServerRpcApi.get_nwa_tenant_binding')
+    def test_get_tenant_binding(self, gtb):
+        context = mock.MagicMock()
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_844eb55f21e84a289e9c22098d387e5d'
+        gtb.return_value = {'CreateTenant': True}
+        nwa_data = self.agent.proxy_tenant.get_tenant_binding(
+            context, tenant_id, nwa_tenant_id)
+        self.assertIsInstance(nwa_data, tenant_state.TenantState)
+        self.assertEqual({'CreateTenant': True}, nwa_data)
+        gtb.assert_called_once_with(context, tenant_id, nwa_tenant_id)
+
+        gtb.return_value = None
+        self.assertIsNone(self.agent.proxy_tenant.get_tenant_binding(
+            context, tenant_id, nwa_tenant_id))
+
+    def test_update_tenant_binding_patch(self):
+        context = mock.MagicMock()
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_844eb55f21e84a289e9c22098d387e5d'
+        rpc = mock.MagicMock()
+        rpc.update_nwa_tenant_binding.return_value = {'status': 'SUCCESS',
+                                                      'version': 3}
+        self.agent.proxy_tenant.nwa_tenant_rpc = rpc
+        nwa_data = tenant_state.TenantState({'CreateTenant': True,
+                                             'NW_1': 'net1'})
+        nwa_data.version = 2
+        nwa_data['NW_2'] = 'net2'
+        del nwa_data['NW_1']
+
+        ret = self.agent.proxy_tenant.update_tenant_binding(
+            context, tenant_id, nwa_tenant_id, nwa_data)
+        self.assertEqual('SUCCESS', ret['status'])
+        rpc.update_nwa_tenant_binding.assert_called_once_with(
+            context, tenant_id, nwa_tenant_id, {'NW_2': 'net2'}, ['NW_1'], 2)
+        self.assertEqual(0, rpc.set_nwa_tenant_binding.call_count)
+        self.assertEqual(({}, []), nwa_data.get_changes())
+        self.assertEqual(3, nwa_data.version)
+
+        # nothing changed since
+        self.agent.proxy_tenant.update_tenant_binding(
+            context, tenant_id, nwa_tenant_id, nwa_data)
+        self.assertEqual(1, rpc.update_nwa_tenant_binding.call_count)
+
+    def test_update_tenant_binding_patch_failed(self):
+        context = mock.MagicMock()
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_844eb55f21e84a289e9c22098d387e5d'
+        rpc = mock.MagicMock()
+        rpc.update_nwa_tenant_binding.return_value = {'status': 'FAILED'}
+        self.agent.proxy_tenant.nwa_tenant_rpc = rpc
+        nwa_data = tenant_state.TenantState({'CreateTenant': True})
+        nwa_data['NW_1'] = 'net1'
+
+        ret = self.agent.proxy_tenant.update_tenant_binding(
+            context, tenant_id, nwa_tenant_id, nwa_data)
+        self.assertEqual({'status': 'FAILED'}, ret)
+        self.assertEqual(0, rpc.set_nwa_tenant_binding.call_count)
+        self.assertEqual(0, rpc.get_nwa_tenant_binding_if_modified.call_count)
+        self.assertEqual(({'NW_1': 'net1'}, []), nwa_data.get_changes())
+
+    def test_update_tenant_binding_patch_conflict(self):
+        context = mock.MagicMock()
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_844eb55f21e84a289e9c22098d387e5d'
+        rpc = mock.MagicMock()
+        rpc.update_nwa_tenant_binding.side_effect = [
+            {'status': 'FAILED'}, {'status': 'SUCCESS', 'version': 5}]
+        rpc.get_nwa_tenant_binding_if_modified.return_value = {
+            'version': 4,
+            'nwa_data': {'CreateTenant': True, 'NW_1': 'net1',
+                         'NW_3': 'net3'}}
+        self.agent.proxy_tenant.nwa_tenant_rpc = rpc
+        nwa_data = tenant_state.TenantState({'CreateTenant': True,
+                                             'NW_1': 'net1'})
+        nwa_data.version = 2
+        nwa_data['NW_2'] = 'net2'
+        del nwa_data['NW_1']
+
+        ret = self.agent.proxy_tenant.update_tenant_binding(
+            context, tenant_id, nwa_tenant_id, nwa_data)
+        self.assertEqual('SUCCESS', ret['status'])
+        rpc.get_nwa_tenant_binding_if_modified.assert_called_once_with(
+            context, tenant_id, nwa_tenant_id, None)
+        rpc.update_nwa_tenant_binding.assert_called_with(
+            context, tenant_id, nwa_tenant_id, {'NW_2': 'net2'}, ['NW_1'], 4)
+        self.assertEqual(0, rpc.set_nwa_tenant_binding.call_count)
+        self.assertEqual({'CreateTenant': True, 'NW_2': 'net2',
+                          'NW_3': 'net3'}, nwa_data)
+        self.assertEqual(({}, []), nwa_data.get_changes())
+        self.assertEqual(5, nwa_data.version)
+
+    def test_update_tenant_binding_patch_conflict_again(self):
+        context = mock.MagicMock()
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_844eb55f21e84a289e9c22098d387e5d'
+        rpc = mock.MagicMock()
+        rpc.update_nwa_tenant_binding.return_value = {'status': 'FAILED'}
+        rpc.get_nwa_tenant_binding_if_modified.return_value = {
+            'version': 4, 'nwa_data': {'CreateTenant': True}}
+        self.agent.proxy_tenant.nwa_tenant_rpc = rpc
+        nwa_data = tenant_state.TenantState({'CreateTenant': True})
+        nwa_data.version = 2
+        nwa_data['NW_1'] = 'net1'
+
+        ret = self.agent.proxy_tenant.update_tenant_binding(
+            context, tenant_id, nwa_tenant_id, nwa_data)
+        self.assertEqual('FAILED', ret['status'])
+        self.assertEqual(2, rpc.update_nwa_tenant_binding.call_count)
+        self.assertEqual(0, rpc.set_nwa_tenant_binding.call_count)
+        self.assertEqual(2, nwa_data.version)
+
+
+class TestTenantBindingCache(base.TestNWAAgentBase):
+
+    tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+    nwa_tenant_id = 'DC1_844eb55f21e84a289e9c22098d387e5d'
+
+    def setUp(self):
+        super(TestTenantBindingCache, self).setUp()
+        self.context = mock.MagicMock()
+        self.rpc = mock.MagicMock()
+        self.proxy = self.agent.proxy_tenant
+        self.proxy.nwa_tenant_rpc = self.rpc
+        self.proxy.binding_cache = proxy_tenant.TenantBindingCache(2)
+
+    def get(self):
+        return self.proxy.get_tenant_binding(
+            self.context, self.tenant_id, self.nwa_tenant_id)
+
+    def test_cache_disabled_by_default(self):
+        self.assertIsNone(proxy_tenant.AgentProxyTenant(
+            mock.MagicMock(), mock.MagicMock()).binding_cache)
+        self.assertEqual({}, proxy_tenant.AgentProxyTenant(
+            mock.MagicMock(), mock.MagicMock()).get_binding_cache_stats())
+
+    def test_cache_enabled_with_document_backend(self):
+        cfg.CONF.set_override('tenant_binding_cache_size', 10, group='NWA')
+        self.assertIsNone(proxy_tenant.AgentProxyTenant(
+            mock.MagicMock(), mock.MagicMock()).binding_cache)
+        cfg.CONF.set_override('tenant_binding_backend', 'document',
+                              group='NWA')
+        self.assertIsNotNone(proxy_tenant.AgentProxyTenant(
+            mock.MagicMock(), mock.MagicMock()).binding_cache)
+
+    def test_get_tenant_binding(self):
+        gtb = self.rpc.get_nwa_tenant_binding_if_modified
+        gtb.return_value = {'version': 1, 'nwa_data': {'CreateTenant': True}}
+        nwa_data = self.get()
+        self.assertEqual({'CreateTenant': True}, nwa_data)
+        self.assertEqual(1, nwa_data.version)
+        gtb.assert_called_once_with(self.context, self.tenant_id,
+                                    self.nwa_tenant_id, None)
+
+        # not modified
+        gtb.return_value = {'version': 1}
+        nwa_data['NW_1'] = 'net1'       # not written back
+        nwa_data = self.get()
+        self.assertEqual({'CreateTenant': True}, nwa_data)
+        gtb.assert_called_with(self.context, self.tenant_id,
+                               self.nwa_tenant_id, 1)
+
+        # refreshed by the write of the agent
+        self.rpc.update_nwa_tenant_binding.return_value = {
+            'status': 'SUCCESS', 'version': 2}
+        nwa_data['NW_1'] = 'net1'
+        self.proxy.update_tenant_binding(
+            self.context, self.tenant_id, self.nwa_tenant_id, nwa_data)
+        gtb.return_value = {'version': 2}
+        self.assertEqual({'CreateTenant': True, 'NW_1': 'net1'}, self.get())
+        gtb.assert_called_with(self.context, self.tenant_id,
+                               self.nwa_tenant_id, 2)
+
+        # updated by someone else
+        gtb.return_value = {'version': 4, 'nwa_data': {'CreateTenant': True}}
+        self.assertEqual({'CreateTenant': True}, self.get())
+        self.assertEqual({'hits': 2, 'misses': 2, 'evictions': 0, 'size': 1},
+                         self.proxy.get_binding_cache_stats())
+
+    def test_get_tenant_binding_unversioned(self):
+        gtb = self.rpc.get_nwa_tenant_binding_if_modified
+        gtb.return_value = {'version': None, 'nwa_data': {'CreateTenant': 1}}
+        self.get()
+        self.get()
+        gtb.assert_called_with(self.context, self.tenant_id,
+                               self.nwa_tenant_id, None)
+        self.assertEqual(0, self.proxy.get_binding_cache_stats()['size'])
+
+    def test_delete_tenant_binding(self):
+        gtb = self.rpc.get_nwa_tenant_binding_if_modified
+        gtb.return_value = {'version': 1, 'nwa_data': {'CreateTenant': True}}
+        self.get()
+        self.proxy.delete_tenant_binding(
+            self.context, self.tenant_id, self.nwa_tenant_id)
+        self.rpc.delete_nwa_tenant_binding.assert_called_once_with(
+            self.context, self.tenant_id, self.nwa_tenant_id)
+        self.assertEqual(0, self.proxy.get_binding_cache_stats()['size'])
+
+    def test_lru(self):
+        cache = proxy_tenant.TenantBindingCache(2)
+        for key in ('T1', 'T2'):
+            cache.put(key, tenant_state.TenantState({'key': key}))
+        self.assertIsNotNone(cache.get('T1'))
+        cache.put('T3', tenant_state.TenantState({'key': 'T3'}))
+        self.assertIsNone(cache.get('T2'))
+        self.assertEqual({'key': 'T1'}, cache.get('T1'))
+        self.assertEqual(1, cache.get_stats()['evictions'])
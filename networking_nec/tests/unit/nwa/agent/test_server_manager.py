@@ -12,8 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 import mock
+from neutron.tests import base as neutron_base
+from oslo_config import cfg
 
+from networking_nec.nwa.agent import server_manager
 from networking_nec.tests.unit.nwa.agent import base
 
 
@@ -63,3 +67,412 @@ class TestAgentServerManager(base.TestNWAAgentBase):
         rd = self.agent.server_manager.delete_tenant_rpc_server(tenant_id)
         self.assertIsInstance(rd, dict)
         self.assertEqual(rd['result'], 'FAILED')
+
+    @mock.patch('oslo_messaging.rpc.server.get_rpc_server')
+    def test_create_delete_tenant_rpc_server_multiplexed(self, grs):
+        cfg.CONF.set_override('tenant_queue_mode', 'multiplexed', group='NWA')
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        sm = self.agent.server_manager
+        sm.rpc_servers = {}
+        rd = sm.create_tenant_rpc_server(tenant_id)
+        self.assertEqual('SUCCESS', rd['result'])
+        self.assertEqual(self.agent.topic, rd['topic'])
+        self.assertEqual(0, grs.call_count)
+        self.assertEqual([self.agent.topic], sm.get_rpc_server_topics())
+        rd = sm.delete_tenant_rpc_server(tenant_id)
+        self.assertEqual('SUCCESS', rd['result'])
+        self.assertEqual({}, sm.rpc_servers)
+
+    @mock.patch('oslo_messaging.rpc.server.get_rpc_server')
+    def test_evict_idle_tenant_rpc_servers(self, grs):
+        cfg.CONF.set_override('tenant_rpc_server_idle_timeout', 60,
+                              group='NWA')
+        sm = self.agent.server_manager
+        sm.rpc_servers = {}
+        sm.create_tenant_rpc_server('T1')
+        sm.create_tenant_rpc_server('T2')
+        sm.enter('T2')
+        now = sm.last_used['T1'] + 61
+        self.assertEqual(['T1'], sm.evict_idle_tenant_rpc_servers(now))
+        self.assertEqual(['T2'], list(sm.rpc_servers))
+        self.assertEqual(['T1'], sm.get_evicted_tenant_ids())
+
+        rd = sm.activate_tenant_rpc_server('T1')
+        self.assertEqual('SUCCESS', rd['result'])
+        self.assertIn('T1', sm.rpc_servers)
+        self.assertEqual([], sm.get_evicted_tenant_ids())
+
+    @mock.patch('oslo_messaging.rpc.server.get_rpc_server')
+    def test_evict_idle_tenant_rpc_servers_disabled(self, grs):
+        sm = self.agent.server_manager
+        sm.rpc_servers = {}
+        sm.create_tenant_rpc_server('T1')
+        now = sm.last_used['T1'] + 3600
+        self.assertEqual([], sm.evict_idle_tenant_rpc_servers(now))
+        self.assertIn('T1', sm.rpc_servers)
+
+    @mock.patch('oslo_messaging.rpc.server.get_rpc_server')
+    def test_create_tenant_rpc_server_warm_new_tenant(self, grs):
+        sm = self.agent.server_manager
+        sm.rpc_servers = {}
+        self.agent.warm_pool = mock.MagicMock()
+        sm.create_tenant_rpc_server('T1')
+        sm.delete_tenant_rpc_server('T1')
+        sm.activate_tenant_rpc_server('T1')
+        self.assertEqual(0, self.agent.warm_pool.warm.call_count)
+        sm.delete_tenant_rpc_server('T1')
+        sm.create_tenant_rpc_server('T1', new_tenant=True)
+        self.agent.warm_pool.warm.assert_called_once_with('T1')
+
+    @mock.patch('oslo_messaging.rpc.server.get_rpc_server')
+    def test_hold_and_release(self, grs):
+        sm = self.agent.server_manager
+        sm.rpc_servers = {}
+        self.agent.warm_pool = mock.MagicMock()
+        sm.hold()
+        sm.create_tenant_rpc_server('T1', new_tenant=True)
+        sm.create_tenant_rpc_server('T2')
+        self.assertEqual(0, grs.return_value.start.call_count)
+        self.assertEqual(0, self.agent.warm_pool.warm.call_count)
+        sm.release()
+        self.assertEqual(2, grs.return_value.start.call_count)
+        self.agent.warm_pool.warm.assert_called_once_with('T1')
+        sm.create_tenant_rpc_server('T3')
+        self.assertEqual(3, grs.return_value.start.call_count)
+
+    @mock.patch('oslo_messaging.rpc.server.get_rpc_server')
+    def test_hold_and_delete(self, grs):
+        sm = self.agent.server_manager
+        sm.rpc_servers = {}
+        sm.hold()
+        sm.create_tenant_rpc_server('T1')
+        rd = sm.delete_tenant_rpc_server('T1')
+        self.assertEqual('SUCCESS', rd['result'])
+        self.assertEqual(0, grs.return_value.stop.call_count)
+        sm.release()
+        self.assertEqual(0, grs.return_value.start.call_count)
+
+    def test_tracking_proxy(self):
+        sm = self.agent.server_manager
+        proxy = mock.MagicMock()
+
+        def method(context, **kwargs):
+            self.assertEqual(1, sm.in_flight['T1'])
+
+        proxy.create_general_dev.side_effect = method
+        tracking = server_manager.TenantTrackingProxy(proxy, sm)
+        tracking.create_general_dev('ctx', tenant_id='T1')
+        self.assertEqual(0, sm.in_flight.get('T1', 0))
+        self.assertIn('T1', sm.last_used)
+
+
+class TestHeldProxy(neutron_base.BaseTestCase):
+
+    def test_held_proxy(self):
+        proxy = mock.MagicMock()
+        circuit_open = [True]
+        held = server_manager.HeldProxy(proxy, lambda: circuit_open[0])
+        waiting = eventlet.spawn(held.create_general_dev, 'ctx',
+                                 tenant_id='T1')
+        eventlet.sleep(0)
+        held.resume()
+        eventlet.sleep(0)
+        # still open: the request waits for the next close.
+        self.assertEqual(0, proxy.create_general_dev.call_count)
+        circuit_open[0] = False
+        held.resume()
+        waiting.wait()
+        proxy.create_general_dev.assert_called_once_with(
+            'ctx', tenant_id='T1')
+        held.delete_general_dev('ctx', tenant_id='T1')
+        self.assertEqual(1, proxy.delete_general_dev.call_count)
+
+
+class TestTenantQueues(neutron_base.BaseTestCase):
+
+    def test_serial_in_tenant(self):
+        queues = server_manager.TenantQueues(4)
+        calls = []
+
+        def request(tid, n):
+            calls.append(('start', tid, n))
+            eventlet.sleep(0)
+            calls.append(('end', tid, n))
+
+        for n in range(3):
+            queues.submit('T1', request, 'T1', n)
+            queues.submit('T2', request, 'T2', n)
+        stats = queues.get_stats()
+        self.assertEqual(2, stats['queues'])
+        self.assertEqual([{'depth': 2, 'running': 1}] * 2,
+                         [{k: stats['tenants'][tid][k]
+                           for k in ('depth', 'running')}
+                          for tid in ('T1', 'T2')])
+        queues._pool.waitall()
+
+        for tid in ('T1', 'T2'):
+            mine = [c for c in calls if c[1] == tid]
+            self.assertEqual([(e, tid, n) for n in range(3)
+                              for e in ('start', 'end')], mine)
+        # the tenants ran concurrently.
+        self.assertNotEqual(calls[:6], sorted(calls[:6], key=lambda c: c[1]))
+        stats = queues.get_stats()
+        self.assertLess(0, stats.pop('max_wait_time'))
+        self.assertEqual({'submitted': 6, 'max_queues': 2, 'queues': 0,
+                          'pending': 0, 'running': 0, 'elided': 0,
+                          'merged': 0, 'held': 0, 'reordered': 0,
+                          'max_tenant_running': 1, 'tenants': {}}, stats)
+
+    def test_bounded_pool(self):
+        queues = server_manager.TenantQueues(2)
+        running = []
+        peak = []
+
+        def request():
+            running.append(1)
+            peak.append(len(running))
+            eventlet.sleep(0.01)
+            running.pop()
+
+        for n in range(10):
+            queues.submit('T%d' % n, request)
+        queues._pool.waitall()
+        self.assertEqual(2, max(peak))
+
+    def test_error_does_not_stop_queue(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock(side_effect=[Exception, None])
+        queues.submit('T1', func, 1)
+        queues.submit('T1', func, 2)
+        queues._pool.waitall()
+        self.assertEqual([mock.call(1), mock.call(2)], func.call_args_list)
+
+    def test_hold_and_resume(self):
+        hold = mock.MagicMock(return_value=False)
+        queues = server_manager.TenantQueues(2, hold=hold)
+        func = mock.MagicMock()
+
+        def first():
+            hold.return_value = True
+
+        queues.submit('T1', first)
+        queues.submit('T1', func, 1)
+        queues._pool.waitall()
+        queues.submit('T1', func, 2)
+        queues._pool.waitall()
+        self.assertEqual(0, func.call_count)
+        self.assertEqual(1, queues.get_stats()['held'])
+
+        hold.return_value = False
+        queues.resume()
+        queues._pool.waitall()
+        self.assertEqual([mock.call(1), mock.call(2)], func.call_args_list)
+        self.assertEqual(0, queues.get_stats()['queues'])
+
+    def test_serialized_proxy(self):
+        queues = mock.MagicMock()
+        proxy = mock.MagicMock()
+        serialized = server_manager.TenantSerializedProxy(proxy, queues)
+        self.assertIsNone(serialized.create_general_dev(
+            mock.sentinel.context, tenant_id='T1', nwa_info={}))
+        tid, request = queues.submit_request.call_args[0]
+        self.assertEqual('T1', tid)
+        self.assertEqual(proxy.create_general_dev, request.func)
+        self.assertEqual((mock.sentinel.context,), request.args)
+        self.assertEqual({'tenant_id': 'T1', 'nwa_info': {}},
+                         request.kwargs)
+        self.assertEqual(server_manager.PRIORITY_NORMAL, request.priority)
+        self.assertIsNone(request.conflicts)
+
+    def test_serialized_proxy_priority(self):
+        queues = mock.MagicMock()
+        serialized = server_manager.TenantSerializedProxy(
+            mock.MagicMock(), queues)
+        floating = {'device_id': 'R1', 'floating_network_id': 'N0'}
+        serialized.setting_nat('ctx', tenant_id='T1', floating=floating)
+        request = queues.submit_request.call_args[0][1]
+        self.assertEqual(server_manager.PRIORITY_HIGH, request.priority)
+        self.assertEqual(frozenset([('device', 'R1'), ('network', 'N0')]),
+                         request.conflicts)
+        self.assertFalse(request.tenant_wide)
+        serialized.delete_tenant_fw('ctx', tenant_id='T1')
+        self.assertTrue(queues.submit_request.call_args[0][1].tenant_wide)
+
+    def test_port_operation_elided(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        queues.submit_port_operation('T1', 'P1', 'create', func, 'create')
+        queues.submit_port_operation('T1', 'P1', 'delete', func, 'delete')
+        queues.submit_port_operation('T1', 'P2', 'create', func, 'create2')
+        queues._pool.waitall()
+        self.assertEqual([mock.call('blocker'), mock.call('delete'),
+                          mock.call('create2')], func.call_args_list)
+        stats = queues.get_stats()
+        self.assertEqual(1, stats['elided'])
+        self.assertEqual(0, stats['pending'])
+
+    def test_port_operation_rebind_then_delete(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit_port_operation('T1', 'P1', 'create', func, 'bind')
+        queues._pool.waitall()
+        # the port is bound again, then deleted before the rebind runs.
+        queues.submit('T1', func, 'blocker')
+        queues.submit_port_operation('T1', 'P1', 'create', func, 'rebind')
+        queues.submit_port_operation('T1', 'P1', 'delete', func, 'delete')
+        queues._pool.waitall()
+        # the GeneralDev created by the first bind is deleted.
+        self.assertEqual([mock.call('bind'), mock.call('blocker'),
+                          mock.call('delete')], func.call_args_list)
+        self.assertEqual(0, queues.get_stats()['pending'])
+
+    def test_port_operation_merged(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        queues.submit_port_operation('T1', 'P1', 'create', func, 'first')
+        queues.submit_port_operation('T1', 'P1', 'create', func, 'second')
+        queues._pool.waitall()
+        self.assertEqual([mock.call('blocker'), mock.call('second')],
+                         func.call_args_list)
+        self.assertEqual(1, queues.get_stats()['merged'])
+
+    def test_port_operation_delete_then_create(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        queues.submit_port_operation('T1', 'P1', 'delete', func, 'delete')
+        queues.submit_port_operation('T1', 'P1', 'create', func, 'create')
+        queues._pool.waitall()
+        self.assertEqual([mock.call('blocker'), mock.call('delete'),
+                          mock.call('create')], func.call_args_list)
+        self.assertEqual(0, queues.get_stats()['elided'])
+
+    def test_serialized_proxy_port_operation(self):
+        queues = mock.MagicMock()
+        proxy = mock.MagicMock()
+        serialized = server_manager.TenantSerializedProxy(proxy, queues)
+        nwa_info = {'port': {'id': 'P1'}}
+        serialized.delete_general_dev('ctx', tenant_id='T1',
+                                      nwa_info=nwa_info)
+        args = queues.submit_request.call_args[0]
+        self.assertEqual(('T1', 'P1', 'delete'), (args[0],) + args[2:])
+        self.assertEqual(proxy.delete_general_dev, args[1].func)
+        self.assertEqual(server_manager.PRIORITY_HIGH, args[1].priority)
+
+    def _request(self, func, name, network, priority):
+        return server_manager.TenantRequest(
+            func, (name,), priority=priority,
+            conflicts=frozenset([('network', network)]))
+
+    def test_priority(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        for name, network, priority in (
+                ('create1', 'N1', server_manager.PRIORITY_NORMAL),
+                ('create2', 'N2', server_manager.PRIORITY_NORMAL),
+                ('delete2', 'N2', server_manager.PRIORITY_HIGH),
+                ('delete3', 'N3', server_manager.PRIORITY_HIGH)):
+            queues.submit_request(
+                'T1', self._request(func, name, network, priority))
+        queues._pool.waitall()
+        # delete2 does not pass create2 on the same network.
+        self.assertEqual(['blocker', 'delete3', 'create1', 'create2',
+                          'delete2'],
+                         [c[0][0] for c in func.call_args_list])
+        self.assertEqual(1, queues.get_stats()['reordered'])
+
+    def test_priority_barrier(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        queues.submit_request('T1', self._request(
+            func, 'create1', 'N1', server_manager.PRIORITY_NORMAL))
+        queues.submit('T1', func, 'unknown')
+        queues.submit_request('T1', self._request(
+            func, 'delete2', 'N2', server_manager.PRIORITY_HIGH))
+        queues._pool.waitall()
+        self.assertEqual(['blocker', 'create1', 'unknown', 'delete2'],
+                         [c[0][0] for c in func.call_args_list])
+
+    def test_priority_tenant_wide(self):
+        queues = server_manager.TenantQueues(1)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        queues.submit_request('T1', self._request(
+            func, 'create1', 'N1', server_manager.PRIORITY_NORMAL))
+        delete = self._request(func, 'delete2', 'N2',
+                               server_manager.PRIORITY_HIGH)
+        delete.tenant_wide = True
+        queues.submit_request('T1', delete)
+        queues.submit_request('T1', self._request(
+            func, 'delete3', 'N3', server_manager.PRIORITY_HIGH))
+        queues._pool.waitall()
+        # delete2 may delete the tenant: it does not pass create1, while
+        # delete3 passes both.
+        self.assertEqual(['blocker', 'delete3', 'create1', 'delete2'],
+                         [c[0][0] for c in func.call_args_list])
+
+    def test_parallel_in_tenant(self):
+        queues = server_manager.TenantQueues(4, parallel=True)
+        calls = []
+
+        def request(name):
+            calls.append(('start', name))
+            eventlet.sleep(0)
+            calls.append(('end', name))
+
+        for name, network in (('create1', 'N1'), ('create2', 'N2'),
+                              ('update1', 'N1')):
+            queues.submit_request('T1', server_manager.TenantRequest(
+                request, (name,),
+                conflicts=frozenset([('network', network)])))
+        queues.submit_request('T1', server_manager.TenantRequest(
+            request, ('delete2',), conflicts=frozenset([('network', 'N2')]),
+            tenant_wide=True))
+        queues.submit_request('T1', server_manager.TenantRequest(
+            request, ('create3',), conflicts=frozenset([('network', 'N3')])))
+        queues._pool.waitall()
+        # create1 and create2 run together, update1 waits for create1 on
+        # N1, and delete2 runs alone after the requests queued before it.
+        self.assertEqual([('start', 'create1'), ('start', 'create2')],
+                         calls[:2])
+        self.assertLess(calls.index(('end', 'create1')),
+                        calls.index(('start', 'update1')))
+        start = calls.index(('start', 'delete2'))
+        self.assertEqual(('end', 'delete2'), calls[start + 1])
+        for name in ('create1', 'create2', 'update1'):
+            self.assertLess(calls.index(('end', name)), start)
+        self.assertIn(('start', 'create3'), calls[:start])
+        self.assertEqual(3, queues.get_stats()['max_tenant_running'])
+        self.assertEqual(0, queues.get_stats()['queues'])
+
+    @mock.patch('time.time')
+    def test_get_stats_tenants(self, now):
+        now.return_value = 100
+        queues = server_manager.TenantQueues(1, hold=lambda: True)
+        queues.submit('T1', mock.MagicMock())
+        now.return_value = 110
+        queues.submit('T1', mock.MagicMock())
+        queues._pool.waitall()
+        now.return_value = 130
+        self.assertEqual({'T1': {'depth': 2, 'running': 0,
+                                 'oldest_wait': 30}},
+                         queues.get_stats()['tenants'])
+
+    @mock.patch('time.time')
+    def test_priority_aging(self, now):
+        now.return_value = 100
+        queues = server_manager.TenantQueues(1, aging=10)
+        func = mock.MagicMock()
+        queues.submit('T1', func, 'blocker')
+        queues.submit_request('T1', self._request(
+            func, 'old', 'N1', server_manager.PRIORITY_NORMAL))
+        now.return_value = 125
+        queues.submit_request('T1', self._request(
+            func, 'new', 'N2', server_manager.PRIORITY_HIGH))
+        queues._pool.waitall()
+        self.assertEqual(['blocker', 'old', 'new'],
+                         [c[0][0] for c in func.call_args_list])
@@ -0,0 +1,69 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from neutron.tests import base
+from oslo_config import cfg
+
+from networking_nec.nwa.agent import warm_pool
+
+
+class TestTenantWarmPool(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestTenantWarmPool, self).setUp()
+        cfg.CONF.set_override('region_name', 'DC1', group='NWA')
+        cfg.CONF.set_override('resource_group_name', 'OpenStack/DC1/APP',
+                              group='NWA')
+        self.agent_top = mock.MagicMock()
+        self.agent_top.server_manager.in_flight = {}
+        self.proxy_l2 = self.agent_top.proxy_l2
+        self.pool = warm_pool.TenantWarmPool(self.agent_top, 2, 60)
+
+    def test_warm(self):
+        self.proxy_l2.warm_tenant_nw.return_value = True
+        self.pool.warm('T1')
+        self.pool._pool.waitall()
+        self.proxy_l2.warm_tenant_nw.assert_called_once_with(
+            self.agent_top.context, 'T1', 'DC1T1', 'OpenStack/DC1/APP')
+        self.assertIn('T1', self.pool.warmed)
+        self.assertEqual(1, self.pool.get_stats()['warmed'])
+
+    def test_warm_existing(self):
+        self.proxy_l2.warm_tenant_nw.return_value = False
+        self.pool.warm('T1')
+        self.pool._pool.waitall()
+        self.assertEqual({}, self.pool.warmed)
+
+    def test_warm_failed(self):
+        self.proxy_l2.warm_tenant_nw.side_effect = Exception
+        self.pool.warm('T1')
+        self.pool._pool.waitall()
+        self.assertEqual(1, self.pool.get_stats()['failed'])
+
+    def test_reap(self):
+        self.proxy_l2.reap_tenant_nw.return_value = True
+        self.pool.warmed = {'T1': 100, 'T2': 150, 'T3': 100}
+        self.agent_top.server_manager.in_flight = {'T3': 1}
+        self.assertEqual(['T1'], self.pool.reap(now=170))
+        self.pool._pool.waitall()
+        self.proxy_l2.reap_tenant_nw.assert_called_once_with(
+            self.agent_top.context, 'T1', 'DC1T1')
+        self.assertEqual({'T2': 150, 'T3': 100}, self.pool.warmed)
+        self.assertEqual(1, self.pool.get_stats()['reaped'])
+
+    def test_reap_disabled(self):
+        self.pool.ttl = 0
+        self.pool.warmed = {'T1': 100}
+        self.assertEqual([], self.pool.reap(now=1000))
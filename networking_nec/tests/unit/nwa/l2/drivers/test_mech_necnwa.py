@@ -231,6 +231,45 @@ class TestNECNWAMechanismDriver(TestMechNwa):
         )
         self.driver.create_port_precommit(self.context)
 
+    def _subnet_context(self):
+        self.context.current = {'id': 'subnet-1', 'network_id': '61',
+                                'cidr': '192.168.120.0/24'}
+        return self.context
+
+    @patch('networking_nec.nwa.l2.utils.is_external_network')
+    def test_create_subnet_postcommit(self, is_ext):
+        context = self._subnet_context()
+        proxy = context._plugin.get_nwa_proxy.return_value
+        is_ext.return_value = False
+        self.driver.create_subnet_postcommit(context)
+        self.assertEqual(0, proxy.ensure_l2_network.call_count)
+
+        cfg.CONF.set_override('l2_network_prewarm', 'business', group='NWA')
+        self.driver.create_subnet_postcommit(context)
+        self.assertEqual(1, proxy.ensure_l2_network.call_count)
+        kwargs = proxy.ensure_l2_network.call_args[1]
+        self.assertEqual('RegionOnetenant201', kwargs['nwa_tenant_id'])
+        self.assertEqual({'id': 'subnet-1', 'netaddr': '192.168.120.0',
+                          'mask': '24'}, kwargs['nwa_info']['subnet'])
+        self.assertEqual('BusinessVLAN',
+                         kwargs['nwa_info']['network']['vlan_type'])
+
+        is_ext.return_value = True
+        self.driver.create_subnet_postcommit(context)
+        self.assertEqual(1, proxy.ensure_l2_network.call_count)
+
+        cfg.CONF.set_override('l2_network_prewarm', 'all', group='NWA')
+        self.driver.create_subnet_postcommit(context)
+        self.assertEqual(2, proxy.ensure_l2_network.call_count)
+
+    @patch('networking_nec.nwa.l2.utils.is_external_network')
+    def test_create_subnet_postcommit_error(self, is_ext):
+        cfg.CONF.set_override('l2_network_prewarm', 'all', group='NWA')
+        context = self._subnet_context()
+        is_ext.return_value = False
+        context._plugin.get_nwa_proxy.side_effect = Exception
+        self.driver.create_subnet_postcommit(context)
+
     def test_update_port_precommit(self):
         for device_owner in (constants.DEVICE_OWNER_ROUTER_INTF,
                              constants.DEVICE_OWNER_ROUTER_GW):
@@ -29,6 +29,15 @@ class TestNECNWAAgentApi(base.BaseTestCase):
     def test_create_server(self):
         tenant_id = '844eb55f21e84a289e9c22098d387e5d'
         self.proxy.create_server(self.context, tenant_id)
+        self.proxy.client.prepare.assert_called_once_with()
+
+    def test_create_server_new_tenant(self):
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        self.proxy.create_server(self.context, tenant_id, new_tenant=True)
+        self.proxy.client.prepare.assert_called_once_with(version='1.2')
+        self.proxy.client.prepare.return_value.cast.assert_called_once_with(
+            self.context, 'create_server', tenant_id=tenant_id,
+            new_tenant=True)
 
     def test_delete_server(self):
         tenant_id = '844eb55f21e84a289e9c22098d387e5d'
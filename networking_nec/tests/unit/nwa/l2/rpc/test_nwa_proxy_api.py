@@ -52,3 +52,11 @@ class TestNECNWAProxyApi(base.BaseTestCase):
         nwa_info = {}
         self.proxy.delete_general_dev(self.context, tenant_id, nwa_tenant_id,
                                       nwa_info)
+
+    def test_ensure_l2_network(self):
+        tenant_id = '844eb55f21e84a289e9c22098d387e5d'
+        nwa_tenant_id = 'DC1_' + tenant_id
+        nwa_info = {}
+        self.proxy.ensure_l2_network(self.context, tenant_id, nwa_tenant_id,
+                                     nwa_info)
+        self.proxy.client.prepare.assert_called_once_with(version='1.1')
@@ -34,3 +34,8 @@ class TestNECNWAProxyCallback(base.BaseTestCase):
     def test_delete_general_dev(self):
         params = {}
         self.callback.delete_general_dev(self.context, kwargs=params)
+
+    def test_ensure_l2_network(self):
+        self.callback.ensure_l2_network(self.context, tenant_id='T1')
+        self.agent.ensure_l2_network.assert_called_once_with(
+            self.context, tenant_id='T1')
@@ -15,11 +15,13 @@
 from mock import MagicMock
 from mock import patch
 from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.sql import expression
 import testscenarios
 
 from neutron import context
 from neutron.tests import base
 from neutron.tests.unit import testlib_api
+from oslo_config import cfg
 
 from networking_nec.nwa.l2 import db_api
 
@@ -186,6 +188,133 @@ class TestAddNwaTenantBinding(testlib_api.SqlTestCaseLight):
             {self.key1: False})
 
 
+class TestAddNwaTenantBindingDocument(TestAddNwaTenantBinding):
+
+    def setUp(self):
+        super(TestAddNwaTenantBindingDocument, self).setUp()
+        cfg.CONF.set_override('tenant_binding_backend', 'document',
+                              group='NWA')
+
+
+class TestSetNwaTenantBindingKeyValue(testlib_api.SqlTestCaseLight):
+    nwa_tenant1 = 'NWA01'
+    tenant1 = 'ffffffffff0000000000000000000001'
+    tenant2 = 'ffffffffff0000000000000000000002'
+
+    def setUp(self):
+        super(TestSetNwaTenantBindingKeyValue, self).setUp()
+        self.ssn = context.get_admin_context().session
+
+    def get_value_json(self, tenant_id):
+        return db_api.get_nwa_tenant_binding(
+            self.ssn, tenant_id, self.nwa_tenant1).value_json
+
+    def test_set(self):
+        value_json = {'KEY%d' % i: 'v%d' % i for i in range(100)}
+        self.assertTrue(db_api.add_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, dict(value_json)))
+        self.assertTrue(db_api.add_nwa_tenant_binding(
+            self.ssn, self.tenant2, self.nwa_tenant1, {'KEY0': 'v0'}))
+
+        for i in range(0, 30):
+            del value_json['KEY%d' % i]
+        for i in range(30, 60):
+            value_json['KEY%d' % i] = 'w%d' % i
+        for i in range(100, 130):
+            value_json['KEY%d' % i] = 'v%d' % i
+        value_json['KEY130'] = True
+        value_json['KEY131'] = None
+        self.assertTrue(db_api.set_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, value_json))
+
+        value_json['KEY131'] = ''
+        self.assertEqual(value_json, self.get_value_json(self.tenant1))
+        self.assertEqual({'KEY0': 'v0'}, self.get_value_json(self.tenant2))
+
+    def test_update(self):
+        self.assertFalse(db_api.update_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'a': '1'}, [], None))
+        self.assertTrue(db_api.add_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1,
+            {'a': 'x', 'b': 'y', 'c': 'z'}))
+        self.assertTrue(db_api.update_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1,
+            {'b': 'y', 'c': 'w', 'd': True}, ['a', 'e'], 5))
+        self.assertEqual({'b': 'y', 'c': 'w', 'd': True},
+                         self.get_value_json(self.tenant1))
+        self.assertIsNone(db_api.get_nwa_tenant_binding_version(
+            self.ssn, self.tenant1, self.nwa_tenant1))
+
+
+class TestSetNwaTenantBindingDocument(testlib_api.SqlTestCaseLight):
+    nwa_tenant1 = 'NWA01'
+    tenant1 = 'ffffffffff0000000000000000000001'
+
+    def setUp(self):
+        super(TestSetNwaTenantBindingDocument, self).setUp()
+        cfg.CONF.set_override('tenant_binding_backend', 'document',
+                              group='NWA')
+        self.ssn = context.get_admin_context().session
+
+    def get_t1(self):
+        return db_api.get_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1)
+
+    def set_t1(self, value_json):
+        return db_api.set_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, value_json)
+
+    def test_set(self):
+        self.assertFalse(self.set_t1({'a': '1'}))  # not found
+        self.assertTrue(db_api.add_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'a': 'x', 'b': 'y'}))
+        item = self.get_t1()
+        self.assertEqual({'a': 'x', 'b': 'y'}, item.value_json)
+        self.assertEqual(1, item.version)
+
+        self.assertTrue(self.set_t1({'b': 'z', 'c': 4000, 'd': None}))
+        item = self.get_t1()
+        self.assertEqual({'b': 'z', 'c': '4000', 'd': ''}, item.value_json)
+        self.assertEqual(2, item.version)
+
+        self.assertFalse(self.set_t1(None))
+        self.assertFalse(db_api.set_nwa_tenant_binding(
+            self.ssn, self.tenant1, 'NWA02', {'a': 'x'}))
+        self.assertEqual(2, self.get_t1().version)
+
+    def test_update(self):
+        self.assertFalse(db_api.update_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'a': '1'}, [], None))
+        self.assertTrue(db_api.add_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'a': 'x', 'b': 'y'}))
+        self.assertTrue(db_api.update_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1,
+            {'b': 'z', 'c': 4000}, ['a'], 1))
+        item = self.get_t1()
+        self.assertEqual({'b': 'z', 'c': '4000'}, item.value_json)
+        self.assertEqual(2, item.version)
+        self.assertEqual(2, db_api.get_nwa_tenant_binding_version(
+            self.ssn, self.tenant1, self.nwa_tenant1))
+
+        # made against an old version
+        self.assertFalse(db_api.update_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'d': 'x'}, [], 1))
+        # unchecked
+        self.assertTrue(db_api.update_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'d': 'x'}, [], None))
+        self.assertEqual({'b': 'z', 'c': '4000', 'd': 'x'},
+                         self.get_t1().value_json)
+
+    def test_key_value_backend_is_not_used(self):
+        self.assertTrue(db_api.add_nwa_tenant_binding(
+            self.ssn, self.tenant1, self.nwa_tenant1, {'a': 'x'}))
+        cfg.CONF.set_override('tenant_binding_backend', 'key_value',
+                              group='NWA')
+        self.assertIsNone(self.get_t1())
+        self.assertIsNone(db_api.NWATenantBinding(
+            self.tenant1, self.nwa_tenant1, {}).version)
+
+
 class TestGetNwaTenantBinding(base.BaseTestCase):
     def setUp(self):
         super(TestGetNwaTenantBinding, self).setUp()
@@ -259,7 +388,7 @@ class TestSetNwaTenantBinding(testscenarios.WithScenarios, base.BaseTestCase):
              'expected_return_value': True,
              'old_value_json': itemval({'A': 1}),
              'new_value_json': {'a': 1},
-             'call_count_update': 1,
+             'call_count_update': 0,
              'call_count_insert': 1,
              'call_count_delete': 1
          }),
@@ -279,7 +408,7 @@ class TestSetNwaTenantBinding(testscenarios.WithScenarios, base.BaseTestCase):
              'expected_return_value': True,
              'old_value_json': itemval({'a': 1}),
              'new_value_json': {'b': 2},
-             'call_count_update': 1,
+             'call_count_update': 0,
              'call_count_insert': 1,
              'call_count_delete': 1
          }),
@@ -295,7 +424,7 @@ class TestSetNwaTenantBinding(testscenarios.WithScenarios, base.BaseTestCase):
                  'b': 1,
                  'c': 2
              },
-             'call_count_update': 1,
+             'call_count_update': 0,
              'call_count_insert': 1,
              'call_count_delete': 1
          }),
@@ -311,12 +440,17 @@ class TestSetNwaTenantBinding(testscenarios.WithScenarios, base.BaseTestCase):
         )
         self.assertEqual(rc, self.expected_return_value)
         if self.expected_return_value:
-            self.assertEqual(self.session.query().filter().one.call_count,
-                             self.call_count_update)
-            self.assertEqual(self.session.execute.call_count,
-                             self.call_count_insert)
-            self.assertEqual(self.session.delete.call_count,
-                             self.call_count_delete)
+            stmts = [c[0][0] for c in self.session.execute.call_args_list]
+            self.assertEqual(
+                self.call_count_update,
+                len([x for x in stmts if isinstance(x, expression.Update)]))
+            self.assertEqual(
+                self.call_count_insert,
+                len([x for x in stmts if isinstance(x, expression.Insert)]))
+            self.assertEqual(
+                self.call_count_delete,
+                self.session.query().filter().delete.call_count)
+            self.assertEqual(0, self.session.delete.call_count)
 
 
 class TestDelNwaTenantBinding(testscenarios.WithScenarios, base.BaseTestCase):
@@ -28,6 +28,14 @@ class TestNWATenantKeyValue(base.BaseTestCase):
                          "<TenantKeyValue(T1,NWA-T1,{'key': 'value'})>")
 
 
+class TestNWATenantBindingDocument(base.BaseTestCase):
+    def test_nwa_tenant_binding_document(self):
+        ntbd = models.NWATenantBindingDocument('T1', 'NWA-T1', '{}')
+        self.assertIsNotNone(ntbd)
+        self.assertEqual(str(ntbd),
+                         "<TenantBindingDocument(T1,NWA-T1,1,{})>")
+
+
 class TestNWATenantQueue(base.BaseTestCase):
     def test_nwa_tenant_queue(self):
         ntq = models.NWATenantQueue('T1', 'NWA-T1', 'topic-1')
@@ -0,0 +1,67 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import circuit_breaker
+
+
+class TestCircuitBreaker(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestCircuitBreaker, self).setUp()
+        self.probe = mock.MagicMock(return_value=False)
+        self.breaker = circuit_breaker.CircuitBreaker(
+            self.probe, failure_threshold=2, reset_timeout=0)
+
+    def test_get_breaker(self):
+        self.addCleanup(circuit_breaker.CircuitBreaker.delete_breakers)
+        b1 = circuit_breaker.CircuitBreaker.get_breaker(
+            ('127.0.0.1', 8080), self.probe, 2, 0)
+        b2 = circuit_breaker.CircuitBreaker.get_breaker(
+            ('127.0.0.1', 8080), self.probe, 2, 0)
+        self.assertIs(b1, b2)
+
+    def test_open_after_threshold(self):
+        self.breaker.failed()
+        self.breaker.succeeded()
+        self.breaker.failed()
+        self.assertTrue(self.breaker.allow())
+        with mock.patch('eventlet.spawn_after') as spawn_after:
+            self.breaker.failed()
+        spawn_after.assert_called_once_with(0, self.breaker._probe)
+        self.assertFalse(self.breaker.is_closed())
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual({'opened': 1, 'rejected': 1, 'probes': 0,
+                          'state': circuit_breaker.OPEN},
+                         self.breaker.get_stats())
+
+    def test_probe(self):
+        listener = mock.MagicMock()
+        self.breaker.add_listener(listener)
+        self.breaker.failed()
+        self.breaker.failed()
+        eventlet.sleep(0)
+        # the probe failed and the circuit opened again.
+        self.assertEqual(circuit_breaker.OPEN, self.breaker.state)
+        self.assertEqual(0, listener.call_count)
+
+        self.probe.return_value = True
+        while not self.breaker.is_closed():
+            eventlet.sleep(0)
+        listener.assert_called_once_with()
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.get_stats()['probes'] >= 2)
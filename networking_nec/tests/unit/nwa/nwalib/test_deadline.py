@@ -0,0 +1,82 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import deadline
+from networking_nec.nwa.nwalib import exceptions as nwa_exc
+
+
+class TestDeadline(base.BaseTestCase):
+
+    @mock.patch('time.time')
+    def test_budget(self, now):
+        now.return_value = 100
+        self.assertIsNone(deadline.remaining())
+        with deadline.budget(30):
+            self.assertEqual(130, deadline.current())
+            with deadline.budget(60):
+                # a nested budget cannot extend the outer one.
+                self.assertEqual(130, deadline.current())
+            with deadline.budget(10):
+                self.assertEqual(110, deadline.current())
+            with deadline.budget(0):
+                self.assertEqual(130, deadline.current())
+            now.return_value = 120
+            self.assertEqual(10, deadline.remaining())
+        self.assertIsNone(deadline.current())
+
+    @mock.patch('time.time')
+    def test_until(self, now):
+        now.return_value = 100
+        with deadline.until(130):
+            self.assertEqual(130, deadline.current())
+            with deadline.until(160):
+                self.assertEqual(130, deadline.current())
+            with deadline.until(None):
+                self.assertEqual(130, deadline.current())
+            expires = deadline.current()
+
+        def carried():
+            with deadline.until(expires):
+                return deadline.current()
+
+        self.assertEqual(130, eventlet.spawn(carried).wait())
+        self.assertIsNone(deadline.current())
+
+    def test_budget_per_green_thread(self):
+        with deadline.budget(30):
+            self.assertIsNone(eventlet.spawn(deadline.current).wait())
+
+    @mock.patch('time.time')
+    def test_timeout(self, now):
+        now.return_value = 100
+        self.assertIsNone(deadline.timeout(None, None))
+        self.assertEqual((10, 60), deadline.timeout(10, 60))
+        with deadline.budget(30):
+            self.assertEqual((10, 30), deadline.timeout(10, 60))
+            self.assertEqual((30, 30), deadline.timeout(None, None))
+            now.return_value = 131
+            self.assertRaises(nwa_exc.NwaDeadlineExceeded,
+                              deadline.timeout, 10, 60)
+
+    def test_with_budget(self):
+        @deadline.with_budget(lambda: 30)
+        def method():
+            return deadline.remaining()
+
+        self.assertTrue(0 < method() <= 30)
+        self.assertIsNone(deadline.remaining())
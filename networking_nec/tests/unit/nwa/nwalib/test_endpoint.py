@@ -0,0 +1,91 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import endpoint
+
+EP1 = endpoint.Endpoint('192.168.0.1', 12081, False)
+EP2 = endpoint.Endpoint('192.168.0.2', 12081, False)
+
+
+class TestEndpointSelector(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestEndpointSelector, self).setUp()
+        self.probe = mock.MagicMock(return_value=False)
+        self.selector = endpoint.EndpointSelector(
+            [EP1, EP2], self.probe, failure_threshold=2, probe_interval=0)
+        # the probes are run by the tests.
+        self.selector._prober = mock.sentinel.prober
+
+    def test_get_selector(self):
+        self.addCleanup(endpoint.EndpointSelector.delete_selectors)
+        s1 = endpoint.EndpointSelector.get_selector([EP1, EP2], self.probe)
+        s2 = endpoint.EndpointSelector.get_selector([EP1, EP2], self.probe)
+        self.assertIs(s1, s2)
+
+    def test_select_round_robin(self):
+        self.assertEqual([EP1, EP2, EP1, EP2],
+                         [self.selector.select() for __ in range(4)])
+
+    def test_quarantine_and_restore(self):
+        self.selector.failed(EP1)
+        self.selector.succeeded(EP1)
+        self.selector.failed(EP1)
+        self.assertEqual([EP1, EP2], [self.selector.select()
+                                      for __ in range(2)])
+        self.selector.failed(EP1)
+        self.assertEqual([EP2, EP2], [self.selector.select()
+                                      for __ in range(2)])
+        self.assertTrue(self.selector.get_stats()
+                        ['192.168.0.1:12081']['quarantined'])
+
+        self.selector.probe_quarantined()
+        self.probe.assert_called_once_with(EP1)
+        self.assertEqual([EP2], self.selector._healthy())
+
+        self.probe.return_value = True
+        self.selector.probe_quarantined()
+        self.assertEqual([EP1, EP2], self.selector._healthy())
+        stats = self.selector.get_stats()['192.168.0.1:12081']
+        self.assertEqual({'requests': 4, 'failures': 3,
+                          'quarantined': False}, stats)
+
+    def test_all_quarantined(self):
+        for ep in (EP2, EP1):
+            self.selector.failed(ep)
+            self.selector.failed(ep)
+        self.assertEqual(EP2, self.selector.select())
+
+    def test_select_for_execution(self):
+        self.selector.bind('1', EP2)
+        self.assertEqual([EP2, EP2], [self.selector.select_for('1')
+                                      for __ in range(2)])
+        self.assertEqual(EP1, self.selector.select_for('2'))
+        self.selector.failed(EP2)
+        self.selector.failed(EP2)
+        self.assertEqual(EP1, self.selector.select_for('1'))
+        self.selector.unbind('1')
+        self.assertNotIn('1', self.selector._bindings)
+
+    def test_probe_thread(self):
+        self.selector._prober = None
+        self.probe.return_value = True
+        self.selector.failed(EP1)
+        self.selector.failed(EP1)
+        self.selector._prober.wait()
+        self.assertEqual([EP1, EP2], self.selector._healthy())
+        self.assertIsNone(self.selector._prober)
@@ -12,12 +12,20 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 import mock
 from neutron.tests import base
 from oslo_config import cfg
 
+from networking_nec.nwa.nwalib import circuit_breaker
+from networking_nec.nwa.nwalib import deadline
+from networking_nec.nwa.nwalib import endpoint
 from networking_nec.nwa.nwalib import exceptions as nwa_exc
 from networking_nec.nwa.nwalib import nwa_restclient
+from networking_nec.nwa.nwalib import read_cache
+from networking_nec.nwa.nwalib import workflow
+from networking_nec.nwa.nwalib import workflow_journal
+from networking_nec.nwa.nwalib import workflow_latency
 
 TENANT_ID = 'OpenT9004'
 
@@ -46,6 +54,16 @@ class TestNwaRestClient(base.BaseTestCase):
         self.assertEqual(8080, client.port)
         self.assertIs(True, client.use_ssl)
 
+    def test_get_stats(self):
+        client = nwa_restclient.NwaRestClient('127.0.0.1', 8080, True,
+                                              load_workflow_list=False)
+        stats = client.get_stats()
+        self.assertEqual(['circuit', 'endpoints', 'http_pool', 'read_cache',
+                          'workflow_latency', 'workflow_poller'],
+                         sorted(stats))
+        self.assertEqual(0, stats['http_pool']['requests'])
+        self.assertEqual({}, stats['endpoints'])
+
     def test_get_client_with_no_parameter(self):
         self.assertRaises(cfg.Error, nwa_restclient.NwaRestClient)
 
@@ -103,7 +121,7 @@ class TestNwaRestClient(base.BaseTestCase):
         self.assertEqual(hst, 200)
         self.assertIsNone(rd)
 
-    @mock.patch('requests.request')
+    @mock.patch('requests.Session.request')
     def test_rest_api_raise(self, rr):
         def myauth(a, b):
             pass
@@ -117,6 +135,89 @@ class TestNwaRestClient(base.BaseTestCase):
             rcl.rest_api, 'GET', url, body
         )
 
+    @mock.patch('networking_nec.nwa.nwalib.restclient.RestClient.rest_api')
+    def test_rest_api_endpoints(self, ra):
+        self.addCleanup(endpoint.EndpointSelector.delete_selectors)
+        cfg.CONF.set_override('server_urls', ['http://127.0.0.1:8081',
+                                              'http://127.0.0.2:8081'],
+                              group='NWA')
+        client = nwa_restclient.NwaRestClient(load_workflow_list=False)
+        ep1, ep2 = client.endpoints.endpoints
+        self.assertEqual(('127.0.0.1', 8081), (client.host, client.port))
+
+        ra.return_value = (200, {})
+        client.get('/umf/dcresource/groups')
+        client.get('/umf/dcresource/groups')
+        self.assertEqual([ep1, ep2],
+                         [c[1]['endpoint'] for c in ra.call_args_list])
+
+        # the execution sticks to the endpoint which started it.
+        ra.return_value = (200, {'executionid': '1'})
+        client.post('/umf/workflow/x/execute', {})
+        ra.return_value = (200, {'status': 'RUNNING'})
+        client.workflowinstance('1')
+        ra.return_value = (200, {'status': 'SUCCEED'})
+        client.workflowinstance('1')
+        self.assertEqual([ep1, ep1, ep1],
+                         [c[1]['endpoint'] for c in ra.call_args_list[2:]])
+        self.assertNotIn('1', client.endpoints._bindings)
+
+        ra.side_effect = nwa_exc.NwaException(-1, 'refused', None)
+        for __ in range(3):
+            self.assertEqual((-1, None), client.workflowinstance('2'))
+        stats = client.get_endpoint_stats()
+        self.assertEqual(2, stats['127.0.0.2:8081']['failures'])
+        self.assertEqual(1, stats['127.0.0.1:8081']['failures'])
+
+    @mock.patch('eventlet.spawn_after')
+    @mock.patch('networking_nec.nwa.nwalib.restclient.RestClient.rest_api')
+    def test_rest_api_circuit_breaker(self, ra, spawn_after):
+        self.addCleanup(circuit_breaker.CircuitBreaker.delete_breakers)
+        cfg.CONF.set_override('circuit_breaker_threshold', 2, group='NWA')
+        client = nwa_restclient.NwaRestClient('127.0.0.1', 8080, True,
+                                              load_workflow_list=False)
+        ra.side_effect = nwa_exc.NwaException(404, 'not found', None)
+        client.get('/path')
+        client.get('/path')
+        self.assertFalse(client.circuit_open())
+
+        ra.side_effect = nwa_exc.NwaException(-1, 'refused', None)
+        client.get('/path')
+        client.get('/path')
+        self.assertTrue(client.circuit_open())
+        self.assertEqual(4, ra.call_count)
+
+        self.assertEqual((nwa_exc.HTTP_STATUS_CIRCUIT_OPEN, None),
+                         client.get('/path'))
+        self.assertEqual((nwa_exc.HTTP_STATUS_CIRCUIT_OPEN, None),
+                         client.call_workflow(TENANT_ID, client.post,
+                                              'CreateTenantNW', {}))
+        self.assertEqual(4, ra.call_count)
+        self.assertEqual(1, client.get_circuit_stats()['rejected'])
+
+        ra.side_effect = None
+        ra.return_value = 200, {}
+        listener = mock.MagicMock()
+        client.add_circuit_listener(listener)
+        client.breaker._probe()
+        self.assertFalse(client.circuit_open())
+        listener.assert_called_once_with()
+
+    @mock.patch('requests.Session.request')
+    def test_rest_api_deadline_exceeded(self, rr):
+        self.addCleanup(circuit_breaker.CircuitBreaker.delete_breakers)
+        cfg.CONF.set_override('circuit_breaker_threshold', 1, group='NWA')
+        client = nwa_restclient.NwaRestClient('127.0.0.1', 8080, True,
+                                              load_workflow_list=False)
+        self.assertEqual((10, 60), (client.connect_timeout,
+                                    client.read_timeout))
+        with deadline.budget(1), mock.patch('time.time',
+                                            return_value=2e9):
+            self.assertEqual((nwa_exc.HTTP_STATUS_DEADLINE_EXCEEDED, None),
+                             client.get('/path'))
+        self.assertEqual(0, rr.call_count)
+        self.assertFalse(client.circuit_open())
+
 
 class TestNwaRestClientWorkflow(base.BaseTestCase):
 
@@ -132,6 +233,9 @@ class TestNwaRestClientWorkflow(base.BaseTestCase):
             secret_access_key=secret_access_key
         )
         self.nwa.workflow_first_wait = 0
+        # the scenarios do not wait for the ids read in the background.
+        mock.patch.object(nwa_restclient.NwaRestClient,
+                          'workflow_list_loaded', None).start()
 
     def test_get_client_workflow_parameters(self):
         cfg.CONF.set_override('scenario_polling_first_timer', 1, group='NWA')
@@ -152,9 +256,13 @@ class TestNwaRestClientWorkflow(base.BaseTestCase):
         )
 
     @mock.patch('eventlet.semaphore.Semaphore.locked')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'stop_workflowinstance')
     @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
                 'workflowinstance')
-    def test_workflow_kick_and_wait(self, wki, lock):
+    def test_workflow_kick_and_wait(self, wki, stop, lock):
+        cfg.CONF.set_override('scenario_stop_polling_count', 1, group='NWA')
+        stop.return_value = 200, None
         call = mock.MagicMock()
         call.__name__ = 'POST'
         call.return_value = 200, None
@@ -179,12 +287,221 @@ class TestNwaRestClientWorkflow(base.BaseTestCase):
         hst, rd = self.nwa.workflow_kick_and_wait(call, None, None)
         self.assertEqual(hst, 201)
         self.assertIsNone(rd)
+        stop.assert_called_once_with('1')
 
         wki.side_effect = Exception
         hst, rd = self.nwa.workflow_kick_and_wait(call, None, None)
         self.assertEqual(hst, 200)
         self.assertIsNone(rd)
 
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'stop_workflowinstance')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'workflowinstance')
+    def test_workflow_kick_and_wait_records_latency(self, wki, stop):
+        cfg.CONF.set_override('scenario_stop_polling_count', 1, group='NWA')
+        stop.return_value = 200, None
+        self.addCleanup(workflow_latency.WorkflowLatency.delete_latencies)
+        call = mock.MagicMock()
+        call.__name__ = 'POST'
+        call.return_value = 200, {'executionid': '1'}
+        wki.return_value = 200, {'status': 'SUCCEED'}
+        url = workflow.NwaWorkflow.path('CreateVLAN')
+        self.nwa.workflow_kick_and_wait(call, url, None)
+        stats = self.nwa.get_workflow_latency_stats()
+        self.assertEqual(1, stats['CreateVLAN']['count'])
+
+        # an execution stopped after its polling is recorded as well.
+        wki.return_value = 200, {'status': 'RUNNING'}
+        self.nwa.workflow_retry_count = 1
+        self.nwa.workflow_kick_and_wait(call, url, None)
+        stats = self.nwa.get_workflow_latency_stats()
+        self.assertEqual(2, stats['CreateVLAN']['count'])
+
+        # a failed poll is not.
+        wki.return_value = 500, None
+        self.nwa.workflow_kick_and_wait(call, url, None)
+        stats = self.nwa.get_workflow_latency_stats()
+        self.assertEqual(2, stats['CreateVLAN']['count'])
+
+    @mock.patch('networking_nec.nwa.nwalib.workflow_poller.WorkflowPoller.'
+                'get_poller')
+    def test_workflow_kick_and_wait_deadline(self, get_poller):
+        cfg.CONF.set_override('scenario_deadlines', {'CreateVLAN': '25'},
+                              group='NWA')
+        self.nwa.workflow_first_wait = 2
+        self.nwa.workflow_wait_sleep = 10
+        self.nwa.workflow_retry_count = 1
+        register = get_poller.return_value.register
+        register.return_value.wait.return_value = 200, None
+        call = mock.MagicMock()
+        call.__name__ = 'POST'
+        call.return_value = 200, {'executionid': '1'}
+        self.nwa.workflow_kick_and_wait(
+            call, workflow.NwaWorkflow.path('CreateVLAN'), None)
+        args, kwargs = register.call_args
+        self.assertEqual([2, 10, 10, 3], list(args[2]))
+        with mock.patch.object(self.nwa, 'stop_expired_workflow') as stop:
+            kwargs['on_retry_over']('1')
+        stop.assert_called_once_with('1')
+
+    @mock.patch('networking_nec.nwa.nwalib.workflow_poller.WorkflowPoller.'
+                'get_poller')
+    def test_workflow_kick_and_wait_budget(self, get_poller):
+        self.nwa.workflow_first_wait = 2
+        self.nwa.workflow_wait_sleep = 10
+        self.nwa.workflow_retry_count = 6
+        register = get_poller.return_value.register
+        register.return_value.wait.return_value = 200, None
+        call = mock.MagicMock()
+        call.__name__ = 'POST'
+        call.return_value = 200, {'executionid': '1'}
+        with mock.patch('time.time', return_value=100):
+            with deadline.budget(25):
+                self.nwa.workflow_kick_and_wait(
+                    call, workflow.NwaWorkflow.path('CreateVLAN'), None)
+        self.assertEqual([2, 2, 10, 10, 1], list(register.call_args[0][2]))
+        # the polls in the green pool of the poller keep the deadline.
+        self.assertEqual(125, register.call_args[1]['deadline'])
+
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'stop_expired_workflow')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'workflowinstance')
+    def test_workflow_kick_and_wait_budget_spent(self, wki, stop):
+        stop.return_value = 200, None
+        now = [100]
+
+        def kick(url, body):
+            # the kick spends the whole budget.
+            now[0] += 30
+            return 200, {'executionid': '1'}
+
+        call = mock.MagicMock(side_effect=kick)
+        call.__name__ = 'POST'
+        with mock.patch('time.time', side_effect=lambda: now[0]):
+            with deadline.budget(25):
+                rd, rj = self.nwa.workflow_kick_and_wait(
+                    call, workflow.NwaWorkflow.path('CreateVLAN'), None)
+        self.assertEqual((200, None), (rd, rj))
+        stop.assert_called_once_with('1')
+        self.assertEqual(0, wki.call_count)
+
+    def test_workflow_deadline_delays(self):
+        self.nwa.workflow_wait_sleep = 10
+        self.assertEqual([2, 1], list(
+            self.nwa._workflow_deadline_delays(iter([2, 10]), 3)))
+        self.assertEqual([2, 10], list(self.nwa._workflow_deadline_delays(
+            iter([2, 10]), 30, extend=False)))
+
+    def test_workflow_deadline(self):
+        cfg.CONF.set_override('scenario_deadlines',
+                              {'CreateVLAN': '120', 'DeleteVLAN': 'x'},
+                              group='NWA')
+        self.assertEqual(120, self.nwa._workflow_deadline('CreateVLAN'))
+        self.assertEqual(0, self.nwa._workflow_deadline('DeleteVLAN'))
+        self.assertEqual(0, self.nwa._workflow_deadline('CreateTenantNW'))
+
+    @mock.patch('eventlet.sleep')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'stop_workflowinstance')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'workflowinstance')
+    def test_stop_expired_workflow(self, wki, stop, sleep):
+        stop.return_value = 200, None
+        wki.side_effect = [(200, {'status': 'RUNNING'}),
+                           (200, {'status': 'FAILED'})]
+        self.assertEqual((200, None), self.nwa.stop_expired_workflow('1'))
+        stop.assert_called_once_with('1')
+        self.assertEqual(2, wki.call_count)
+
+        wki.side_effect = [(200, {'status': 'SUCCEED'})]
+        self.assertEqual((200, {'status': 'SUCCEED'}),
+                         self.nwa.stop_expired_workflow('1'))
+
+        wki.side_effect = None
+        wki.return_value = 200, {'status': 'RUNNING'}
+        self.assertEqual((200, None), self.nwa.stop_expired_workflow('1'))
+
+    def _set_journal(self):
+        path = self.get_temp_file_path('journal.db')
+        cfg.CONF.set_override('workflow_journal_file', path, group='NWA')
+        journal = workflow_journal.WorkflowJournal.get_journal(path)
+        self.addCleanup(workflow_journal.WorkflowJournal.journals.pop, path)
+        self.addCleanup(journal.close)
+        return journal
+
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'workflowinstance')
+    def test_workflow_kick_and_wait_journal(self, wki):
+        self.addCleanup(workflow_latency.WorkflowLatency.delete_latencies)
+        journal = self._set_journal()
+        call = mock.MagicMock()
+        call.__name__ = 'POST'
+        call.return_value = 200, {'executionid': '1'}
+        url = workflow.NwaWorkflow.path('CreateTenantNW')
+
+        def instance(exeid):
+            self.assertEqual(['1'], [e['execution_id']
+                                     for e in journal.pending()])
+            return 200, {'status': 'SUCCEED'}
+
+        wki.side_effect = instance
+        self.nwa.workflow_kick_and_wait(call, url, {'TenantID': 'T1'},
+                                        tenant_id='T1')
+        self.assertEqual(1, wki.call_count)
+        self.assertEqual([], journal.pending())
+
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'workflowinstance')
+    def test_resume_workflows(self, wki):
+        journal = self._set_journal()
+        journal.record('1', 'T1', 'CreateTenantNW', {'TenantID': 'T1'})
+        journal.record('2', 'T2', 'CreateVLAN', {'TenantID': 'T2'})
+
+        def instance(exeid):
+            if exeid == '2':
+                raise Exception
+            return 200, {'status': 'SUCCEED'}
+
+        wki.side_effect = instance
+        apply_result = mock.MagicMock(side_effect=[Exception, None])
+        self.assertEqual(2, self.nwa.resume_workflows(apply_result))
+        self.assertEqual(2, apply_result.call_count)
+        entry, http_status, rw = apply_result.call_args_list[0][0]
+        self.assertEqual('CreateTenantNW', entry['name'])
+        self.assertEqual({'status': 'SUCCEED'}, rw)
+        entry, http_status, rw = apply_result.call_args_list[1][0]
+        self.assertEqual('T2', entry['tenant_id'])
+        self.assertIsNone(rw)
+        self.assertEqual([], journal.pending())
+
+    def test_resume_workflows_disabled(self):
+        apply_result = mock.MagicMock()
+        self.assertEqual(0, self.nwa.resume_workflows(apply_result))
+        self.assertEqual(0, apply_result.call_count)
+
+    def test_workflow_polling_delays(self):
+        self.addCleanup(workflow_latency.WorkflowLatency.delete_latencies)
+        cfg.CONF.set_override('scenario_polling_min_samples', 2, group='NWA')
+        self.nwa.workflow_first_wait = 2
+        self.nwa.workflow_wait_sleep = 10
+        self.nwa.workflow_retry_count = 3
+        fixed = [2, 2, 10]
+        self.assertEqual(fixed,
+                         list(self.nwa._workflow_polling_delays('CreateVLAN')))
+
+        self.nwa.workflow_polling_adaptive = True
+        latency = workflow_latency.WorkflowLatency.get_latency('CreateVLAN')
+        latency.add(1)
+        self.assertEqual(fixed,
+                         list(self.nwa._workflow_polling_delays('CreateVLAN')))
+        latency.add(1)
+        delays = list(self.nwa._workflow_polling_delays('CreateVLAN'))
+        self.assertEqual(1, delays[0])
+        self.assertTrue(sum(delays) >= sum(fixed))
+        self.assertEqual(fixed, list(self.nwa._workflow_polling_delays()))
+
     @mock.patch('eventlet.semaphore.Semaphore.locked')
     @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
                 'workflow_kick_and_wait')
@@ -206,6 +523,27 @@ class TestNwaRestClientWorkflow(base.BaseTestCase):
         self.assertEqual(hst, 201)
         self.assertEqual(rd, '1')
 
+    def test_scenario_lock(self):
+        wkf = mock.MagicMock()
+        self.nwa._scenario_lock(wkf, 'CreateTenantNW', {'TenantID': 'T'})
+        self.assertEqual(1, wkf.tenant_lock.call_count)
+        self.nwa._scenario_lock(wkf, 'UpdateTenantFW', {
+            'TenantID': 'T',
+            'ReconfigNW_DeviceName1': 'TFW0',
+            'ReconfigNW_VlanLogicalName1': 'LNW_BusinessVLAN_100'})
+        wkf.resource_lock.assert_called_once_with(
+            set([('device', 'TFW0'), ('network', 'LNW_BusinessVLAN_100')]))
+        self.nwa._scenario_lock(wkf, 'SettingFWPolicy', {
+            'TenantID': 'T', 'DeviceInfo': {'DeviceName': 'TFW0'}})
+        wkf.resource_lock.assert_called_with(set([('device', 'TFW0')]))
+
+        cfg.CONF.set_override('scenario_lock_granularity', 'tenant',
+                              group='NWA')
+        self.nwa._scenario_lock(wkf, 'DeleteVLAN', {
+            'TenantID': 'T', 'DeleteNW_VlanLogicalName1': 'LNW'})
+        self.assertEqual(2, wkf.tenant_lock.call_count)
+        self.assertEqual(2, wkf.resource_lock.call_count)
+
     def test_get_reserved_dc_resource(self):
         self.nwa.get_reserved_dc_resource(TENANT_ID)
 
@@ -215,6 +553,43 @@ class TestNwaRestClientWorkflow(base.BaseTestCase):
     def test_get_dc_resource_groups(self):
         self.nwa.get_dc_resource_groups('OpenStack/DC1/Common/Pod2Grp/Pod2')
 
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.get')
+    def test_get_read_apis_cached(self, get):
+        read_cache.ReadCache.delete_caches()
+        self.addCleanup(read_cache.ReadCache.delete_caches)
+        cfg.CONF.set_override('read_cache_ttls',
+                              {'dcresource_groups': '300',
+                               'reserveddcresource': '30'}, group='NWA')
+        nwa = nwa_restclient.NwaRestClient('127.0.0.1', 8080, True,
+                                           load_workflow_list=False)
+        get.return_value = 200, {}
+        nwa.get_dc_resource_groups()
+        nwa.get_dc_resource_groups()
+        nwa.get_reserved_dc_resource(TENANT_ID)
+        nwa.get_tenant_resource(TENANT_ID)
+        nwa.get_workflow_list()
+        nwa.get_workflow_list()
+        self.assertEqual(4, get.call_count)
+        self.assertEqual({'hits': 2, 'misses': 4, 'coalesced': 0,
+                          'invalidations': 0, 'size': 2},
+                         nwa.get_read_cache_stats())
+
+        call = mock.MagicMock(return_value=(200, {'executionid': '1'}))
+        call.__name__ = 'POST'
+        with mock.patch.object(nwa_restclient.NwaRestClient,
+                               'workflow_kick_and_wait',
+                               return_value=(200, {})):
+            nwa.call_workflow(TENANT_ID, call, 'CreateVLAN', {})
+        nwa.get_reserved_dc_resource(TENANT_ID)
+        nwa.get_dc_resource_groups()
+        self.assertEqual(5, get.call_count)
+
+    def test__read_cache_ttl_invalid(self):
+        cfg.CONF.set_override('read_cache_ttls', {'workflow_list': 'x'},
+                              group='NWA')
+        self.assertEqual(0, self.nwa._read_cache_ttl('workflow_list'))
+        self.assertEqual(0, self.nwa._read_cache_ttl('dcresource_groups'))
+
     @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.get')
     def test_get_workflow_list(self, get):
         get.return_value = 209, None
@@ -233,5 +608,107 @@ class TestNwaRestClientWorkflow(base.BaseTestCase):
     def test_update_workflow_list(self):
         self.nwa.update_workflow_list()
 
+    @mock.patch.object(workflow.NwaWorkflow, '_nameid', {'CreateVLAN': '1'})
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.get')
+    def test_update_workflow_list_saved(self, get):
+        path = self.get_temp_file_path('workflows.json')
+        cfg.CONF.set_override('workflow_list_cache_file', path, group='NWA')
+        get.return_value = 200, {'Workflows': [
+            {'Path': 'NWA\\CreateVLAN', 'Id': '40030002'}]}
+        self.assertTrue(self.nwa.update_workflow_list())
+        self.assertFalse(self.nwa.update_workflow_list())
+        self.assertEqual({'CreateVLAN': '40030002'},
+                         workflow.NwaWorkflow._nameid)
+
+        workflow.NwaWorkflow.update_nameid({'CreateVLAN': '1'})
+        self.assertTrue(self.nwa.load_workflow_list_cache())
+        self.assertEqual({'CreateVLAN': '40030002'},
+                         workflow.NwaWorkflow._nameid)
+
+        with open(path, 'w') as f:
+            f.write('{')
+        self.assertFalse(self.nwa.load_workflow_list_cache())
+        cfg.CONF.set_override('workflow_list_cache_file',
+                              path + '.none', group='NWA')
+        self.assertFalse(self.nwa.load_workflow_list_cache())
+
+    @mock.patch('eventlet.sleep')
+    @mock.patch('eventlet.spawn')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'update_workflow_list')
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'load_workflow_list_cache')
+    def test_start_workflow_list_refresh(self, load, update, spawn, sleep):
+        self.addCleanup(setattr, nwa_restclient.NwaRestClient,
+                        'workflow_list_refresher',
+                        nwa_restclient.NwaRestClient.workflow_list_refresher)
+        nwa_restclient.NwaRestClient.workflow_list_refresher = None
+        client = nwa_restclient.NwaRestClient('127.0.0.1', 8080, True)
+        nwa_restclient.NwaRestClient('127.0.0.1', 8080, True)
+        load.assert_called_once_with()
+        spawn.assert_called_once_with(client._refresh_workflow_list)
+        self.assertEqual(0, update.call_count)
+
+        cfg.CONF.set_override('workflow_list_refresh_interval', 60,
+                              group='NWA')
+        update.side_effect = [Exception, False, True]
+        sleep.side_effect = [None, None, StopIteration]
+        self.assertRaises(StopIteration, client._refresh_workflow_list)
+        self.assertEqual(3, update.call_count)
+        sleep.assert_called_with(60)
+
+        cfg.CONF.set_override('workflow_list_refresh_interval', 0,
+                              group='NWA')
+        update.side_effect = None
+        client._refresh_workflow_list()
+        self.assertEqual(4, update.call_count)
+
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.get')
+    def test_wait_workflow_list(self, get):
+        loaded = eventlet.event.Event()
+        nwa_restclient.NwaRestClient.workflow_list_loaded = loaded
+        get.return_value = 200, {'Workflows': [
+            {'Path': 'NWA\\CreateVLAN', 'Id': '40030002'}]}
+        waiting = eventlet.spawn(self.nwa.wait_workflow_list)
+        eventlet.sleep(0)
+        self.assertFalse(waiting.dead)
+        with mock.patch.object(workflow.NwaWorkflow, '_nameid', {}):
+            self.nwa.update_workflow_list()
+        waiting.wait()
+        self.assertTrue(loaded.ready())
+
+    def test_wait_workflow_list_cache_file(self):
+        path = self.get_temp_file_path('workflows.json')
+        with open(path, 'w') as f:
+            f.write('{"CreateVLAN": "40030002"}')
+        cfg.CONF.set_override('workflow_list_cache_file', path, group='NWA')
+        loaded = eventlet.event.Event()
+        nwa_restclient.NwaRestClient.workflow_list_loaded = loaded
+        with mock.patch.object(workflow.NwaWorkflow, '_nameid', {}):
+            self.nwa.load_workflow_list_cache()
+        self.assertTrue(loaded.ready())
+        self.nwa.wait_workflow_list()
+
+    def test_wait_workflow_list_not_waiting(self):
+        loaded = eventlet.event.Event()
+        nwa_restclient.NwaRestClient.workflow_list_loaded = loaded
+        cfg.CONF.set_override('workflow_list_wait', 0, group='NWA')
+        self.nwa.wait_workflow_list()
+        cfg.CONF.set_override('workflow_list_wait', 30, group='NWA')
+        self.nwa.load_workflow_list = False
+        self.nwa.wait_workflow_list()
+        self.assertFalse(loaded.ready())
+
+    @mock.patch('networking_nec.nwa.nwalib.nwa_restclient.NwaRestClient.'
+                'wait_workflow_list')
+    def test_call_workflow_waits_workflow_list(self, wait):
+        call = mock.MagicMock(return_value=(200, {'executionid': '1'}))
+        call.__name__ = 'POST'
+        with mock.patch.object(nwa_restclient.NwaRestClient,
+                               'workflow_kick_and_wait',
+                               return_value=(200, {})):
+            self.nwa.call_workflow(TENANT_ID, call, 'CreateVLAN', {})
+        wait.assert_called_once_with()
+
     def test_wait_workflow_done(self):
         self.nwa.wait_workflow_done(mock.MagicMock())
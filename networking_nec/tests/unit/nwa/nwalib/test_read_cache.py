@@ -0,0 +1,141 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import mock
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import read_cache
+
+URL = '/umf/reserveddcresource/OpenT9004'
+TENANT_ID = 'OpenT9004'
+
+
+class TestReadCache(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestReadCache, self).setUp()
+        self.cache = read_cache.ReadCache()
+        self.fetch = mock.MagicMock(return_value=(200, {'a': 1}))
+
+    def test_get_cache(self):
+        self.addCleanup(read_cache.ReadCache.delete_caches)
+        c1 = read_cache.ReadCache.get_cache(('127.0.0.1', 8080))
+        c2 = read_cache.ReadCache.get_cache(('127.0.0.1', 8080))
+        self.assertIs(c1, c2)
+
+    def test_get_hit(self):
+        self.assertEqual((200, {'a': 1}), self.cache.get(URL, self.fetch, 60))
+        hst, rj = self.cache.get(URL, self.fetch, 60)
+        self.assertEqual((200, {'a': 1}), (hst, rj))
+        rj['a'] = 2
+        self.assertEqual((200, {'a': 1}), self.cache.get(URL, self.fetch, 60))
+        self.assertEqual(1, self.fetch.call_count)
+        self.assertEqual({'hits': 2, 'misses': 1, 'coalesced': 0,
+                          'invalidations': 0, 'size': 1},
+                         self.cache.get_stats())
+
+    @mock.patch('time.time')
+    def test_get_expired(self, now):
+        now.return_value = 100
+        self.cache.get(URL, self.fetch, 60)
+        now.return_value = 160
+        self.cache.get(URL, self.fetch, 60)
+        self.assertEqual(2, self.fetch.call_count)
+
+    def test_get_not_cached(self):
+        self.cache.get(URL, self.fetch, 0)
+        self.fetch.return_value = (500, None)
+        self.cache.get(URL, self.fetch, 60)
+        self.cache.get(URL, self.fetch, 60)
+        self.assertEqual(3, self.fetch.call_count)
+        self.assertEqual(0, self.cache.get_stats()['size'])
+
+    def test_get_coalesced(self):
+        started = eventlet.event.Event()
+        release = eventlet.event.Event()
+
+        def fetch():
+            started.send()
+            return release.wait()
+
+        first = eventlet.spawn(self.cache.get, URL, fetch, 0)
+        started.wait()
+        second = eventlet.spawn(self.cache.get, URL, self.fetch, 0)
+        eventlet.sleep(0)
+        release.send((200, {'b': 1}))
+        self.assertEqual((200, {'b': 1}), first.wait())
+        self.assertEqual((200, {'b': 1}), second.wait())
+        self.assertEqual(0, self.fetch.call_count)
+        self.assertEqual(1, self.cache.get_stats()['coalesced'])
+
+    def test_get_coalesced_raise(self):
+        started = eventlet.event.Event()
+        release = eventlet.event.Event()
+
+        def fetch():
+            started.send()
+            release.wait()
+            raise ValueError
+
+        first = eventlet.spawn(self.cache.get, URL, fetch, 60)
+        started.wait()
+        second = eventlet.spawn(self.cache.get, URL, self.fetch, 60)
+        eventlet.sleep(0)
+        release.send()
+        self.assertRaises(ValueError, first.wait)
+        self.assertRaises(ValueError, second.wait)
+        self.assertEqual((200, {'a': 1}), self.cache.get(URL, self.fetch, 60))
+
+    def test_invalidate(self):
+        self.cache.get(URL, self.fetch, 60, tenant_id=TENANT_ID)
+        self.cache.get('/umf/dcresource/groups', self.fetch, 60)
+        self.cache.invalidate('OpenT9005')
+        self.assertEqual(2, self.cache.get_stats()['size'])
+        self.cache.invalidate(TENANT_ID)
+        self.assertEqual(1, self.cache.get_stats()['size'])
+        self.cache.invalidate()
+        self.assertEqual(0, self.cache.get_stats()['size'])
+
+    def test_invalidate_while_fetching(self):
+        def fetch():
+            self.cache.invalidate(TENANT_ID)
+            return 200, {}
+
+        self.cache.get(URL, fetch, 60, tenant_id=TENANT_ID)
+        self.assertEqual(0, self.cache.get_stats()['size'])
+
+    def test_invalidate_detaches_inflight(self):
+        started = eventlet.event.Event()
+        release = eventlet.event.Event()
+
+        def fetch():
+            started.send()
+            return release.wait()
+
+        first = eventlet.spawn(self.cache.get, URL, fetch, 60,
+                               tenant_id=TENANT_ID)
+        started.wait()
+        self.cache.invalidate(TENANT_ID)
+        # a request after the invalidation does not wait for the first.
+        self.assertEqual((200, {'a': 1}), self.cache.get(
+            URL, self.fetch, 60, tenant_id=TENANT_ID))
+        self.assertEqual(1, self.fetch.call_count)
+        release.send((200, {'b': 1}))
+        self.assertEqual((200, {'b': 1}), first.wait())
+        # the response of the first request is not cached over it.
+        self.assertEqual((200, {'a': 1}), self.cache.get(
+            URL, self.fetch, 60, tenant_id=TENANT_ID))
+        self.assertEqual(1, self.fetch.call_count)
+        self.assertEqual({}, self.cache._inflight)
@@ -26,6 +26,7 @@ class TestRestClient(base.BaseTestCase):
     def setUp(self):
         super(TestRestClient, self).setUp()
         self.rcl = restclient.RestClient()
+        self.addCleanup(restclient.SessionPool.delete_pools)
 
     def test__url(self):
         rcl = restclient.RestClient('127.0.0.2', 8081, True)
@@ -34,7 +35,7 @@ class TestRestClient(base.BaseTestCase):
         self.assertEqual(u, 'https://127.0.0.2:8081' + path)
 
     @mock.patch('networking_nec.nwa.nwalib.restclient.utcnow')
-    @mock.patch('requests.request')
+    @mock.patch('requests.Session.request')
     def test__send_receive(self, rr, utcnow):
         now_for_test = datetime.datetime(2016, 2, 24, 5, 23)
         now_string = 'Wed, 24 Feb 2016 05:23:00 GMT'
@@ -51,10 +52,11 @@ class TestRestClient(base.BaseTestCase):
                      'Date': now_string,
                      'X-UMF-API-Version': restclient.UMF_API_VERSION},
             verify=False,
-            proxies={'no': 'pass'})
+            proxies={'no': 'pass'},
+            timeout=None)
         myauth.assert_called_once_with(now_string, '/path')
 
-    @mock.patch('requests.request')
+    @mock.patch('requests.Session.request')
     def test_rest_api(self, rr):
         def myauth(a, b):
             pass
@@ -68,7 +70,7 @@ class TestRestClient(base.BaseTestCase):
             rcl.rest_api, 'GET', url, body
         )
 
-    @mock.patch('requests.request')
+    @mock.patch('requests.Session.request')
     def test_rest_api_raise(self, rr):
         def myauth(a, b):
             pass
@@ -82,6 +84,67 @@ class TestRestClient(base.BaseTestCase):
             rcl.rest_api, 'GET', url, body
         )
 
+    @mock.patch('requests.Session.request')
+    def test__send_receive_reuses_session(self, rr):
+        rcl1 = restclient.RestClient('127.0.0.6', 8086, False, mock.Mock())
+        rcl2 = restclient.RestClient('127.0.0.6', 8086, False, mock.Mock())
+        rcl1._send_receive('GET', '/path')
+        rcl2._send_receive('POST', '/path')
+        pool = restclient.SessionPool.get_pool('http', '127.0.0.6', 8086)
+        self.assertIs(pool, restclient.SessionPool.get_pool(
+            'http', '127.0.0.6', '8086'))
+        stats = rcl1.get_pool_stats()
+        self.assertEqual(2, stats['requests'])
+        self.assertEqual(0, stats['in_use'])
+        self.assertEqual(0, stats['exhausted'])
+
+    @mock.patch('requests.Session.request')
+    def test__send_receive_other_endpoint(self, rr):
+        rcl1 = restclient.RestClient('127.0.0.6', 8086, False, mock.Mock())
+        rcl2 = restclient.RestClient('127.0.0.7', 8086, False, mock.Mock())
+        rcl1._send_receive('GET', '/path')
+        rcl2._send_receive('GET', '/path')
+        self.assertEqual(1, rcl1.get_pool_stats()['requests'])
+        self.assertEqual(1, rcl2.get_pool_stats()['requests'])
+
+    @mock.patch('requests.Session.request')
+    def test__send_receive_given_endpoint(self, rr):
+        rcl = restclient.RestClient('127.0.0.6', 8086, False, mock.Mock())
+        rcl._send_receive('GET', '/path', endpoint=('127.0.0.9', 8089, True))
+        self.assertEqual('https://127.0.0.9:8089/path', rr.call_args[0][1])
+
+    @mock.patch('requests.Session.request')
+    def test__send_receive_timeout(self, rr):
+        rcl = restclient.RestClient('127.0.0.6', 8086, False, mock.Mock(),
+                                    connect_timeout=10, read_timeout=60)
+        rcl._send_receive('GET', '/path')
+        self.assertEqual((10, 60), rr.call_args[1]['timeout'])
+
+    @mock.patch('requests.Session.close')
+    @mock.patch('requests.Session.request')
+    def test_session_pool_recycle_idle_session(self, rr, close):
+        pool = restclient.SessionPool(maxsize=1, idle_timeout=10)
+        pool.request('GET', 'http://127.0.0.8:8088/path')
+        pool._last_used -= 11
+        pool.request('GET', 'http://127.0.0.8:8088/path')
+        self.assertEqual(1, close.call_count)
+        self.assertEqual(1, pool.get_stats()['recycled'])
+
+    def test_session_pool_exhausted(self):
+        pool = restclient.SessionPool(maxsize=1, idle_timeout=0)
+
+        def nested_request(*args, **kwargs):
+            if pool.get_stats()['in_use'] == 1:
+                pool.request('GET', 'http://127.0.0.8:8088/path')
+
+        with mock.patch('requests.Session.request',
+                        side_effect=nested_request):
+            pool.request('GET', 'http://127.0.0.8:8088/path')
+        stats = pool.get_stats()
+        self.assertEqual(2, stats['requests'])
+        self.assertEqual(2, stats['max_in_use'])
+        self.assertEqual(1, stats['exhausted'])
+
     @mock.patch('networking_nec.nwa.nwalib.restclient.RestClient.rest_api')
     def test_get(self, rarc):
         self.rcl.get('')
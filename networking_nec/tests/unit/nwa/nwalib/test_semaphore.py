@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import eventlet
 import mock
 from neutron.tests import base
 
@@ -56,3 +57,65 @@ class TestSemaphore(base.BaseTestCase):
     def test_delete_tenant_semaphore(self):
         nwa_sem.Semaphore.delete_tenant_semaphore('T11')
         self.assertTrue(True)
+
+    def test_tenant_lock(self):
+        sem = nwa_sem.Semaphore()
+        order = []
+
+        def scenario(n):
+            with sem.tenant_lock():
+                order.append(('in', n))
+                eventlet.sleep(0)
+                order.append(('out', n))
+
+        threads = [eventlet.spawn(scenario, n) for n in range(2)]
+        eventlet.sleep(0)
+        self.assertTrue(sem.locked())
+        for t in threads:
+            t.wait()
+        self.assertEqual([('in', 0), ('out', 0), ('in', 1), ('out', 1)],
+                         order)
+        self.assertFalse(sem.locked())
+        stats = sem.get_tenant_stats()
+        self.assertEqual(2, stats['acquired'])
+        self.assertEqual(1, stats['waited'])
+        self.assertEqual(0, stats['waiting'])
+
+    def test_resource_lock(self):
+        sem = nwa_sem.Semaphore()
+        order = []
+
+        def scenario(n, lock):
+            with lock:
+                order.append(('in', n))
+                eventlet.sleep(0)
+                order.append(('out', n))
+
+        threads = [
+            eventlet.spawn(scenario, 0, sem.resource_lock([('network', 'A')])),
+            eventlet.spawn(scenario, 1, sem.resource_lock([('network', 'B')])),
+            eventlet.spawn(scenario, 2, sem.resource_lock(
+                [('network', 'A'), ('device', 'D')])),
+            eventlet.spawn(scenario, 3, sem.tenant_lock()),
+            eventlet.spawn(scenario, 4, sem.resource_lock([('network', 'B')])),
+        ]
+        for t in threads:
+            t.wait()
+        # 0 and 1 run together, 2 waits for 0 on network A, the tenant
+        # lock waits for them all, and 4 waits for the tenant lock.
+        self.assertEqual([('in', 0), ('in', 1), ('out', 0), ('out', 1),
+                          ('in', 2), ('out', 2), ('in', 3), ('out', 3),
+                          ('in', 4), ('out', 4)], order)
+        self.assertFalse(sem.locked())
+        self.assertEqual({}, sem._resources)
+        stats = sem.get_tenant_stats()
+        self.assertEqual(5, stats['acquired'])
+        self.assertEqual(3, stats['waited'])
+        self.assertEqual(0, stats['shared'])
+
+    def test_get_stats(self):
+        nwa_sem.Semaphore.get_tenant_semaphore('T21')
+        stats = nwa_sem.Semaphore.get_stats()
+        self.assertEqual(0, stats['T21']['waiting'])
+        self.assertFalse(stats['T21']['locked'])
+        nwa_sem.Semaphore.delete_tenant_semaphore('T21')
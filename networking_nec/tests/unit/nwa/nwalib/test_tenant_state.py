@@ -0,0 +1,198 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import glob
+import os.path
+import re
+
+from neutron.tests import base
+from oslo_serialization import jsonutils
+
+from networking_nec.nwa.common import constants as nwa_const
+from networking_nec.nwa.nwalib import data_utils
+from networking_nec.nwa.nwalib import tenant_state
+
+NETWORK_ID = 'a94fd0fc-2282-4092-9485-b0f438b0f6c4'
+DEVICE_ID = '36509c40-58e0-4293-8b16-48b409959b8f'
+GROUP = 'OpenStack/DC1/APP'
+NWA_INFO = {
+    'network': {'id': NETWORK_ID, 'name': 'pj1-net100'},
+    'subnet': {'id': 'subnet-1', 'netaddr': '192.168.200.0'},
+    'device': {'id': DEVICE_ID, 'owner': 'compute:DC1_KVM'},
+    'port': {'ip': '192.168.200.132', 'mac': 'fa:16:3e:a6:1d:00'},
+}
+
+
+def load_nwa_data_files():
+    base_dir = os.path.join(os.path.dirname(__file__), os.pardir, 'agent',
+                            'test_data')
+    for fn in sorted(glob.glob(os.path.join(base_dir, 'nwa_data_*.json'))):
+        with open(fn) as f:
+            yield os.path.basename(fn), jsonutils.loads(f.read())
+
+
+# answers computed by scanning all keys, as nwa_data used to be queried.
+def scan_vlan(network_id, nwa_data):
+    pat = re.compile(r'VLAN_.*' + network_id + '_.*_VlanID$')
+    return len([k for k in nwa_data if pat.match(k)])
+
+
+def scan_device_id(device_id, nwa_data):
+    pat = re.compile(r'DEV_' + device_id + '_')
+    return len([k for k in nwa_data if pat.match(k)])
+
+
+def scan_segment(network_id, res_name, nwa_data, dev_type):
+    pat = re.compile(r'DEV_.*_' + network_id + '_' + res_name + '$')
+    return len([k for k in nwa_data
+                if pat.match(k) and dev_type == nwa_data[k]])
+
+
+def scan_tfw_interfaces(device_id, nwa_data):
+    pat = re.compile('^DEV_' + device_id + '_.*_TenantFWName$')
+    return len([k for k in nwa_data if pat.match(k)])
+
+
+def ids_of(nwa_data):
+    devices, networks, groups = set(), set(), set()
+    for k in nwa_data:
+        m = re.match(r'DEV_([^_]+)_([^_]+)_(.+)$', k)
+        if m:
+            devices.add(m.group(1))
+            networks.add(m.group(2))
+            groups.add(m.group(3))
+        m = re.match(r'NW_([^_]+)$', k)
+        if m:
+            networks.add(m.group(1))
+    return devices, networks, groups
+
+
+class TestTenantState(base.BaseTestCase):
+
+    def assertSameAnswers(self, nwa_data):
+        state = tenant_state.TenantState(nwa_data)
+        plain = dict(nwa_data)
+        devices, networks, groups = ids_of(plain)
+        for net in networks:
+            self.assertEqual(scan_vlan(net, plain),
+                             state.count_vlan_segments(net))
+            for group in groups:
+                for dev_type in (nwa_const.NWA_DEVICE_GDV,
+                                 nwa_const.NWA_DEVICE_TFW):
+                    self.assertEqual(
+                        scan_segment(net, group, plain, dev_type),
+                        state.count_segment(net, group, dev_type))
+        for dev in devices:
+            self.assertEqual(scan_device_id(dev, plain),
+                             state.count_device_keys(dev))
+            self.assertEqual(scan_tfw_interfaces(dev, plain),
+                             state.count_tfw_interfaces(dev))
+        self.assertEqual(any(k.startswith('NW_') for k in plain),
+                         state.has_network())
+
+    def test_same_answers_as_key_scan(self):
+        for name, nwa_data in load_nwa_data_files():
+            self.assertSameAnswers(nwa_data)
+
+    def test_indexes_follow_updates(self):
+        for name, nwa_data in load_nwa_data_files():
+            state = tenant_state.TenantState(nwa_data)
+            for k in sorted(nwa_data):
+                state.pop(k)
+                self.assertSameAnswers(state)
+            self.assertEqual({}, state)
+            self.assertFalse(state.has_network())
+
+    def test_data_utils(self):
+        state = tenant_state.TenantState()
+        data_utils.set_network_data(state, NETWORK_ID, NWA_INFO, 'LNW_1')
+        data_utils.set_vlan_data(state, NETWORK_ID, '4000')
+        self.assertTrue(state.has_network())
+        self.assertEqual(0, state.count_vlan_segments(NETWORK_ID))
+
+        data_utils.set_vp_net_data(state, NETWORK_ID, GROUP,
+                                   nwa_const.NWA_DEVICE_GDV, '4000')
+        data_utils.set_gdv_device_data(state, DEVICE_ID, NWA_INFO)
+        data_utils.set_gdv_interface_data(state, DEVICE_ID, NETWORK_ID,
+                                          GROUP, NWA_INFO)
+        self.assertEqual(1, state.count_vlan_segments(NETWORK_ID))
+        self.assertEqual(1, state.count_segment(NETWORK_ID, GROUP,
+                                                nwa_const.NWA_DEVICE_GDV))
+        self.assertEqual(0, state.count_segment(NETWORK_ID, GROUP,
+                                                nwa_const.NWA_DEVICE_TFW))
+        self.assertEqual(5, state.count_device_keys(DEVICE_ID))
+        self.assertEqual(GROUP, state.get_resource_group_name(
+            DEVICE_ID, NETWORK_ID, NWA_INFO['port']['mac'],
+            nwa_const.NWA_DEVICE_GDV))
+        self.assertIsNone(state.get_resource_group_name(
+            DEVICE_ID, NETWORK_ID, 'fa:16:3e:00:00:00',
+            nwa_const.NWA_DEVICE_GDV))
+
+        data_utils.strip_interface_data(state, DEVICE_ID, NETWORK_ID, GROUP)
+        self.assertEqual(1, state.count_device_keys(DEVICE_ID))
+        self.assertEqual(0, state.count_segment(NETWORK_ID, GROUP,
+                                                nwa_const.NWA_DEVICE_GDV))
+        data_utils.strip_vp_net_data(state, NETWORK_ID, GROUP,
+                                     nwa_const.NWA_DEVICE_GDV)
+        self.assertEqual(0, state.count_vlan_segments(NETWORK_ID))
+
+    def test_overwrite_value(self):
+        key = 'DEV_%s_%s_%s' % (DEVICE_ID, NETWORK_ID, GROUP)
+        state = tenant_state.TenantState({key: nwa_const.NWA_DEVICE_GDV})
+        state[key] = nwa_const.NWA_DEVICE_TFW
+        self.assertEqual(0, state.count_segment(NETWORK_ID, GROUP,
+                                                nwa_const.NWA_DEVICE_GDV))
+        self.assertEqual(1, state.count_segment(NETWORK_ID, GROUP,
+                                                nwa_const.NWA_DEVICE_TFW))
+        self.assertEqual(1, state.count_device_keys(DEVICE_ID))
+
+    def test_serialize(self):
+        for name, nwa_data in load_nwa_data_files():
+            state = tenant_state.TenantState(nwa_data)
+            self.assertEqual(nwa_data, jsonutils.loads(jsonutils.dumps(state)))
+            self.assertEqual(nwa_data, state.to_dict())
+            self.assertIs(dict, type(state.to_dict()))
+            for dup in (state.copy(), copy.copy(state), copy.deepcopy(state)):
+                self.assertIsInstance(dup, tenant_state.TenantState)
+                self.assertEqual(nwa_data, dup)
+                dup.clear()
+                self.assertEqual(nwa_data, state)
+
+    def test_get_changes(self):
+        state = tenant_state.TenantState({'a': '1', 'b': '2', 'c': '3'})
+        self.assertEqual(({}, []), state.get_changes())
+        self.assertIsNone(state.version)
+
+        state['a'] = '10'
+        state['b'] = '20'
+        state['b'] = '2'        # back to the stored value
+        del state['c']
+        state['d'] = '4'
+        state['e'] = '5'
+        del state['e']          # added and removed
+        set_items, removed_keys = state.get_changes()
+        self.assertEqual({'a': '10', 'd': '4'}, set_items)
+        self.assertEqual(['c'], removed_keys)
+
+        dup = copy.deepcopy(state)
+        self.assertEqual((set_items, removed_keys), dup.get_changes())
+
+        state.reset_changes(version=2)
+        self.assertEqual(({}, []), state.get_changes())
+        self.assertEqual(2, state.version)
+        state.clear()
+        set_items, removed_keys = state.get_changes()
+        self.assertEqual({}, set_items)
+        self.assertEqual(['a', 'b', 'd'], sorted(removed_keys))
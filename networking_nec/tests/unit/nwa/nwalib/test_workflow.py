@@ -56,31 +56,28 @@ class TestNwaWorkflow(base.BaseTestCase):
         })
         self.assertEqual(rc, '101')
 
+    @mock.patch.object(workflow.NwaWorkflow, '_nameid', {'foo': '1'})
     def test_update_nameid(self):
-        with mock.patch('networking_nec.nwa.nwalib.workflow'
-                        '.NwaWorkflow._nameid',
-                        new_callable=mock.PropertyMock) as nameid, \
-                mock.patch('networking_nec.nwa.nwalib.workflow'
-                           '.NwaWorkflow._nameid_initialized',
-                           new_callable=mock.PropertyMock):
+        # If passed nameid is empty or the same, nameid will be unchanged.
+        self.assertFalse(workflow.NwaWorkflow.update_nameid({}))
+        self.assertFalse(workflow.NwaWorkflow.update_nameid({'foo': '1'}))
+        self.assertDictEqual({'foo': '1'}, workflow.NwaWorkflow._nameid)
 
-            # When nameid is initialized, nameid will be unchanged.
-            workflow.NwaWorkflow._nameid_initialized = True
-            nameid.return_value = mock.sentinel.nameid
-            workflow.NwaWorkflow.update_nameid({'foo': '1'})
-            self.assertTrue(workflow.NwaWorkflow._nameid_initialized)
-            self.assertIs(mock.sentinel.nameid, workflow.NwaWorkflow._nameid)
+        # nameid is replaced by every new nameid.
+        self.assertTrue(workflow.NwaWorkflow.update_nameid({'foo': '2'}))
+        self.assertDictEqual({'foo': '2'}, workflow.NwaWorkflow._nameid)
+        self.assertEqual('/umf/workflow/2/execute',
+                         workflow.NwaWorkflow.path('foo'))
 
-            # If passed nameid is empty, nameid will be unchanged.
-            workflow.NwaWorkflow._nameid_initialized = False
-            nameid.return_value = mock.sentinel.nameid
-            workflow.NwaWorkflow.update_nameid({})
-            self.assertFalse(workflow.NwaWorkflow._nameid_initialized)
-            self.assertIs(mock.sentinel.nameid, workflow.NwaWorkflow._nameid)
+    @mock.patch.object(workflow.NwaWorkflow, '_nameid', {'foo': '1'})
+    def test_save_and_load_nameid(self):
+        path = self.get_temp_file_path('workflows.json')
+        workflow.NwaWorkflow.save_nameid(path)
+        workflow.NwaWorkflow.update_nameid({'bar': '2'})
+        self.assertTrue(workflow.NwaWorkflow.load_nameid(path))
+        self.assertDictEqual({'foo': '1'}, workflow.NwaWorkflow._nameid)
+        self.assertFalse(workflow.NwaWorkflow.load_nameid(path))
 
-            # If nameid is not initialized and passed nameid is not empty,
-            # nameid will be initialized.
-            workflow.NwaWorkflow._nameid_initialized = False
-            workflow.NwaWorkflow.update_nameid({'foo': '1'})
-            self.assertTrue(workflow.NwaWorkflow._nameid_initialized)
-            self.assertDictEqual({'foo': '1'}, workflow.NwaWorkflow._nameid)
+        with open(path, 'w') as f:
+            f.write('[]')
+        self.assertRaises(ValueError, workflow.NwaWorkflow.load_nameid, path)
@@ -0,0 +1,62 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import workflow_journal
+
+
+class TestWorkflowJournal(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestWorkflowJournal, self).setUp()
+        self.path = self.get_temp_file_path('journal.db')
+        self.journal = workflow_journal.WorkflowJournal(self.path)
+        self.addCleanup(self.journal.close)
+
+    def test_get_journal(self):
+        j1 = workflow_journal.WorkflowJournal.get_journal(self.path)
+        j2 = workflow_journal.WorkflowJournal.get_journal(self.path)
+        self.addCleanup(workflow_journal.WorkflowJournal.journals.pop,
+                        self.path)
+        self.assertIs(j1, j2)
+
+    def test_record_complete(self):
+        self.journal.record('1', 'RegionOneT1', 'CreateTenantNW',
+                            {'TenantID': 'RegionOneT1'})
+        self.journal.record('2', 'RegionOneT2', 'CreateVLAN', None)
+        pending = self.journal.pending()
+        self.assertEqual(['1', '2'], [e['execution_id'] for e in pending])
+        self.assertEqual('RegionOneT1', pending[0]['tenant_id'])
+        self.assertEqual('CreateTenantNW', pending[0]['name'])
+        self.assertEqual({'TenantID': 'RegionOneT1'}, pending[0]['body'])
+        self.assertIsNone(pending[1]['body'])
+
+        self.journal.complete('1')
+        self.assertEqual(['2'], [e['execution_id']
+                                 for e in self.journal.pending()])
+
+    def test_survives_reopen(self):
+        self.journal.record('1', 'RegionOneT1', 'DeleteVLAN', {})
+        self.journal.close()
+        self.journal = workflow_journal.WorkflowJournal(self.path)
+        self.assertEqual(['1'], [e['execution_id']
+                                 for e in self.journal.pending()])
+
+    def test_record_error(self):
+        self.journal.close()
+        # logged, not raised
+        self.journal.record('1', 'RegionOneT1', 'DeleteVLAN', {})
+        self.journal.complete('1')
+        self.journal = workflow_journal.WorkflowJournal(self.path)
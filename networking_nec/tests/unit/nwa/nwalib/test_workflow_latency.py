@@ -0,0 +1,66 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import workflow_latency
+
+
+class TestWorkflowLatency(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestWorkflowLatency, self).setUp()
+        self.addCleanup(workflow_latency.WorkflowLatency.delete_latencies)
+
+    def test_get_latency(self):
+        lat1 = workflow_latency.WorkflowLatency.get_latency('CreateVLAN')
+        lat2 = workflow_latency.WorkflowLatency.get_latency('CreateVLAN')
+        self.assertIs(lat1, lat2)
+        lat3 = workflow_latency.WorkflowLatency.get_latency('SettingNAT')
+        self.assertIsNot(lat1, lat3)
+
+    def test_history(self):
+        latency = workflow_latency.WorkflowLatency(history=3)
+        for sec in range(10):
+            latency.add(sec)
+        self.assertEqual([7, 8, 9], list(latency.samples))
+
+    def test_get_stats(self):
+        latency = workflow_latency.WorkflowLatency.get_latency('CreateVLAN')
+        for sec in range(1, 101):
+            latency.add(sec)
+        workflow_latency.WorkflowLatency.get_latency('SettingNAT')
+        stats = workflow_latency.WorkflowLatency.get_stats()
+        self.assertEqual({'count': 0}, stats['SettingNAT'])
+        self.assertEqual(100, stats['CreateVLAN']['count'])
+        self.assertEqual(1, stats['CreateVLAN']['min'])
+        self.assertEqual(100, stats['CreateVLAN']['max'])
+        self.assertEqual(51, stats['CreateVLAN']['p50'])
+        self.assertEqual(90, stats['CreateVLAN']['p90'])
+        self.assertEqual(99, stats['CreateVLAN']['p99'])
+
+    def test_delays_fast_scenario(self):
+        latency = workflow_latency.WorkflowLatency()
+        latency.add(1)
+        delays = list(latency.delays(10, 20))
+        self.assertEqual(1, delays[0])
+        self.assertEqual([0.5, 1, 2, 4, 8, 10], delays[1:7])
+        self.assertTrue(sum(delays) >= 20)
+        self.assertTrue(sum(delays[:-1]) < 20)
+
+    def test_delays_slow_scenario(self):
+        latency = workflow_latency.WorkflowLatency()
+        latency.add(60)
+        delays = list(latency.delays(10, 62))
+        self.assertEqual([60, 10], delays)
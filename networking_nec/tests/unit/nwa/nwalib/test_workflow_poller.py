@@ -0,0 +1,125 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import mock
+from neutron.tests import base
+
+from networking_nec.nwa.nwalib import deadline
+from networking_nec.nwa.nwalib import workflow_poller
+
+
+class TestWorkflowPoller(base.BaseTestCase):
+
+    def setUp(self):
+        super(TestWorkflowPoller, self).setUp()
+        self.poller = workflow_poller.WorkflowPoller(pool_size=4)
+
+    def test_get_poller(self):
+        p1 = workflow_poller.WorkflowPoller.get_poller()
+        p2 = workflow_poller.WorkflowPoller.get_poller()
+        self.assertIs(p1, p2)
+
+    def test_register_succeed(self):
+        fetch = mock.MagicMock(side_effect=[
+            (200, {'status': 'RUNNING'}),
+            (200, {'status': 'SUCCEED'}),
+        ])
+        done = self.poller.register('1', fetch, [0, 0, 0], 201)
+        self.assertEqual((200, {'status': 'SUCCEED'}), done.wait())
+        self.assertEqual(2, fetch.call_count)
+        fetch.assert_called_with('1')
+
+    def test_register_many(self):
+        fetch = mock.MagicMock(return_value=(200, {'status': 'SUCCEED'}))
+        events = [self.poller.register(str(i), fetch, [0], 201)
+                  for i in range(20)]
+        for done in events:
+            self.assertEqual((200, {'status': 'SUCCEED'}), done.wait())
+        self.assertEqual(20, fetch.call_count)
+        stats = self.poller.get_stats()
+        self.assertEqual(20, stats['registered'])
+        self.assertEqual(20, stats['polls'])
+        self.assertEqual(0, stats['outstanding'])
+
+    def test_register_no_polls(self):
+        fetch = mock.MagicMock()
+        done = self.poller.register('1', fetch, [], 201)
+        self.assertEqual((201, None), done.wait())
+        self.assertEqual(0, fetch.call_count)
+
+    def test_register_no_polls_callback(self):
+        fetch = mock.MagicMock()
+        on_retry_over = mock.MagicMock(return_value=(200, None))
+        done = self.poller.register('1', fetch, [], 201, on_retry_over)
+        self.assertEqual((200, None), done.wait())
+        self.assertEqual(0, fetch.call_count)
+        on_retry_over.assert_called_once_with('1')
+        self.assertEqual(1, self.poller.get_stats()['retry_over'])
+
+    def test_register_retry_over(self):
+        fetch = mock.MagicMock(return_value=(202, {'status': 'RUNNING'}))
+        done = self.poller.register('1', fetch, [0, 0], 201)
+        self.assertEqual((202, None), done.wait())
+        self.assertEqual(2, fetch.call_count)
+        self.assertEqual(1, self.poller.get_stats()['retry_over'])
+
+    def test_register_invalid_body(self):
+        fetch = mock.MagicMock(return_value=(500, None))
+        done = self.poller.register('1', fetch, [0], 201)
+        self.assertEqual((500, None), done.wait())
+
+    def test_register_raise(self):
+        fetch = mock.MagicMock(side_effect=Exception)
+        done = self.poller.register('1', fetch, [0], 201)
+        self.assertEqual((201, None), done.wait())
+
+    def test_register_retry_over_callback(self):
+        fetch = mock.MagicMock(return_value=(202, {'status': 'RUNNING'}))
+        on_retry_over = mock.MagicMock(return_value=(200, None))
+        done = self.poller.register('1', fetch, [0], 201, on_retry_over)
+        self.assertEqual((200, None), done.wait())
+        on_retry_over.assert_called_once_with('1')
+        self.assertEqual(0, self.poller.get_stats()['outstanding'])
+
+        on_retry_over.side_effect = Exception
+        done = self.poller.register('2', fetch, [0], 201, on_retry_over)
+        self.assertEqual((202, None), done.wait())
+
+    def test_register_deadline(self):
+        timeouts = []
+
+        def fetch(execution_id):
+            timeouts.append(deadline.timeout(10, 60))
+            return 200, {'status': 'RUNNING'}
+
+        def on_retry_over(execution_id):
+            return deadline.remaining(), None
+
+        expires = time.time() + 5
+        done = self.poller.register('1', fetch, [0], 201, on_retry_over,
+                                    deadline=expires)
+        left, __ = done.wait()
+        # the poll runs in the green pool with the time left.
+        self.assertEqual(1, len(timeouts))
+        self.assertTrue(0 < timeouts[0][0] <= 5)
+        self.assertTrue(0 < timeouts[0][1] <= 5)
+        self.assertTrue(0 < left <= 5)
+        self.assertIsNone(deadline.current())
+
+        # the stop at the deadline is not bounded by it.
+        done = self.poller.register('2', fetch, [], 201, on_retry_over,
+                                    deadline=time.time() - 1)
+        self.assertEqual((None, None), done.wait())
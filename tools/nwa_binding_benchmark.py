@@ -0,0 +1,120 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of set_nwa_tenant_binding on the key/value table.
+
+A tenant with N keys is stored in nwa_tenant_key_value, then the same
+change (10% of the keys updated, 10% added and 10% removed) is applied
+with the former statement-per-key loop and with db_api, which sends the
+difference as bulk statements. Elapsed time and the number of SQL
+statements sent to the database are printed for each size.
+
+Usage: python tools/nwa_binding_benchmark.py [--url URL] [--keys N ...]
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+import sqlalchemy as sa
+from sqlalchemy import and_
+from sqlalchemy import orm
+
+from networking_nec.nwa.l2 import db_api
+from networking_nec.nwa.l2 import models as nmodels
+
+TENANT_ID = 'ffffffffff0000000000000000000001'
+NWA_TENANT_ID = 'DC1_ffffffffff0000000000000000000001'
+
+
+def per_key_set(session, tenant_id, nwa_tenant_id, value_json):
+    """The former set_nwa_tenant_binding, one statement per key."""
+    _json = db_api.get_nwa_tenant_binding(
+        session, tenant_id, nwa_tenant_id).value_json
+    with session.begin(subtransactions=True):
+        for key, value in value_json.items():
+            if key in _json:
+                if value != _json[key]:
+                    item = session.query(nmodels.NWATenantKeyValue).filter(
+                        and_(nmodels.NWATenantKeyValue.tenant_id == tenant_id,
+                             nmodels.NWATenantKeyValue.json_key == key)).one()
+                    item.json_value = value
+            else:
+                session.add(nmodels.NWATenantKeyValue(
+                    tenant_id, nwa_tenant_id, key, value))
+        for key in _json:
+            if key not in value_json:
+                item = session.query(nmodels.NWATenantKeyValue).filter(
+                    and_(nmodels.NWATenantKeyValue.tenant_id == tenant_id,
+                         nmodels.NWATenantKeyValue.json_key == key)).one()
+                session.delete(item)
+
+
+def make_change(keys):
+    old = {'DEV_%08d_TenantFWName' % i: 'TFW%d' % i for i in range(keys)}
+    new = dict(old)
+    step = max(1, keys // 10)
+    for i in range(0, step):
+        del new['DEV_%08d_TenantFWName' % i]
+    for i in range(step, 2 * step):
+        new['DEV_%08d_TenantFWName' % i] = 'TFW%d-1' % i
+    for i in range(keys, keys + step):
+        new['DEV_%08d_TenantFWName' % i] = 'TFW%d' % i
+    return old, new
+
+
+def run(engine, set_binding, old, new):
+    table = nmodels.NWATenantKeyValue.__table__
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+    session = orm.sessionmaker(bind=engine, autocommit=True)()
+    db_api.add_nwa_tenant_binding(session, TENANT_ID, NWA_TENANT_ID, old)
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    sa.event.listen(engine, 'before_cursor_execute', count)
+    try:
+        start = time.time()
+        set_binding(session, TENANT_ID, NWA_TENANT_ID, new)
+        elapsed = time.time() - start
+    finally:
+        sa.event.remove(engine, 'before_cursor_execute', count)
+    result = db_api.get_nwa_tenant_binding(session, TENANT_ID, NWA_TENANT_ID)
+    assert set(result.value_json) == set(new)
+    session.close()
+    return elapsed, statements[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='sqlite://')
+    parser.add_argument('--keys', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    engine = sa.create_engine(args.url)
+    for keys in args.keys:
+        old, new = make_change(keys)
+        for name, set_binding in (('per-key', per_key_set),
+                                  ('bulk', db_api.set_nwa_tenant_binding)):
+            elapsed, statements = run(engine, set_binding, old, new)
+            print('%6d keys %-8s %8.1f ms %6d statements' % (
+                keys, name, elapsed * 1000, statements))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# Copyright 2016 NEC Corporation.  All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark of NWA HTTP requests with and without keep-alive sessions.
+
+A stub NWA server answering workflowinstance polls is started on a local
+port, then the same number of requests is sent through requests.request
+(a new connection per request) and through nwalib.restclient.RestClient
+(pooled keep-alive sessions). Connections opened per second and latency
+percentiles are printed for each mode.
+
+Usage: python tools/nwa_http_benchmark.py [--requests N] [--concurrency C]
+"""
+
+from __future__ import print_function
+
+import argparse
+import threading
+import time
+
+import requests
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+from networking_nec.nwa.nwalib import restclient
+
+BODY = b'{"status": "RUNNING", "progress": "50"}'
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _reply(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    do_GET = _reply
+    do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0),
+                                           StubHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+
+def run(name, send, count, concurrency, server):
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(n):
+        for __ in range(n):
+            start = time.time()
+            send()
+            elapsed = time.time() - start
+            with lock:
+                latencies.append(elapsed)
+
+    server.connections = 0
+    threads = [threading.Thread(target=worker, args=(count // concurrency,))
+               for __ in range(concurrency)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+    print('%-10s requests=%-6d connections=%-6d conn/s=%-9.1f req/s=%-9.1f '
+          'p50=%.2fms p99=%.2fms' %
+          (name, len(latencies), server.connections,
+           server.connections / elapsed, len(latencies) / elapsed,
+           percentile(latencies, 50) * 1000,
+           percentile(latencies, 99) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    server = StubServer()
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    path = '/umf/workflowinstance/1'
+    url = 'http://127.0.0.1:%d%s' % (port, path)
+
+    def unpooled():
+        requests.request('GET', url, verify=False, proxies={'no': 'pass'})
+
+    rcl = restclient.RestClient('127.0.0.1', port, False,
+                                lambda datestr, path: 'bench',
+                                pool_maxsize=args.concurrency)
+
+    def pooled():
+        rcl._send_receive('GET', path)
+
+    run('unpooled', unpooled, args.requests, args.concurrency, server)
+    run('pooled', pooled, args.requests, args.concurrency, server)
+    print('pool stats: %s' % rcl.get_pool_stats())
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()